@@ -0,0 +1,362 @@
+"""
+题库整理工具（取代 软件工程/sort.py）
+
+用法:
+    python bank_tool.py                        # 检查所有科目，只报告需要整理的题库，不写文件
+    python bank_tool.py 软件工程 PHP --write    # 整理指定科目（或 xlsx 文件）并写回
+    python bank_tool.py --write --compile      # 整理后同时生成编译缓存（.qbank）
+    python bank_tool.py --write --no-sort      # 只规范化和去重，不改变题目顺序
+
+整理内容:
+    题型规范化（单项选择题/单选题 -> 选择题，判断/对错题 -> 判断题 等，选项只有“正确/错误”的选择题 -> 判断题）
+    选项统一为 "A. xxx | B. yyy"，答案统一为大写字母 / "A | C" / 正确、错误
+    删除空题和重复的表头行，按 (题型, 问题, 选项) 去重，按题型和问题排序
+
+多个题库并行处理；内容没有变化的题库不会重写。
+进度按题目内容 ID（题干和选项）记录，选项格式统一和重复题合并会改变内容 ID，排序会改变旧格式进度（按行号）
+对应的题目，所以 --write 在写回题库前先把各用户的进度按整理前的行转换并改为新的内容 ID。
+整理时请先关闭刷题程序和 server.py，否则它们内存中尚未写盘的作答仍按旧内容 ID 保存。
+"""
+import os
+import re
+import ast
+import sys
+import time
+import string
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from openpyxl import Workbook, load_workbook
+
+import 刷题界面 as app
+
+NORMALIZED_COLUMNS = ("题型", "问题", "选项", "答案")  # 整理时会改写的列，其余列原样保留
+LETTERS = "ABCDEFGH"  # 选择题答案可用的字母
+OPTION_LABELS = string.ascii_uppercase  # 选项按位置标注的前缀字母（超过 8 个的选项也标注，重复整理时前缀仍能按位置识别）
+LABEL_PUNCT = "[.．、:：)）]"  # 选项前缀字母后必须跟的标点，没有标点的字母是选项内容的一部分
+
+# 题型别名 -> 规范题型
+TYPE_ALIASES = {
+    "单选题": "选择题",
+    "单选": "选择题",
+    "单项选择题": "选择题",
+    "选择": "选择题",
+    "多选": "多选题",
+    "多项选择题": "多选题",
+    "不定项选择题": "多选题",
+    "判断": "判断题",
+    "对错题": "判断题",
+    "是非题": "判断题",
+    "填空": "填空题",
+    "简答": "简答题",
+    "问答题": "简答题",
+    "short_answer": "简答题",
+    "解答": "解答题",
+    "计算题": "解答题",
+    "排序": "排序题",
+    "匹配": "匹配题",
+    "连线题": "匹配题",
+    "名词解释题": "名词解释",
+}
+
+TRUE_ANSWERS = {"正确", "对", "是", "√", "T", "TRUE", "Y", "YES"}
+FALSE_ANSWERS = {"错误", "错", "否", "×", "X", "F", "FALSE", "N", "NO"}
+
+
+def canonical_type(q_type):
+    q_type = re.sub(r"\s+", "", str(q_type or ""))
+    return TYPE_ALIASES.get(q_type, q_type)
+
+
+def split_options(value):
+    """把各种写法的选项拆成列表（列表字面量 / 竖线分隔 / 换行分隔）"""
+    if value is None:
+        return []
+    value = str(value).strip()
+    if value.startswith("[") and value.endswith("]"):
+        try:
+            parsed = ast.literal_eval(value)
+            if isinstance(parsed, list):
+                return [str(opt).strip() for opt in parsed]
+        except (ValueError, SyntaxError):
+            value = value[1:-1]
+    if "|" in value:
+        return [opt.strip() for opt in value.split("|")]
+    if "\n" in value:
+        return [opt.strip() for opt in value.splitlines() if opt.strip()]
+    return [value] if value else []
+
+
+def strip_option_labels(options):
+    """每个选项都带与位置对应的“字母+标点”前缀（A. B、C：...）时去掉前缀
+
+    没有前缀的选项原样返回；前缀与位置对不上（如多道题的选项拼在一起，A-D 重复出现）时返回 None，表示不宜改写。
+    """
+    labels = [i < len(OPTION_LABELS) and re.match(rf"{OPTION_LABELS[i]}{LABEL_PUNCT}\s*", opt, re.IGNORECASE)
+              for i, opt in enumerate(options)]
+    if options and all(labels):
+        return [opt[label.end():].strip() for opt, label in zip(options, labels)]
+    if any(re.match(rf"[A-Za-z]{LABEL_PUNCT}", opt) for opt in options):
+        return None
+    return options
+
+
+def format_options(options):
+    """选项统一写成 "A. xxx | B. yyy"（超过 26 个的选项不加前缀）"""
+    return " | ".join(f"{OPTION_LABELS[i]}. {opt}" if i < len(OPTION_LABELS) else opt for i, opt in enumerate(options))
+
+
+def normalize_judgement(answer):
+    text = str(answer).strip().upper()
+    if text in TRUE_ANSWERS:
+        return "正确"
+    if text in FALSE_ANSWERS:
+        return "错误"
+    return str(answer).strip()
+
+
+def normalize_choice_answer(answer, multiple):
+    """选择题答案统一为大写字母，多选题为 "A | B | D"；无法识别为字母时原样返回"""
+    text = str(answer).strip().upper()
+    letters = re.sub(r"[\s,，、|;；]+", "", text)
+    if letters and all(ch in LETTERS for ch in letters) and (multiple or len(letters) == 1):
+        return " | ".join(sorted(set(letters))) if multiple else letters
+    return str(answer).strip()
+
+
+def normalize_row(record):
+    """规范化一道题（NORMALIZED_COLUMNS 中存在的列名 -> 值的字典，原地修改），返回 None 表示应删除"""
+    question = record.get("问题")
+    if question is None or not str(question).strip():
+        return None
+    if record.get("题型") == "题型" and question == "问题":
+        return None  # 重复的表头行
+
+    q_type = canonical_type(record.get("题型"))
+    raw_options = split_options(record.get("选项"))
+    options = strip_option_labels(raw_options)
+    irregular = options is None  # 前缀不规则的选项保留原文
+    if irregular:
+        options = raw_options
+    answer = record.get("答案")
+
+    if q_type == "选择题" and [opt.replace(" ", "") for opt in options] == ["正确", "错误"]:
+        q_type = "判断题"
+
+    if q_type == "判断题":
+        options = None  # 判断题选项固定为“正确/错误”，原来有选项列的保留
+        if answer is not None:
+            answer = normalize_judgement(answer)
+    elif q_type in ("选择题", "多选题"):
+        if answer is not None:
+            answer = normalize_choice_answer(answer, q_type == "多选题")
+    elif isinstance(answer, str):
+        answer = answer.strip()
+
+    record["题型"] = q_type
+    record["问题"] = str(question).strip() if isinstance(question, str) else question
+    record["答案"] = answer
+    if "选项" in record:
+        if options is None:
+            record["选项"] = "正确 | 错误" if record["选项"] else None
+        elif not irregular:
+            record["选项"] = format_options(options) if options else None
+    return record
+
+
+def dedup_key(record):
+    return (record["题型"], re.sub(r"\s+", "", str(record["问题"])), record.get("选项") or "")
+
+
+def type_rank(q_type):
+    return app.EXAM_TYPE_ORDER.index(q_type) if q_type in app.EXAM_TYPE_ORDER else len(app.EXAM_TYPE_ORDER)
+
+
+def read_bank(path):
+    wb = load_workbook(path, read_only=True)
+    try:
+        sheet = wb.active
+        sheet.reset_dimensions()
+        rows = [list(row) for row in sheet.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+    if not rows:
+        return [], []
+    headers = rows[0]
+    return headers, [row + [None] * (len(headers) - len(row)) for row in rows[1:]]
+
+
+def write_bank(path, headers, rows):
+    """写回 xlsx（先写临时文件再替换）"""
+    wb = Workbook(write_only=True)
+    sheet = wb.create_sheet()
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".xlsx", dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def process_bank(path, write=False, sort=True, compile_bank=False):
+    """整理一个题库，返回报告字典（在子进程中执行）"""
+    start = time.perf_counter()
+    headers, rows = read_bank(path)
+    report = {"path": path, "rows": len(rows), "removed": 0, "duplicates": 0, "conflicts": [],
+              "retyped": 0, "changed": False, "written": False, "compiled": False}
+
+    if "问题" not in headers:
+        report["error"] = "缺少“问题”列"
+        return report
+
+    # 按列号读写：表头为空或重复的列、超出表头宽度的单元格都原样保留
+    columns = {name: headers.index(name) for name in NORMALIZED_COLUMNS if name in headers}
+    seen = {}  # 去重键 -> (答案, 原行号)
+    kept = {}  # 原行号 -> 整理后对应的原行号（重复的行并入第一次出现的行），删除的行不在其中
+    result, sources = [], []  # 整理后的行和各行的原行号
+    for row_index, row in enumerate(rows):
+        record = {name: row[i] for name, i in columns.items()}
+        old_type = record.get("题型")
+        if normalize_row(record) is None:
+            report["removed"] += 1
+            continue
+        report["retyped"] += record["题型"] != old_type
+
+        key = dedup_key(record)
+        if key in seen:
+            report["duplicates"] += 1
+            if seen[key][0] != record.get("答案"):
+                report["conflicts"].append(str(record["问题"])[:30])
+            kept[row_index] = seen[key][1]
+            continue
+        seen[key] = (record.get("答案"), row_index)
+        kept[row_index] = row_index
+        new_row = list(row)
+        for name, i in columns.items():
+            new_row[i] = record[name]
+        result.append(new_row)
+        sources.append(row_index)
+
+    if sort:
+        type_col, question_col = headers.index("题型") if "题型" in headers else None, headers.index("问题")
+        order = sorted(range(len(result)), key=lambda j: (type_rank(result[j][type_col]) if type_col is not None else 0,
+                                                         str(result[j][question_col])))
+        result, sources = [result[j] for j in order], [sources[j] for j in order]
+
+    report["changed"] = result != rows
+    if report["changed"] and write:
+        report["progress"] = rekey_progress(path, headers, rows, result, sources, kept)
+        write_bank(path, headers, result)
+        report["written"] = True
+
+    if compile_bank:
+        app.parse_question_file(path, use_compiled=False)  # 校验可解析
+        app.parse_question_file(path)  # 缓存过期时重新生成
+        report["compiled"] = os.path.exists(app.get_compiled_path(path))
+
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def row_ids(path, headers, rows):
+    """按 刷题界面 的解析规则计算每行题目的内容 ID（空行为 None），与打开题库时得到的 qid 一致"""
+    image_col = app.find_image_column(headers)
+    seen, ids = {}, []
+    for row in rows:
+        question = app.row_to_question(headers, row, path, image_col)
+        ids.append(app.next_question_id(question, seen) if question is not None else None)
+    return ids
+
+
+def rekey_progress(path, headers, rows, result, sources, kept):
+    """写回题库前把各用户的进度改为按整理后的内容 ID 保存，返回改写的进度文件数
+
+    整理会改变题目内容 ID（选项格式统一、重复题合并）和行号（排序、去重）；旧格式进度按行号保存，
+    先按整理前的行转换为内容 ID，再与新格式进度一起改写。
+    """
+    old_ids = row_ids(path, headers, rows)
+    new_ids = dict(zip(sources, row_ids(path, headers, result)))  # 原行号 -> 新内容 ID
+    mapping = {old_ids[i]: new_ids[target] for i, target in kept.items() if old_ids[i]}
+    legacy_ids = [qid for qid in old_ids if qid]
+
+    # 同一题库按科目扫描得到的路径（./科目/题库.xlsx）和命令行给出的路径都可能是进度文件的来源
+    paths = {path, os.path.join(app.ROOT_DIR, os.path.relpath(path, app.ROOT_DIR))}
+    rewritten = 0
+    for user in app.list_users():
+        for progress_file in {app.get_progress_file_path(p, user) for p in paths}:
+            if not app.progress_exists(progress_file):
+                continue
+            with app.file_lock(progress_file):
+                progress = app.read_progress_file(progress_file)
+                if progress.get("schema") != app.PROGRESS_SCHEMA:
+                    progress = app.progress_to_ids(progress, legacy_ids)
+                app.write_progress_file(progress_file, app.remap_progress(progress, mapping))
+            rewritten += 1
+    return rewritten
+
+
+def collect_banks(targets):
+    """把科目名 / 目录 / xlsx 文件展开为题库文件列表"""
+    if not targets:
+        targets = app.scan_subjects()
+    banks = []
+    for target in targets:
+        if os.path.isfile(target):
+            banks.append(target)
+        elif os.path.isdir(os.path.join(app.ROOT_DIR, target)):
+            banks.extend(path for path in app.scan_question_files(target) if not app.is_document_bank(path))
+        else:
+            print(f"找不到科目或题库: {target}")
+    return sorted(set(banks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="题库整理：规范化、去重、排序，可生成编译缓存")
+    parser.add_argument("targets", nargs="*", help="科目名、目录或 xlsx 文件（默认全部科目）")
+    parser.add_argument("--write", action="store_true", help="把整理结果写回题库（默认只检查）")
+    parser.add_argument("--no-sort", action="store_true", help="不排序，保留原有题目顺序")
+    parser.add_argument("--compile", action="store_true", help="生成编译缓存 .qbank")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="并行进程数")
+    args = parser.parse_args()
+
+    banks = collect_banks(args.targets)
+    if not banks:
+        print("没有找到题库")
+        return 1
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs or 1, len(banks)))) as pool:
+        reports = list(pool.map(process_bank, banks, [args.write] * len(banks), [not args.no_sort] * len(banks),
+                                [args.compile] * len(banks)))
+
+    changed = 0
+    for report in reports:
+        if "error" in report:
+            print(f"[跳过] {report['path']}: {report['error']}")
+            continue
+        changed += report["changed"]
+        status = "已写回" if report["written"] else "需整理" if report["changed"] else "无变化"
+        print(f"[{status}] {report['path']}  {report['rows']} 行, 删除空行 {report['removed']}, "
+              f"重复 {report['duplicates']}, 题型修正 {report['retyped']}"
+              + (f"，改写进度 {report['progress']} 份" if report.get("progress") else "")
+              + ("，已编译" if report["compiled"] else ""))
+        for question in report["conflicts"]:
+            print(f"    答案不一致的重复题（保留第一条）: {question}")
+
+    print(f"共 {len(reports)} 个题库，{changed} 个需要整理，用时 {time.perf_counter() - start:.2f}s")
+    if changed and not args.write:
+        print("使用 --write 写回")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
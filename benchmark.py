@@ -0,0 +1,468 @@
+"""
+刷题系统性能基准测试
+
+用法:
+    python benchmark.py                       # 默认 1k/10k/100k 三档题量
+    python benchmark.py --sizes 1000 10000    # 指定题量
+    python benchmark.py --compare 旧结果.json  # 与之前的结果对比
+    xvfb-run -a python benchmark.py           # 没有显示器的机器（CI、SSH）上测量界面渲染
+
+show_question 渲染和速刷模式按键延迟（drill_key_to_next）需要真实的 Tk 窗口，也就是需要 X 显示；
+没有显示时这两项记为 skipped 并打印提示，速刷延迟预算也不做检查，请用 xvfb-run 运行。
+（ui_harness.py 可以在 fake_tk 替身上驱动界面，但替身不绘制控件，测出的耗时不能与真实 Tk 对比。）
+速刷模式按键到下一题的耗时 P95 超出 刷题界面.DRILL_LATENCY_BUDGET_MS 时以退出码 1 结束。
+
+结果以 JSON 保存在 benchmark_results/ 下，不同版本之间对比即可看出性能回退。
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from types import SimpleNamespace
+
+from openpyxl import Workbook
+
+import 刷题界面 as app
+
+RESULT_DIR = "benchmark_results"  # 结果保存目录
+DEFAULT_SIZES = [1000, 10000, 100000]
+LETTERS = ["A", "B", "C", "D", "E", "F", "G", "H"]
+
+# 合成题库中各题型所占比例
+TYPE_WEIGHTS = {
+    "选择题": 0.35,
+    "判断题": 0.25,
+    "多选题": 0.1,
+    "填空题": 0.2,
+    "简答题": 0.1,
+}
+
+
+def make_question(rng, i, q_type):
+    """生成一行合成题目：(题型, 问题, 答案, 选项)"""
+    text = f"合成题目{i}：" + "".join(rng.choice("软件工程网络安全物联网技术数据结构") for _ in range(rng.randint(10, 40)))
+
+    if q_type == "选择题":
+        options = [f"{LETTERS[k]}. 选项{i}-{k}" for k in range(4)]
+        return q_type, text, rng.choice(LETTERS[:4]), " | ".join(options)
+    if q_type == "多选题":
+        options = [f"{LETTERS[k]}. 选项{i}-{k}" for k in range(5)]
+        answer = sorted(rng.sample(LETTERS[:5], rng.randint(2, 4)))
+        return q_type, text, " | ".join(answer), " | ".join(options)
+    if q_type == "判断题":
+        return q_type, text, rng.choice(["正确", "错误"]), None
+    if q_type == "填空题":
+        blanks = [f"空{i}-{k}" for k in range(rng.randint(1, 3))]
+        return q_type, text, " || ".join(blanks) if len(blanks) > 1 else blanks[0], None
+    answer = "，".join(f"要点{i}-{k}" for k in range(rng.randint(3, 12)))
+    return q_type, text, answer, None
+
+
+def generate_bank(path, size, seed=0):
+    """生成指定题量的合成 xlsx 题库"""
+    rng = random.Random(seed)
+    types = list(TYPE_WEIGHTS)
+    weights = list(TYPE_WEIGHTS.values())
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(["题型", "问题", "答案", "选项"])
+    for i in range(size):
+        ws.append(make_question(rng, i, rng.choices(types, weights)[0]))
+    wb.save(path)
+    return path
+
+
+def get_bank(work_dir, size, seed=0):
+    """获取合成题库（按题量和种子缓存，避免重复生成）"""
+    path = os.path.join(work_dir, f"bank_{size}_{seed}.xlsx")
+    if not os.path.exists(path):
+        generate_bank(path, size, seed)
+    return path
+
+
+def make_progress(questions, seed=0):
+    """生成一份已答一半、错题约两成的合成进度"""
+    rng = random.Random(seed)
+    progress = {
+        "total_questions": len(questions),
+        "answered": {},
+        "wrong_questions": [],
+        "current_index": 0,
+        "correct_count": 0,
+        "wrong_count": 0
+    }
+    for i in rng.sample(range(len(questions)), len(questions) // 2):
+        is_correct = rng.random() > 0.2
+        progress["answered"][str(i)] = {"user_answer": "A", "is_correct": is_correct, "timestamp": time.time()}
+        if is_correct:
+            progress["correct_count"] += 1
+        else:
+            progress["wrong_count"] += 1
+            progress["wrong_questions"].append(i)
+    return progress
+
+
+def wrong_answer_for(question):
+    """构造一个错误答案，用于评测判错分支"""
+    q_type = question.get("题型")
+    if q_type == "判断题":
+        return "错误" if question.get("答案") == "正确" else "正确"
+    if q_type in ("选择题", "多选题"):
+        return "H"
+    return "不可能的答案"
+
+
+def timeit(func, repeat, number=1):
+    """重复执行 func，返回每次调用耗时（秒）的统计"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "repeat": repeat,
+        "number": number,
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "max": max(samples),
+    }
+
+
+def bench_parse(path, repeat):
+    return timeit(lambda: app.parse_question_file(path, use_compiled=False), repeat)
+
+
+def bench_compiled(path, repeat):
+    """测量从编译缓存（.qbank）加载题库"""
+    app.parse_question_file(path)  # 生成缓存
+    return timeit(lambda: app.load_compiled_questions(path), repeat)
+
+
+def bench_check_answer(questions, repeat):
+    """按题型分别测量 check_answer 的吞吐（正确答案和错误答案各判一次），另测 build_answer_keys 预编译耗时"""
+    results = {"build_answer_keys": timeit(lambda: app.build_answer_keys(questions), repeat)}
+    by_type = {}
+    for q in questions:
+        by_type.setdefault(q.get("题型", "未知题型"), []).append(q)
+
+    for q_type, items in sorted(by_type.items()):
+        cases = []
+        for q in items:
+            cases.append((q, str(q.get("答案", ""))))
+            cases.append((q, wrong_answer_for(q)))
+
+        def run():
+            for q, answer in cases:
+                app.check_answer(q, answer)
+
+        stats = timeit(run, repeat)
+        stats["calls"] = len(cases)
+        stats["per_call_us"] = stats["median"] / len(cases) * 1e6
+        results[q_type] = stats
+    return results
+
+
+def bench_question_order(questions, progress, repeat):
+    """测量 build_question_order（全部题型与单一题型筛选）"""
+    results = {}
+    for selected_filter in ("全部", "选择题"):
+        results[selected_filter] = timeit(
+            lambda: app.build_question_order(questions, progress, selected_filter), repeat)
+
+    # 从进度中恢复顺序并定位到中间位置（续做时的开销）
+    progress["order"] = app.build_question_order(questions, progress).to_state()
+    saved = json.loads(json.dumps(progress["order"]))
+
+    def restore():
+        order = app.QuestionOrder.from_state(saved)
+        return order[len(order) // 2]
+
+    results["restore"] = timeit(restore, repeat, number=100)
+    return results
+
+
+def bench_sampler(questions, progress, repeat):
+    """测量智能抽题抽样器：建树、单次抽样+更新权重"""
+    stats = {str(i): [1, 0 if answer["is_correct"] else 1, 5.0] for i, answer in progress["answered"].items()}
+    weights = [app.question_weight(stats.get(str(i))) for i in range(len(questions))]
+    sampler = app.FenwickSampler(weights)
+    rng = random.Random(0)
+
+    def sample_and_update():
+        index = sampler.sample(rng)
+        sampler.update(index, rng.random())
+
+    return {
+        "build": timeit(lambda: app.FenwickSampler(weights), repeat),
+        "sample_update": timeit(sample_and_update, repeat, number=1000),
+    }
+
+
+def bench_browser_sort(questions, progress, repeat):
+    """测量题库浏览表格按各列排序：首次排序（计算排序键）和复用排序键的再次排序"""
+    results = {}
+    for col, (title, _, _) in enumerate(app.BROWSER_COLUMNS[1:], start=1):
+        keys = app.browser_sort_keys(questions, progress, col)
+        results[title] = {
+            "build_keys": timeit(lambda: app.browser_sort_keys(questions, progress, col), repeat),
+            "sort": timeit(lambda: sorted(range(len(questions)), key=keys.__getitem__), repeat),
+        }
+    return results
+
+
+def bench_progress_io(path, progress, repeat):
+    """测量 save_progress / load_progress，以及 ProgressStore 批量写盘下每次作答的平均开销"""
+    app.save_progress(path, progress)
+    store = app.ProgressStore(path, "bench")
+    rng = random.Random(0)
+    total = progress["total_questions"]
+
+    def record_batch():
+        for _ in range(app.FLUSH_BATCH_SIZE):
+            store.record(rng.randrange(total), "A", rng.random() > 0.2, 1.0)
+
+    record_stats = timeit(record_batch, repeat)
+    record_stats["per_answer_us"] = record_stats["median"] / app.FLUSH_BATCH_SIZE * 1e6
+    return {
+        "save_progress": timeit(lambda: app.save_progress(path, progress), repeat),
+        "load_progress": timeit(lambda: app.load_progress(path), repeat),
+        "store_record_batch": record_stats,
+        "file_bytes": os.path.getsize(app.get_progress_file_path(path)),
+    }
+
+
+def bench_render(path, questions, progress, count):
+    """在无窗口的 Tk 根窗口中测量 show_question（需要 X 显示，可配合 Xvfb 使用）"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        return {"skipped": f"无法创建 Tk 窗口: {e}"}
+
+    root.withdraw()
+    try:
+        exam = app.ExamApp(root)
+        exam.selected_file = path
+        exam.questions = questions
+        exam.progress = progress
+        exam.generate_question_order()
+        count = min(count, len(exam.question_order))
+
+        samples = []
+        for i in range(count):
+            exam.current_index = i
+            start = time.perf_counter()
+            exam.show_question()
+            root.update_idletasks()
+            samples.append(time.perf_counter() - start)
+        return {
+            "questions": count,
+            "min": min(samples),
+            "median": statistics.median(samples),
+            "mean": statistics.fmean(samples),
+            "max": max(samples),
+            "questions_per_second": count / sum(samples),
+        }
+    finally:
+        root.destroy()
+
+
+def bench_drill(path, questions, count):
+    """速刷模式：模拟按下正确选项的字母键，测量按键到下一题显示完成的耗时（需要 X 显示）"""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        return {"skipped": f"无法创建 Tk 窗口: {e}"}
+
+    root.withdraw()
+    try:
+        exam = app.ExamApp(root)
+        exam.selected_file = path
+        exam.questions = questions
+        exam.store = app.ProgressStore(path)
+        exam.progress = exam.store.progress
+        exam.selected_filter = "选择题"
+        exam.generate_question_order()
+        exam.drill_mode = True
+        exam.show_question()
+        count = min(count, len(exam.question_order) - 1)
+
+        for _ in range(count):
+            letter = app.type_handler(exam.current_question).correct_letters(exam.current_question)[0]
+            exam.handle_drill_key(SimpleNamespace(widget=root, keysym=letter.lower()))
+            root.update_idletasks()
+
+        samples = list(exam.drill_latencies)
+        presses, mean_ms, p95_ms, over = exam.drill_stats()
+        return {
+            "samples": presses,
+            "min": min(samples),
+            "median": statistics.median(samples),
+            "mean": statistics.fmean(samples),
+            "max": max(samples),
+            "p95_ms": p95_ms,
+            "over_budget": over,
+            "budget_ms": app.DRILL_LATENCY_BUDGET_MS,
+            "within_budget": p95_ms <= app.DRILL_LATENCY_BUDGET_MS,
+        }
+    finally:
+        root.destroy()
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       text=True).strip()
+    except Exception:
+        return None
+
+
+def run_benchmarks(sizes, work_dir, render_count):
+    progress_dir = os.path.join(work_dir, "progress")
+    app.PROGRESS_DIR = progress_dir
+
+    results = {}
+    for size in sizes:
+        repeat = 5 if size <= 10000 else 2
+        print(f"[{size}] 生成/读取合成题库...")
+        path = get_bank(work_dir, size)
+
+        print(f"[{size}] parse_question_file")
+        parse_stats = bench_parse(path, repeat)
+        print(f"[{size}] load_compiled_questions")
+        compiled_stats = bench_compiled(path, repeat)
+        questions = app.parse_question_file(path)
+        progress = make_progress(questions)
+
+        print(f"[{size}] check_answer")
+        check_stats = bench_check_answer(questions, repeat)
+
+        print(f"[{size}] generate_question_order")
+        order_stats = bench_question_order(questions, progress, repeat)
+
+        print(f"[{size}] FenwickSampler")
+        sampler_stats = bench_sampler(questions, progress, repeat)
+
+        print(f"[{size}] 题库浏览排序")
+        browser_stats = bench_browser_sort(questions, progress, repeat)
+
+        print(f"[{size}] save_progress / load_progress")
+        io_stats = bench_progress_io(path, app.progress_to_ids(progress, [q["qid"] for q in questions]), repeat)
+
+        print(f"[{size}] show_question")
+        render_stats = bench_render(path, questions, make_progress(questions), render_count)
+
+        print(f"[{size}] 速刷模式按键延迟")
+        drill_stats = bench_drill(path, questions, render_count)
+        if "skipped" in render_stats or "skipped" in drill_stats:
+            print(f"[{size}] 跳过界面渲染测量（{render_stats.get('skipped') or drill_stats.get('skipped')}），"
+                  f"没有显示器时请用 xvfb-run -a python benchmark.py 运行")
+
+        results[str(size)] = {
+            "parse_question_file": parse_stats,
+            "load_compiled_questions": compiled_stats,
+            "check_answer": check_stats,
+            "generate_question_order": order_stats,
+            "adaptive_sampler": sampler_stats,
+            "browser_sort": browser_stats,
+            **io_stats,
+            "show_question": render_stats,
+            "drill_key_to_next": drill_stats,
+        }
+    return results
+
+
+def flatten(results, prefix=""):
+    """把嵌套结果展开为 {路径: 中位数耗时}，便于对比"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict) and "median" in value:
+            flat[prefix + key] = value["median"]
+        elif isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + "/"))
+    return flat
+
+
+def compare(old_file, new_data, threshold=0.1):
+    """与旧结果对比，打印变化并返回是否存在超过阈值的回退"""
+    with open(old_file, "r", encoding="utf-8") as f:
+        old_data = json.load(f)
+
+    old = flatten(old_data["results"])
+    new = flatten(new_data["results"])
+    regressed = False
+    print(f"\n与 {old_file} ({old_data['meta'].get('revision')}) 对比:")
+    for key in sorted(set(old) & set(new)):
+        ratio = new[key] / old[key] if old[key] else float("inf")
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  <-- 变慢"
+            regressed = True
+        elif ratio < 1 - threshold:
+            mark = "  (变快)"
+        print(f"  {key:<60} {old[key] * 1000:10.3f}ms -> {new[key] * 1000:10.3f}ms  x{ratio:.2f}{mark}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="刷题系统性能基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="合成题库题量")
+    parser.add_argument("--render-count", type=int, default=50, help="show_question 渲染的题目数")
+    parser.add_argument("--output", help="结果文件路径（默认 benchmark_results/<时间>-<版本>.json）")
+    parser.add_argument("--compare", help="与之前保存的结果文件对比")
+    parser.add_argument("--work-dir", help="合成题库缓存目录（默认临时目录，运行结束删除）")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="exam_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        results = run_benchmarks(args.sizes, work_dir, args.render_count)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    revision = git_revision()
+    data = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "revision": revision,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+            "source_md5": hashlib.md5(open(app.__file__, "rb").read()).hexdigest(),
+        },
+        "results": results,
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        output = os.path.join(RESULT_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{revision or 'unknown'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output}")
+
+    over_budget = [size for size, result in results.items()
+                   if result["drill_key_to_next"].get("within_budget") is False]
+    for size in over_budget:
+        drill = results[size]["drill_key_to_next"]
+        print(f"[{size}] 速刷模式按键延迟 P95 {drill['p95_ms']:.1f}ms 超出预算 {drill['budget_ms']}ms")
+
+    if args.compare and compare(args.compare, data) or over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
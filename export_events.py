@@ -0,0 +1,172 @@
+"""
+作答历史导出
+
+用法:
+    python export_events.py --output events.csv                  # 导出全部用户的作答历史为 CSV
+    python export_events.py --output events.parquet              # 导出为 Parquet（需要 pyarrow）
+    python export_events.py --output events.arrow --user alice   # 只导出指定用户，Arrow IPC 格式
+    python export_events.py --report 20                          # 打印错误率最高的 20 道题
+
+作答历史由 刷题界面.ProgressStore 写盘时追加到 <进度目录>/events/<年-月>.jsonl，
+整理进度时之前月份的历史压缩为 <年-月>.jsonl.gz（见 刷题界面.compact_events），两种文件都会读取。
+在 pandas 中分析:
+    import export_events
+    df = export_events.load_dataframe()
+    df.groupby(["subject", "type"])["correct"].mean()
+"""
+import os
+import sys
+import csv
+import glob
+import gzip
+import json
+import time
+import argparse
+
+import 刷题界面 as app
+
+COLUMNS = ["user", "ts", "time", "subject", "bank", "file", "q", "id", "type", "answer", "correct", "latency"]
+
+
+def iter_events(users=None, since=None):
+    """逐条读取作答历史，返回 COLUMNS 中各字段组成的字典"""
+    for user in users or app.list_users():
+        events_dir = app.get_events_dir(user)
+        paths = glob.glob(os.path.join(events_dir, "*.jsonl")) + glob.glob(os.path.join(events_dir, "*.jsonl.gz"))
+        for path in sorted(paths):
+            with (gzip.open if path.endswith(".gz") else open)(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue  # 写到一半的行
+                    if since and event["ts"] < since:
+                        continue
+                    event["user"] = user
+                    event["time"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event["ts"]))
+                    event["subject"] = app.new_bank_summary(event["file"])["subject"]
+                    yield event
+
+
+def to_columns(events):
+    """按列收集作答历史，便于构造列式表"""
+    columns = {name: [] for name in COLUMNS}
+    for event in events:
+        for name in COLUMNS:
+            columns[name].append(event.get(name))
+    return columns
+
+
+def write_csv(events, path):
+    """导出 CSV（带 BOM，Excel 可直接打开），返回行数"""
+    count = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for event in events:
+            writer.writerow(event)
+            count += 1
+    return count
+
+
+def to_arrow_table(events):
+    """转换为 pyarrow.Table"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        sys.exit("导出 Parquet/Arrow 需要 pyarrow: pip install pyarrow")
+
+    columns = to_columns(events)
+    schema = pa.schema([
+        ("user", pa.string()), ("ts", pa.float64()), ("time", pa.string()), ("subject", pa.string()),
+        ("bank", pa.string()), ("file", pa.string()), ("q", pa.int32()), ("id", pa.string()), ("type", pa.string()),
+        ("answer", pa.string()), ("correct", pa.bool_()), ("latency", pa.float32()),
+    ])
+    return pa.table(columns, schema=schema)
+
+
+def write_parquet(events, path):
+    import pyarrow.parquet as pq
+    table = to_arrow_table(events)
+    pq.write_table(table, path, compression="zstd")
+    return table.num_rows
+
+
+def write_arrow(events, path):
+    import pyarrow.feather as feather
+    table = to_arrow_table(events)
+    feather.write_feather(table, path, compression="zstd")
+    return table.num_rows
+
+
+def load_dataframe(users=None, since=None):
+    """把作答历史读入 pandas.DataFrame"""
+    import pandas as pd
+    return pd.DataFrame(to_columns(iter_events(users, since)), columns=COLUMNS)
+
+
+def hardest_questions(events, top=20, min_attempts=3):
+    """按错误率排出最难的题目，返回 [(错误率, 作答次数, 题库文件, 题目内容 ID 或序号, 题型), ...]
+
+    有内容 ID 的作答按 ID 归并，题库调整行顺序前后的作答算同一道题；旧版本记录的作答只有题目序号。
+    """
+    counts = {}
+    for event in events:
+        item = counts.setdefault((event["file"], event.get("id") or event["q"]), [0, 0, event["type"]])
+        item[0] += 1
+        item[1] += not event["correct"]
+
+    ranked = [(errors / attempts, attempts, file, q, q_type)
+              for (file, q), (attempts, errors, q_type) in counts.items() if attempts >= min_attempts]
+    ranked.sort(key=lambda item: (-item[0], -item[1]))
+    return ranked[:top]
+
+
+def print_report(events, top, min_attempts):
+    positions = {}  # 题库文件 -> {内容 ID 或序号: 题目序号}
+    questions = {}
+    for rate, attempts, file, q, q_type in hardest_questions(events, top, min_attempts):
+        if file not in questions:
+            try:
+                questions[file] = app.parse_question_file(file)
+            except Exception:
+                questions[file] = []
+            positions[file] = {question["qid"]: i for i, question in enumerate(questions[file])}
+            positions[file].update((i, i) for i in range(len(questions[file])))
+        index = positions[file].get(q)
+        text = questions[file][index]["问题"] if index is not None else "(题库中已不存在)"
+        text = str(text).replace("\n", " ")
+        number = f"第{index + 1}题" if index is not None else ""
+        print(f"{rate:6.1%}  {attempts:4d}次  [{q_type}] {os.path.basename(file)} {number}  {text[:40]}")
+
+
+WRITERS = {".csv": write_csv, ".parquet": write_parquet, ".arrow": write_arrow, ".feather": write_arrow}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出作答历史")
+    parser.add_argument("--output", help="导出文件，按扩展名选择格式: .csv/.parquet/.arrow/.feather")
+    parser.add_argument("--user", action="append", help="只导出指定用户（可重复，默认全部用户）")
+    parser.add_argument("--days", type=float, help="只导出最近若干天")
+    parser.add_argument("--report", type=int, metavar="N", help="打印错误率最高的 N 道题")
+    parser.add_argument("--min-attempts", type=int, default=3, help="统计错误率时至少作答的次数")
+    args = parser.parse_args()
+
+    if not args.output and not args.report:
+        parser.error("需要指定 --output 或 --report")
+
+    since = time.time() - args.days * 86400 if args.days else None
+
+    if args.output:
+        writer = WRITERS.get(os.path.splitext(args.output)[1].lower())
+        if writer is None:
+            parser.error(f"不支持的导出格式: {args.output}")
+        count = writer(iter_events(args.user, since), args.output)
+        print(f"已导出 {count} 条作答记录到 {args.output}")
+
+    if args.report:
+        print_report(iter_events(args.user, since), args.report, args.min_attempts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+静态网页题库导出
+
+用法:
+    python export_web.py                          # 导出所有科目到 web/
+    python export_web.py 软件工程 --output site     # 只导出指定科目（或题库文件）到 site/
+    python export_web.py --shard-size 200          # 每个分片最多 200 题
+    python export_web.py --force                   # 忽略清单，所有题库重新生成
+
+输出目录:
+    index.json               科目 -> 题型 -> 分片列表（文件、题数、所属题库），网页先加载它，再按需加载分片
+    shards/<哈希>.json.gz     同一题库同一题型的一组题目（gzip 压缩的 JSON 数组），文件名为内容哈希，可长期缓存
+    assets/<哈希><扩展名>      题目附图
+    manifest.json            各题库的签名和生成的分片，下次导出时跳过没有变化的题库
+
+浏览器中可用 fetch(分片).then(r => new Response(r.body.pipeThrough(new DecompressionStream("gzip"))).json()) 读取分片。
+多个题库并行解析；没有变化的题库不重新解析，内容相同的分片不重写，不再被引用的分片会被删除（附图用 --force 清理）。
+某个题库导出失败时沿用清单中上次导出的结果，命令以退出码 1 结束。
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import 刷题界面 as app
+
+EXPORT_VERSION = 1  # 分片格式变化时加一，所有题库重新生成
+DEFAULT_OUTPUT = "web"
+DEFAULT_SHARD_SIZE = 500
+SHARD_DIR = "shards"
+ASSET_DIR = "assets"
+INDEX_FILE = "index.json"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_FIELDS = ("path", "name", "subject", "signature", "count", "shards")  # 清单中每个题库保存的字段
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def bank_signature(path, shard_size):
+    """题库签名：题库（文档题库为导入结果）的修改时间和大小，加上导出参数"""
+    source = app.get_compiled_path(path) if app.is_document_bank(path) else path
+    return app.source_signature(source) + [shard_size, EXPORT_VERSION]
+
+
+def write_if_missing(path, data):
+    """内容哈希命名的文件已存在即内容相同，不重写"""
+    if os.path.exists(path):
+        return False
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def export_asset(image_path, output):
+    """复制附图到 assets/，返回网页中的相对路径，图片不存在时返回 None"""
+    try:
+        with open(image_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    name = content_hash(data) + os.path.splitext(image_path)[1].lower()
+    write_if_missing(os.path.join(output, ASSET_DIR, name), data)
+    return f"{ASSET_DIR}/{name}"
+
+
+def to_record(question, output):
+    """网页使用的题目记录"""
+    record = {
+        "id": question["qid"],
+        "type": question.get("题型", "未知题型"),
+        "question": str(question.get("问题", "")),
+        "options": question.get("options", []),
+        "answer": app.type_handler(question).answer_display(question),
+    }
+    if question.get("image_path"):
+        image = export_asset(question["image_path"], output)
+        if image:
+            record["image"] = image
+    return record
+
+
+def export_bank(path, output, shard_size):
+    """导出一个题库（在子进程中执行），返回清单条目"""
+    start = time.perf_counter()
+    entry = {"path": path, "name": os.path.basename(path), "subject": app.new_bank_summary(path)["subject"],
+             "signature": bank_signature(path, shard_size), "count": 0, "shards": [], "written": 0}
+    try:
+        questions = app.parse_question_file(path)
+    except Exception as e:
+        entry["error"] = str(e)
+        return entry
+
+    by_type = {}
+    for question in questions:
+        by_type.setdefault(question.get("题型", "未知题型"), []).append(to_record(question, output))
+
+    for q_type, records in by_type.items():
+        for i in range(0, len(records), shard_size):
+            chunk = records[i:i + shard_size]
+            data = json.dumps(chunk, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            name = f"{SHARD_DIR}/{content_hash(data)}.json.gz"
+            # mtime=0 使相同内容的压缩结果完全一致
+            entry["written"] += write_if_missing(os.path.join(output, name), gzip.compress(data, 9, mtime=0))
+            entry["shards"].append({"file": name, "type": q_type, "count": len(chunk)})
+    entry["count"] = len(questions)
+    entry["seconds"] = time.perf_counter() - start
+    return entry
+
+
+def collect_banks(targets):
+    """把科目名 / 目录 / 题库文件展开为题库列表（包含已导入的文档题库）"""
+    if not targets:
+        targets = app.scan_subjects()
+    banks = []
+    for target in targets:
+        if os.path.isfile(target):
+            banks.append(target)
+        elif os.path.isdir(os.path.join(app.ROOT_DIR, target)):
+            banks.extend(app.scan_question_files(target))
+        else:
+            print(f"找不到科目或题库: {target}")
+    return sorted(set(banks))
+
+
+def load_manifest(output):
+    path = os.path.join(output, MANIFEST_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        return manifest if manifest.get("version") == EXPORT_VERSION else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def build_index(entries):
+    """科目 -> 题型 -> 分片的索引，只包含网页需要的信息"""
+    subjects = {}
+    for entry in sorted(entries, key=lambda e: e["path"]):
+        subject = subjects.setdefault(entry["subject"], {"count": 0, "banks": [], "types": {}})
+        subject["count"] += entry["count"]
+        subject["banks"].append({"name": entry["name"], "count": entry["count"]})
+        for shard in entry["shards"]:
+            q_type = subject["types"].setdefault(shard["type"], {"count": 0, "shards": []})
+            q_type["count"] += shard["count"]
+            q_type["shards"].append({"file": shard["file"], "count": shard["count"], "bank": entry["name"]})
+    return {"version": EXPORT_VERSION, "generated": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "count": sum(subject["count"] for subject in subjects.values()), "subjects": subjects}
+
+
+def remove_unreferenced(output, entries):
+    """删除不再被引用的分片，返回删除的个数"""
+    referenced = {shard["file"] for entry in entries for shard in entry["shards"]}
+    removed = 0
+    for name in os.listdir(os.path.join(output, SHARD_DIR)):
+        if f"{SHARD_DIR}/{name}" not in referenced:
+            os.remove(os.path.join(output, SHARD_DIR, name))
+            removed += 1
+    return removed
+
+
+def write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把题库导出为静态网页使用的压缩分片和索引")
+    parser.add_argument("targets", nargs="*", help="科目名、目录或题库文件（默认全部科目）")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"输出目录（默认 {DEFAULT_OUTPUT}）")
+    parser.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="每个分片最多的题数")
+    parser.add_argument("--force", action="store_true", help="忽略清单，所有题库重新生成")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="并行进程数")
+    args = parser.parse_args()
+
+    banks = collect_banks(args.targets)
+    if not banks:
+        print("没有找到题库")
+        return 1
+
+    if args.force:
+        shutil.rmtree(os.path.join(args.output, ASSET_DIR), ignore_errors=True)
+    for directory in (SHARD_DIR, ASSET_DIR):
+        os.makedirs(os.path.join(args.output, directory), exist_ok=True)
+
+    start = time.perf_counter()
+    previous = {} if args.force else load_manifest(args.output).get("banks", {})
+    entries, changed = [], []
+    for path in banks:
+        old = previous.get(path)
+        if old and old["signature"] == bank_signature(path, args.shard_size) and \
+                all(os.path.exists(os.path.join(args.output, shard["file"])) for shard in old["shards"]):
+            entries.append(old)
+        else:
+            changed.append(path)
+
+    if changed:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.jobs or 1, len(changed)))) as pool:
+            reports = list(pool.map(export_bank, changed, [args.output] * len(changed),
+                                    [args.shard_size] * len(changed)))
+    else:
+        reports = []
+
+    failed = 0
+    for report in reports:
+        if "error" in report:
+            failed += 1
+            print(f"[失败] {report['path']}: {report['error']}")
+            # 保留上次导出的结果，避免一次读取失败就把该题库从网页中删掉
+            old = previous.get(report["path"])
+            if old and all(os.path.exists(os.path.join(args.output, shard["file"])) for shard in old["shards"]):
+                entries.append(old)
+                print(f"[保留] {report['path']}: 沿用上次导出的 {old['count']} 题")
+            continue
+        entries.append(report)
+        print(f"[已导出] {report['path']}  {report['count']} 题, {len(report['shards'])} 个分片"
+              f"（新写入 {report['written']} 个）  {report['seconds']:.2f}s")
+
+    # 只导出部分科目时保留清单中其他仍然存在的题库
+    if args.targets:
+        targeted = set(banks)
+        entries += [entry for path, entry in previous.items() if path not in targeted and os.path.exists(path) and
+                    all(os.path.exists(os.path.join(args.output, shard["file"])) for shard in entry["shards"])]
+
+    removed = remove_unreferenced(args.output, entries)
+    index = build_index(entries)
+    write_json(os.path.join(args.output, INDEX_FILE), index)
+    write_json(os.path.join(args.output, MANIFEST_FILE), {
+        "version": EXPORT_VERSION,
+        "banks": {entry["path"]: {key: entry[key] for key in MANIFEST_FIELDS} for entry in entries},
+    })
+
+    print(f"共 {len(banks)} 个题库，重新生成 {len(reports) - failed} 个，未变化 {len(banks) - len(changed)} 个，"
+          f"失败 {failed} 个；题目 {index['count']} 道，删除旧分片 {removed} 个，用时 {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,798 @@
+"""
+无界面的 Tk 替身（fake Tk backend）
+
+在没有显示器的 Linux CI 机器上驱动 ExamApp（见 ui_harness.py）：install() 会在导入 刷题界面 之前把 tkinter
+及其子模块替换为本模块中的纯 Python 实现。控件只记录属性和父子关系，不做真正的绘制；after() 定时任务由虚拟时钟调度，
+通过 Tk.advance(毫秒) 推进。messagebox / filedialog 的调用记录在 DIALOGS 中，返回值可以预设。
+"""
+import sys
+import types
+import itertools
+
+# 常量
+BOTH, X, Y, NONE = "both", "x", "y", "none"
+LEFT, RIGHT, TOP, BOTTOM = "left", "right", "top", "bottom"
+N, S, E, W, NW, NE, SW, SE, CENTER = "n", "s", "e", "w", "nw", "ne", "sw", "se", "center"
+END, INSERT = "end", "insert"
+NORMAL, DISABLED, ACTIVE, HIDDEN = "normal", "disabled", "active", "hidden"
+WORD, CHAR = "word", "char"
+RAISED, SUNKEN, FLAT, RIDGE, GROOVE, SOLID = "raised", "sunken", "flat", "ridge", "groove", "solid"
+HORIZONTAL, VERTICAL = "horizontal", "vertical"
+ALL = "all"
+
+
+class TclError(Exception):
+    pass
+
+
+class Misc:
+    """所有控件和根窗口共用的行为"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, master=None, **kw):
+        self.master = master
+        self.children = []
+        self.options = dict(kw)
+        self.bindings = {}
+        self.destroyed = False
+        self.manager = None
+        self.name = f"w{next(self._ids)}"
+        if master is not None:
+            master.children.append(self)
+
+    # 属性
+    def configure(self, cnf=None, **kw):
+        self._check_alive()
+        if cnf:
+            kw.update(cnf)
+        self.options.update(kw)
+
+    config = configure
+
+    def cget(self, key):
+        return self.options.get(key, "")
+
+    def __getitem__(self, key):
+        return self.cget(key)
+
+    def __setitem__(self, key, value):
+        self.configure(**{key: value})
+
+    def keys(self):
+        return list(self.options)
+
+    # 布局
+    def pack(self, **kw):
+        self._check_alive()
+        self.manager = ("pack", kw)
+
+    def grid(self, **kw):
+        self._check_alive()
+        self.manager = ("grid", kw)
+
+    def place(self, **kw):
+        self._check_alive()
+        self.manager = ("place", kw)
+
+    def pack_forget(self):
+        self.manager = None
+
+    grid_forget = place_forget = pack_forget
+
+    def pack_propagate(self, flag=None):
+        pass
+
+    grid_propagate = pack_propagate
+
+    def grid_columnconfigure(self, index, **kw):
+        pass
+
+    columnconfigure = rowconfigure = grid_rowconfigure = grid_columnconfigure
+
+    # 事件
+    def bind(self, sequence=None, func=None, add=None):
+        if func is not None:
+            self.bindings.setdefault(sequence, []).append(func)
+        return sequence
+
+    def unbind(self, sequence, funcid=None):
+        self.bindings.pop(sequence, None)
+
+    def bind_all(self, sequence=None, func=None, add=None):
+        return self._root().bind(sequence, func, add)
+
+    def event_generate(self, sequence, **kw):
+        """模拟触发事件：依次调用本控件及根窗口上绑定的回调"""
+        event = Event(widget=self, **kw)
+        for target in (self, self._root()) if self is not self._root() else (self,):
+            for func in list(target.bindings.get(sequence, [])):
+                if func(event) == "break":
+                    return
+
+    def focus_set(self):
+        self._root().focus_widget = self
+
+    focus = focus_set
+
+    def focus_get(self):
+        return self._root().focus_widget
+
+    # 定时任务交给根窗口的虚拟时钟
+    def after(self, ms, func=None, *args):
+        return self._root().after(ms, func, *args)
+
+    def after_idle(self, func, *args):
+        return self._root().after_idle(func, *args)
+
+    def after_cancel(self, after_id):
+        return self._root().after_cancel(after_id)
+
+    def update(self):
+        self._root().update()
+
+    def update_idletasks(self):
+        self._root().update_idletasks()
+
+    # 查询
+    def winfo_children(self):
+        return list(self.children)
+
+    def winfo_exists(self):
+        return not self.destroyed
+
+    def winfo_width(self):
+        return int(self.options.get("width", 0) or 800)
+
+    def winfo_height(self):
+        return int(self.options.get("height", 0) or 600)
+
+    def winfo_toplevel(self):
+        return self._root()
+
+    def winfo_ismapped(self):
+        return self.manager is not None
+
+    def destroy(self):
+        for child in list(self.children):
+            child.destroy()
+        self.destroyed = True
+        if self.master is not None and self in self.master.children:
+            self.master.children.remove(self)
+
+    def _root(self):
+        widget = self
+        while widget.master is not None:
+            widget = widget.master
+        return widget
+
+    def _check_alive(self):
+        if self.destroyed:
+            raise TclError(f'invalid command name ".{self.name}"')
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.options.get('text', '')!r}>"
+
+
+class Event:
+    def __init__(self, widget=None, **kw):
+        self.widget = widget
+        self.keysym = kw.get("keysym", "")
+        self.char = kw.get("char", "")
+        self.x = kw.get("x", 0)
+        self.y = kw.get("y", 0)
+        self.delta = kw.get("delta", 0)
+        self.num = kw.get("num", 0)
+        self.state = kw.get("state", 0)
+        self.width = kw.get("width", 0)
+        self.height = kw.get("height", 0)
+        self.__dict__.update(kw)
+
+
+class Tk(Misc):
+    """根窗口：维护虚拟时钟和定时任务队列"""
+
+    def __init__(self, *args, **kw):
+        super().__init__(None)
+        self.now = 0  # 虚拟时钟（毫秒）
+        self.tasks = {}  # after ID -> (到期时间, 序号, 回调, 参数)
+        self.idle_tasks = []
+        self.task_counter = itertools.count(1)
+        self.focus_widget = None
+        self.quit_called = False
+
+    def title(self, text=None):
+        if text is not None:
+            self.options["title"] = text
+        return self.options.get("title", "")
+
+    def geometry(self, spec=None):
+        if spec is not None:
+            self.options["geometry"] = spec
+        return self.options.get("geometry", "")
+
+    def protocol(self, name=None, func=None):
+        pass
+
+    def withdraw(self):
+        pass
+
+    def deiconify(self):
+        pass
+
+    def after(self, ms, func=None, *args):
+        if func is None:
+            self.advance(ms)
+            return None
+        seq = next(self.task_counter)
+        after_id = f"after#{seq}"
+        self.tasks[after_id] = (self.now + int(ms), seq, func, args)
+        return after_id
+
+    def after_idle(self, func, *args):
+        seq = next(self.task_counter)
+        after_id = f"idle#{seq}"
+        self.idle_tasks.append((after_id, func, args))
+        return after_id
+
+    def after_cancel(self, after_id):
+        self.tasks.pop(after_id, None)
+        self.idle_tasks = [task for task in self.idle_tasks if task[0] != after_id]
+
+    def pending(self):
+        """待执行的定时任务数"""
+        return len(self.tasks) + len(self.idle_tasks)
+
+    def update_idletasks(self):
+        while self.idle_tasks:
+            _, func, args = self.idle_tasks.pop(0)
+            func(*args)
+
+    def update(self):
+        self.update_idletasks()
+        self._run_due()
+
+    def advance(self, ms):
+        """推进虚拟时钟，依次执行到期的定时任务"""
+        target = self.now + int(ms)
+        while True:
+            self.update_idletasks()
+            due = [(when, seq, after_id) for after_id, (when, seq, _, _) in self.tasks.items() if when <= target]
+            if not due:
+                break
+            when, _, after_id = min(due)
+            self.now = max(self.now, when)
+            _, _, func, args = self.tasks.pop(after_id)
+            func(*args)
+        self.now = target
+        self.update_idletasks()
+
+    def _run_due(self):
+        self.advance(0)
+
+    def mainloop(self, n=0):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+    def destroy(self):
+        self.tasks.clear()
+        self.idle_tasks.clear()
+        super().destroy()
+
+
+Toplevel = type("Toplevel", (Misc,), {"title": Tk.title, "geometry": Tk.geometry,
+                                      "protocol": Tk.protocol, "withdraw": Tk.withdraw,
+                                      "transient": lambda self, master=None: None,
+                                      "grab_set": lambda self: None})
+
+
+class Widget(Misc):
+    pass
+
+
+class Frame(Widget):
+    pass
+
+
+class LabelFrame(Widget):
+    pass
+
+
+class Label(Widget):
+    pass
+
+
+class Message(Widget):
+    pass
+
+
+class Button(Widget):
+    def invoke(self):
+        self._check_alive()
+        if self.options.get("state") == DISABLED:
+            return None
+        command = self.options.get("command")
+        return command() if command else None
+
+
+class Variable:
+    _default = ""
+
+    def __init__(self, master=None, value=None, name=None):
+        self._value = self._default if value is None else value
+        self._traces = []
+
+    def get(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+        for callback in list(self._traces):
+            callback("", "", "write")
+
+    def trace_add(self, mode, callback):
+        self._traces.append(callback)
+        return str(len(self._traces))
+
+    def trace_remove(self, mode, cbname):
+        pass
+
+
+class StringVar(Variable):
+    _default = ""
+
+
+class IntVar(Variable):
+    _default = 0
+
+    def get(self):
+        try:
+            return int(self._value)
+        except (TypeError, ValueError):
+            raise TclError(f'expected integer but got "{self._value}"')
+
+
+class DoubleVar(Variable):
+    _default = 0.0
+
+
+class BooleanVar(Variable):
+    _default = False
+
+    def get(self):
+        return bool(self._value)
+
+
+class Checkbutton(Button):
+    def invoke(self):
+        var = self.options.get("variable")
+        if var is not None:
+            var.set(not var.get())
+        return super().invoke()
+
+    def select(self):
+        self.options["variable"].set(True)
+
+    def deselect(self):
+        self.options["variable"].set(False)
+
+
+class Radiobutton(Button):
+    def invoke(self):
+        var = self.options.get("variable")
+        if var is not None:
+            var.set(self.options.get("value"))
+        return super().invoke()
+
+
+class Entry(Widget):
+    def __init__(self, master=None, **kw):
+        super().__init__(master, **kw)
+        self.value = ""
+        var = kw.get("textvariable")
+        if var is not None:
+            self.value = str(var.get())
+
+    def get(self):
+        var = self.options.get("textvariable")
+        return str(var.get()) if var is not None else self.value
+
+    def insert(self, index, text):
+        self.value = self.value + str(text) if index in (END, "end") else str(text) + self.value
+
+    def delete(self, first, last=None):
+        self.value = ""
+
+    def icursor(self, index):
+        pass
+
+    def select_range(self, start, end):
+        pass
+
+
+class Spinbox(Entry):
+    pass
+
+
+class Text(Widget):
+    def __init__(self, master=None, **kw):
+        super().__init__(master, **kw)
+        self.content = ""
+        self.tags = {}
+
+    def insert(self, index, text, *tags):
+        self._check_alive()
+        if self.options.get("state") == DISABLED:
+            return
+        self.content += str(text)
+
+    def get(self, start="1.0", end=END):
+        return self.content + "\n"
+
+    def delete(self, start, end=None):
+        if self.options.get("state") == DISABLED:
+            return
+        self.content = ""
+
+    def see(self, index):
+        pass
+
+    def tag_configure(self, name, **kw):
+        self.tags[name] = kw
+
+    tag_config = tag_configure
+
+    def tag_add(self, name, *indices):
+        pass
+
+    def yview(self, *args):
+        return (0.0, 1.0)
+
+    def xview(self, *args):
+        return (0.0, 1.0)
+
+    def index(self, index):
+        return f"{self.content.count(chr(10)) + 1}.0"
+
+
+class Scrollbar(Widget):
+    def set(self, first, last):
+        self.options["position"] = (first, last)
+
+
+class Listbox(Widget):
+    def __init__(self, master=None, **kw):
+        super().__init__(master, **kw)
+        self.items = []
+
+    def insert(self, index, *items):
+        self.items.extend(items)
+
+    def delete(self, first, last=None):
+        self.items = []
+
+    def get(self, first, last=None):
+        return self.items[first]
+
+    def size(self):
+        return len(self.items)
+
+    def curselection(self):
+        return ()
+
+
+class Menu(Widget):
+    def __init__(self, master=None, **kw):
+        super().__init__(master, **kw)
+        self.entries = []
+
+    def add_command(self, **kw):
+        self.entries.append(("command", kw))
+
+    def add_radiobutton(self, **kw):
+        self.entries.append(("radiobutton", kw))
+
+    def add_checkbutton(self, **kw):
+        self.entries.append(("checkbutton", kw))
+
+    def add_separator(self, **kw):
+        self.entries.append(("separator", kw))
+
+    def add_cascade(self, **kw):
+        self.entries.append(("cascade", kw))
+
+    def invoke(self, index):
+        if isinstance(index, str):
+            index = next(i for i, (_, kw) in enumerate(self.entries) if kw.get("label") == index)
+        command = self.entries[index][1].get("command")
+        return command() if command else None
+
+    def delete(self, first, last=None):
+        self.entries = []
+
+    def post(self, x, y):
+        pass
+
+
+class Menubutton(Button):
+    pass
+
+
+class Canvas(Widget):
+    """画布：只记录图元，支持坐标查询和滚动区域"""
+
+    def __init__(self, master=None, **kw):
+        super().__init__(master, **kw)
+        self.items = {}
+        self.item_ids = itertools.count(1)
+        self.y_offset = 0.0
+
+    def _create(self, kind, coords, kw):
+        item_id = next(self.item_ids)
+        if len(coords) == 1 and isinstance(coords[0], (list, tuple)):
+            coords = tuple(coords[0])
+        self.items[item_id] = {"type": kind, "coords": list(coords), "options": dict(kw)}
+        return item_id
+
+    def create_text(self, *coords, **kw):
+        return self._create("text", coords, kw)
+
+    def create_rectangle(self, *coords, **kw):
+        return self._create("rectangle", coords, kw)
+
+    def create_line(self, *coords, **kw):
+        return self._create("line", coords, kw)
+
+    def create_window(self, *coords, **kw):
+        return self._create("window", coords, kw)
+
+    def create_image(self, *coords, **kw):
+        return self._create("image", coords, kw)
+
+    def coords(self, item, *coords):
+        if coords:
+            if len(coords) == 1 and isinstance(coords[0], (list, tuple)):
+                coords = tuple(coords[0])
+            self.items[item]["coords"] = list(coords)
+        return self.items[item]["coords"]
+
+    def itemconfigure(self, item, **kw):
+        self.items[item]["options"].update(kw)
+
+    itemconfig = itemconfigure
+
+    def itemcget(self, item, key):
+        return self.items[item]["options"].get(key, "")
+
+    def delete(self, *items):
+        for item in items:
+            if item == ALL:
+                self.items.clear()
+            else:
+                self.items.pop(item, None)
+
+    def move(self, item, dx, dy):
+        coords = self.items[item]["coords"]
+        self.items[item]["coords"] = [c + (dx if i % 2 == 0 else dy) for i, c in enumerate(coords)]
+
+    def find_all(self):
+        return tuple(self.items)
+
+    def find_overlapping(self, x1, y1, x2, y2):
+        return tuple(self.items)
+
+    def find_closest(self, x, y):
+        return tuple(self.items)[:1]
+
+    def bbox(self, *items):
+        return (0, 0, self.winfo_width(), self.winfo_height())
+
+    def tag_bind(self, tag, sequence=None, func=None, add=None):
+        self.bind(f"{tag}:{sequence}", func)
+
+    def canvasx(self, x):
+        return x
+
+    def canvasy(self, y):
+        return y + self.y_offset
+
+    def yview(self, *args):
+        return (0.0, 1.0)
+
+    def yview_moveto(self, fraction):
+        pass
+
+    def yview_scroll(self, number, what):
+        pass
+
+    xview = yview
+    xview_moveto = yview_moveto
+
+
+class PhotoImage:
+    def __init__(self, *args, **kw):
+        self.options = kw
+
+    def width(self):
+        return int(self.options.get("width", 0))
+
+    def height(self):
+        return int(self.options.get("height", 0))
+
+
+# ttk
+class Treeview(Widget):
+    def __init__(self, master=None, **kw):
+        super().__init__(master, **kw)
+        self.rows = {}
+        self.order = []
+        self.ids = itertools.count(1)
+        self.selected = ()
+
+    def heading(self, column, **kw):
+        self.options.setdefault("headings", {}).setdefault(column, {}).update(kw)
+
+    def column(self, column, **kw):
+        self.options.setdefault("columns_cfg", {}).setdefault(column, {}).update(kw)
+
+    def insert(self, parent, index, iid=None, **kw):
+        iid = iid or f"I{next(self.ids):03X}"
+        self.rows[iid] = dict(kw, parent=parent)
+        self.order.append(iid)
+        return iid
+
+    def item(self, iid, option=None, **kw):
+        if kw:
+            self.rows[iid].update(kw)
+        return self.rows[iid] if option is None else self.rows[iid].get(option)
+
+    def delete(self, *items):
+        for iid in items:
+            self.rows.pop(iid, None)
+            if iid in self.order:
+                self.order.remove(iid)
+
+    def parent(self, item):
+        return self.rows[item]["parent"] if item in self.rows else ""
+
+    def get_children(self, item=""):
+        return tuple(self.order)
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, items):
+        self.selected = tuple(items) if isinstance(items, (list, tuple)) else (items,)
+
+    def focus(self, item=None):
+        return self.selected[0] if self.selected else ""
+
+    def see(self, item):
+        pass
+
+    def identify_row(self, y):
+        return ""
+
+    def yview(self, *args):
+        return (0.0, 1.0)
+
+
+class Combobox(Entry):
+    def current(self, index=None):
+        return 0
+
+    def set(self, value):
+        self.value = str(value)
+
+
+class Style:
+    def __init__(self, *args, **kw):
+        pass
+
+    def configure(self, style, **kw):
+        pass
+
+    def theme_use(self, name=None):
+        return "default"
+
+
+class Progressbar(Widget):
+    pass
+
+
+class ScrolledText(Text):
+    pass
+
+
+class Dialogs:
+    """messagebox / filedialog 替身：记录调用，并按预设返回值回答"""
+
+    def __init__(self):
+        self.calls = []
+        self.answers = {}  # 函数名 -> 返回值
+
+    def make(self, name, default):
+        def dialog(*args, **kw):
+            self.calls.append((name, args, kw))
+            return self.answers.get(name, default)
+        return dialog
+
+
+DIALOGS = Dialogs()
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def install():
+    """用本模块替换 tkinter（必须在导入 刷题界面 之前调用），返回替身模块"""
+    this = sys.modules[__name__]
+    tk_module = _module("tkinter", **{k: v for k, v in vars(this).items() if not k.startswith("_")})
+    ttk = _module("tkinter.ttk", Treeview=Treeview, Scrollbar=Scrollbar, Frame=Frame, Label=Label, Button=Button,
+                  Entry=Entry, Combobox=Combobox, Style=Style, Progressbar=Progressbar, Checkbutton=Checkbutton,
+                  Radiobutton=Radiobutton, Spinbox=Spinbox, LabelFrame=LabelFrame)
+    messagebox = _module("tkinter.messagebox",
+                         showinfo=DIALOGS.make("showinfo", "ok"),
+                         showwarning=DIALOGS.make("showwarning", "ok"),
+                         showerror=DIALOGS.make("showerror", "ok"),
+                         askyesno=DIALOGS.make("askyesno", True),
+                         askokcancel=DIALOGS.make("askokcancel", True),
+                         askquestion=DIALOGS.make("askquestion", "yes"))
+    filedialog = _module("tkinter.filedialog",
+                         askopenfilename=DIALOGS.make("askopenfilename", ""),
+                         asksaveasfilename=DIALOGS.make("asksaveasfilename", ""),
+                         askdirectory=DIALOGS.make("askdirectory", ""))
+    scrolledtext = _module("tkinter.scrolledtext", ScrolledText=ScrolledText)
+    simpledialog = _module("tkinter.simpledialog",
+                           askstring=DIALOGS.make("askstring", None),
+                           askinteger=DIALOGS.make("askinteger", None))
+    tk_module.ttk = ttk
+    tk_module.messagebox = messagebox
+    tk_module.filedialog = filedialog
+    tk_module.scrolledtext = scrolledtext
+    tk_module.simpledialog = simpledialog
+
+    sys.modules.update({
+        "tkinter": tk_module,
+        "tkinter.ttk": ttk,
+        "tkinter.messagebox": messagebox,
+        "tkinter.filedialog": filedialog,
+        "tkinter.scrolledtext": scrolledtext,
+        "tkinter.simpledialog": simpledialog,
+    })
+    return tk_module
+
+
+def iter_widgets(widget):
+    """深度优先遍历控件树"""
+    for child in widget.winfo_children():
+        yield child
+        yield from iter_widgets(child)
+
+
+def find_widgets(root, cls=None, text=None, contains=None):
+    """按类型和文字查找控件"""
+    result = []
+    for widget in iter_widgets(root):
+        if cls is not None and not isinstance(widget, cls):
+            continue
+        label = str(widget.options.get("text", ""))
+        if text is not None and label != text:
+            continue
+        if contains is not None and contains not in label:
+            continue
+        result.append(widget)
+    return result
+
+
+def click(root, text):
+    """点击指定文字的按钮"""
+    buttons = find_widgets(root, Button, text=text)
+    if not buttons:
+        raise LookupError(f"找不到按钮: {text}")
+    return buttons[0].invoke()
@@ -0,0 +1,427 @@
+"""
+文档题库导入工具
+
+用法:
+    python import_sources.py                          # 导入所有科目下的 docx/doc/pdf
+    python import_sources.py 软件工程 计算机组成原理    # 只导入指定科目（或文档文件）
+    python import_sources.py 软件工程/名词解释.docx --dry-run --show 5   # 只提取并打印前 5 题，不写文件
+    python import_sources.py --force                  # 忽略哈希，全部重新导入
+
+从文档中按题号、题型小标题、选项行、“答案：”行、括号内答案、“✓”标记和“名词 + 缩进释义”等常见排版提取题目，
+经 bank_tool 规范化后写成编译题库（<文档名>.qbank，与 xlsx 的编译缓存格式相同），刷题界面即可把文档当作题库使用。
+没有答案的题目会被丢弃。多个文档并行处理；文档内容哈希和导入器版本都没变时不会重新提取。
+有文档导入失败时以退出码 1 结束。
+
+依赖:
+    docx  标准库直接解析
+    pdf   需要 pypdf（pip install pypdf），只支持带文字层的 PDF
+    doc   需要命令行工具 antiword 或 catdoc，或先另存为 docx
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import hashlib
+import zipfile
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+
+import 刷题界面 as app
+import bank_tool
+
+IMPORTER_VERSION = 2  # 提取规则变化时加一，已导入的文档会重新提取（2：编译题库中保存内容 ID）
+HEADERS = ["题型", "问题", "答案", "选项"]
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+MATH_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/math}"
+
+# 小标题中的关键字 -> 题型（按顺序匹配，“多项选择”要排在“选择”前面）
+SECTION_KEYWORDS = [
+    ("多项选择", "多选题"), ("不定项", "多选题"), ("多选", "多选题"),
+    ("单项选择", "选择题"), ("单选", "选择题"), ("选择", "选择题"),
+    ("判断", "判断题"), ("是非", "判断题"), ("填空", "填空题"),
+    ("名词解释", "名词解释"), ("概念解释", "名词解释"),
+    ("简答", "简答题"), ("问答", "简答题"), ("思考", "简答题"), ("论述", "简答题"),
+    ("计算", "解答题"), ("解答", "解答题"), ("综合", "解答题"), ("分析", "解答题"), ("程序", "解答题"),
+    ("编程", "解答题"), ("设计", "解答题"),
+]
+SUBJECTIVE_SECTIONS = {"简答题", "解答题", "名词解释"}
+
+HEADING_PREFIX_RE = re.compile(r"^(?:[一二三四五六七八九十]+|\d+)\s*[、.．]?\s*")
+CHAPTER_RE = re.compile(r"^第\s*[一二三四五六七八九十百\d]+\s*[章节部分单元]")
+NUMBER_RE = re.compile(r"^(?:第\s*(\d+)\s*题|[(（]\s*(\d+)\s*[)）]|(\d+)(?:\.\d+)?\s*[.．、:：)）](?!\d)|\d+\.(\d+)(?=\D))\s*")
+TYPE_TAG_RE = re.compile(r"^[(（\[【]\s*([^()（）\[\]【】]{2,6}题)\s*[)）\]】]\s*")
+ANSWER_RE = re.compile(r"^(?:参考答案|正确答案|标准答案|答案|答)\s*[:：]\s*")
+CHECKED_RE = re.compile(r"^[✓✔√]\s*")
+OPTION_START_RE = re.compile(r"^[A-H]\s*[.．、:：)）]")
+INLINE_RE = re.compile(r"（\s*([^（）\n]*?)\s*）|\(\s+([^()\n]*?)\s+\)|\(\s*([A-H]{1,4}|√|×)\s*\)")
+PADDED_RE = re.compile(r"[（(]\s+[^（）()\n]+?[）)]|[（(][^（）()\n]+?\s+[）)]")  # 答案两侧留空的括号
+BLANK_RE = re.compile(r"_{3,}|（\s*）|\(\s*\)")
+TERM_DEFINITION_RE = re.compile(r"^([^：:，。,；;？?]{1,30})[：:]\s*(.+)$")
+SENTENCE_END = "。？?！!；;：:，,"
+ASK_RE = re.compile(r"^(?:简述|简要|试述|试说明|说明|论述|阐述|解释|比较|分析|描述|列举|写出|请)")
+TERM_RE = re.compile(r"[\w\u4e00-\u9fff \-—·/（）()]+")  # 名词解释的词条只含文字，排除代码行
+
+JUDGE_ANSWERS = bank_tool.TRUE_ANSWERS | bank_tool.FALSE_ANSWERS | {"T", "F"}
+
+
+def file_hash(path):
+    """文档内容的 SHA-1"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def docx_lines(path):
+    """按段落读取 docx 文本（含表格和公式中的文字）"""
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    lines = []
+    for paragraph in root.iter(WORD_NS + "p"):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag in (WORD_NS + "t", MATH_NS + "t"):
+                parts.append(node.text or "")
+            elif node.tag == WORD_NS + "tab":
+                parts.append(" ")
+            elif node.tag in (WORD_NS + "br", WORD_NS + "cr"):
+                parts.append("\n")
+        lines.extend("".join(parts).split("\n"))
+    return lines
+
+
+def pdf_lines(path):
+    """读取 PDF 文字层"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("导入 PDF 需要 pypdf: pip install pypdf")
+    reader = PdfReader(path)
+    return [line for page in reader.pages for line in (page.extract_text() or "").splitlines()]
+
+
+def doc_lines(path):
+    """借助 antiword / catdoc 读取旧版 doc"""
+    for tool in (["antiword", "-w", "0"], ["catdoc", "-w"]):
+        if shutil.which(tool[0]):
+            result = subprocess.run(tool + [path], capture_output=True, check=True)
+            return result.stdout.decode("utf-8", errors="replace").splitlines()
+    raise RuntimeError("导入 doc 需要 antiword 或 catdoc，或先另存为 docx")
+
+
+READERS = {".docx": docx_lines, ".pdf": pdf_lines, ".doc": doc_lines}
+
+
+def section_type(line):
+    """识别“一、单项选择题（每题2分）”这类题型小标题，返回题型或 None"""
+    text = HEADING_PREFIX_RE.sub("", line, count=1)
+    text = re.split(r"[（(]", text, maxsplit=1)[0].strip()
+    if not text or len(text) > 12 or text[-1] in SENTENCE_END:
+        return None
+    for keyword, q_type in SECTION_KEYWORDS:
+        if keyword in text and (text.endswith("题") or text.index(keyword) <= 4):
+            return q_type
+    return None
+
+
+def split_option_text(text):
+    """把 "A. xx B. yy C. zz" 按字母顺序拆成选项列表，不是以 A 开头时返回 []"""
+    starts = []
+    pos = 0
+    for letter in app.LETTERS:
+        match = re.compile(rf"(?<![A-Za-z0-9]){letter}\s*[.．、:：)）]").search(text, pos)
+        if not match or (not starts and match.start() > 0):
+            break
+        starts.append(match)
+        pos = match.end()
+    return [text[m.end():starts[i + 1].start() if i + 1 < len(starts) else len(text)].strip()
+            for i, m in enumerate(starts)]
+
+
+def inline_answers(stem):
+    """取出题干括号中的答案，返回 (挖空后的题干, [答案, ...])"""
+    answers = []
+
+    def blank(match):
+        value = next(group for group in match.groups() if group is not None).strip()
+        if not value or set(value) <= set("_＿ 　"):
+            return match.group(0)
+        answers.append(value)
+        return "（ ）"
+
+    return INLINE_RE.sub(blank, stem), answers
+
+
+class Draft:
+    """提取中的一道题"""
+
+    def __init__(self, stem, number=None, q_type=None):
+        self.number = number
+        self.type = q_type
+        self.stem = [stem] if stem else []
+        self.options = []
+        self.answer = []
+        self.checked = False  # 答案来自“✓ 选项文字”行
+
+    def open_answer(self, section):
+        """题干是问句、没有选项的主观题，后续段落都视为答案"""
+        if self.options or not self.stem:
+            return False
+        stem = self.stem[-1].rstrip()
+        if self.number is None:
+            return stem[-1:] in "？?"  # 不带题号时只认问句，避免把普通段落连成一题
+        q_type = self.type or section
+        if q_type in SUBJECTIVE_SECTIONS:
+            return True
+        if q_type is not None or BLANK_RE.search(stem) or inline_answers(stem)[1]:
+            return False
+        return stem[-1:] in "？?" or bool(ASK_RE.match(self.stem[0]))
+
+    def to_record(self, section):
+        """整理成 bank_tool 能规范化的记录，没有答案时返回 None"""
+        stem = "\n".join(self.stem).strip()
+        options = split_option_text(" ".join(self.options))
+        answer = (" | " if self.checked else "\n").join(self.answer).strip()
+        q_type = self.type or section
+
+        if options:
+            if not answer:
+                stem, found = inline_answers(stem)
+                answer = next((a for a in found if re.fullmatch(r"[A-Ha-h\s,，、]+", a)), "")
+            letters = re.sub(r"[^A-H]", "", answer.upper())
+            if q_type not in ("选择题", "多选题"):
+                q_type = "多选题" if len(letters) > 1 and letters == answer.upper().replace(" ", "") else "选择题"
+            record = {"题型": q_type, "问题": stem, "答案": answer, "选项": bank_tool.format_options(options)}
+        else:
+            definition = TERM_DEFINITION_RE.match(stem) if q_type == "名词解释" and not answer else None
+            if definition:
+                stem, answer = definition.group(1).strip(), definition.group(2).strip()
+            elif not answer:
+                if self.number is None and section is None and not PADDED_RE.search(stem):
+                    return None  # 不带题号时只认“（ 答案 ）”这种留空的写法，避免把普通括号当作答案
+                stem, found = inline_answers(stem)
+                if len(re.sub(r"（ ）|\s", "", stem)) < 8:
+                    return None  # 挖空后几乎不剩题干，多半是答案表
+                if q_type in (None, "判断题") and len(found) == 1 and found[0].upper() in JUDGE_ANSWERS:
+                    q_type, answer = "判断题", found[0]
+                elif found and q_type in (None, "填空题", "选择题"):
+                    q_type, answer = "填空题", " | ".join(found)
+            elif self.number is None and not self.checked and len(self.answer[0]) < 15:
+                return None  # 不带题号的问句后面跟着短句，多半是提纲而不是答案
+            elif self.checked and q_type in (None, "选择题", "多选题"):
+                q_type = "填空题"  # 只给出了正确选项的文字
+            elif q_type is None:
+                if answer.upper() in JUDGE_ANSWERS:
+                    q_type = "判断题"
+                elif BLANK_RE.search(stem):
+                    q_type = "填空题"
+                else:
+                    q_type = "简答题"
+            elif q_type in ("选择题", "多选题"):
+                q_type = "填空题"
+            record = {"题型": q_type, "问题": stem, "答案": answer, "选项": None}
+
+        if not record["问题"] or not record["答案"] or not record["题型"]:
+            return None
+        return bank_tool.normalize_row(record)
+
+
+def extract_records(lines):
+    """从文档段落中提取题目记录"""
+    records = []
+    section = None
+    current = None
+    answering = False  # 当前题已进入答案段落
+    pending_term = None  # 可能是名词解释的词条（下一段为缩进释义）
+
+    def finish():
+        nonlocal current, answering
+        if current is not None:
+            record = current.to_record(section)
+            if record is not None:
+                records.append(record)
+        current = None
+        answering = False
+
+    for raw in lines:
+        raw = raw.replace("\xa0", " ")
+        line = raw.strip()
+        if not line:
+            continue
+        term, pending_term = pending_term, None
+
+        q_type = section_type(line)
+        if q_type or CHAPTER_RE.match(line):
+            finish()
+            section = q_type
+            continue
+
+        match = NUMBER_RE.match(line)
+        number = next((int(g) for g in match.groups() if g), None) if match else None
+        if match and answering and (current.number is None or number != current.number + 1):
+            match = None  # 答案里的 (1)(2) 分点
+
+        if match:
+            finish()
+            stem = line[match.end():]
+            tag = TYPE_TAG_RE.match(stem)
+            current = Draft(stem[tag.end():] if tag else stem, number,
+                            bank_tool.canonical_type(tag.group(1)) if tag else None)
+            answering = current.open_answer(section)
+            continue
+
+        answer = ANSWER_RE.match(line) or CHECKED_RE.match(line)
+        if answer and current is not None:
+            current.answer.append(line[answer.end():])
+            current.checked = answer.re is CHECKED_RE
+            answering = current.number is not None and not current.checked  # “✓”行和不带题号的题目答案只有一行
+            continue
+
+        if current is not None and OPTION_START_RE.match(line) and not current.answer:
+            current.options.append(line)
+            answering = False
+            continue
+
+        if term and raw[:1] in " 　\t" and len(line) > len(term) and re.search(r"[\u4e00-\u9fff]", line):
+            finish()
+            records.append(bank_tool.normalize_row({"题型": "名词解释", "问题": term, "答案": line, "选项": None}))
+            continue
+
+        definition = TERM_DEFINITION_RE.match(line) if section == "名词解释" else None
+        if definition:
+            finish()
+            records.append(bank_tool.normalize_row({"题型": "名词解释", "问题": definition.group(1).strip(),
+                                                    "答案": definition.group(2).strip(), "选项": None}))
+            continue
+
+        if answering and not (current.number is None and line[-1] in "？?"):
+            current.answer.append(line)
+        elif current is not None and current.options:
+            current.options.append(line)  # 选项换行
+        elif current is not None and current.number is not None and not current.answer:
+            if not inline_answers("\n".join(current.stem))[1]:
+                current.stem.append(line)  # 题干换行
+                answering = current.open_answer(section)
+            # 题干已带括号答案时，后面的段落是解析，丢弃
+        else:
+            # 不带题号的题目：自成一题，等待后面的答案行（问句则后面的段落都是答案）
+            finish()
+            current = Draft(line)
+            answering = current.open_answer(section)
+            if 2 <= len(line) <= 20 and line[-1] not in SENTENCE_END and TERM_RE.fullmatch(line):
+                pending_term = line
+    finish()
+    return records
+
+
+def extract_questions(path):
+    """提取文档中的题目，返回与 xlsx 解析结果相同结构的题目列表"""
+    lines = READERS[os.path.splitext(path)[1].lower()](path)
+    seen = set()
+    questions = []
+    for record in extract_records(lines):
+        key = bank_tool.dedup_key(record)
+        if key in seen:
+            continue
+        seen.add(key)
+        question = app.row_to_question(HEADERS, [record[h] for h in HEADERS], path, None)
+        if question is not None:
+            questions.append(question)
+    return app.assign_question_ids(questions)  # 与 xlsx 一样随编译题库保存，加载时无需重新计算
+
+
+def import_document(path, force=False, write=True):
+    """导入一个文档（在子进程中执行），返回报告字典"""
+    start = time.perf_counter()
+    report = {"path": path, "status": "", "count": 0}
+    try:
+        header = app.read_compiled_header(path)
+        current = header is not None and header.get("importer") == IMPORTER_VERSION and not force and write
+        if current and header["source"] == app.source_signature(path):
+            report.update(status="未变化", count=header["count"])
+            return report
+
+        digest = file_hash(path)
+        if current and header.get("hash") == digest:
+            # 只是修改时间变了：沿用已提取的题目，刷新签名
+            questions = app.load_compiled_questions(path, check_source=False)
+            if questions is not None:
+                app.write_compiled_questions(path, questions, extra={"hash": digest, "importer": IMPORTER_VERSION})
+                report.update(status="未变化", count=len(questions))
+                return report
+
+        questions = extract_questions(path)
+        if write:
+            app.write_compiled_questions(path, questions, extra={"hash": digest, "importer": IMPORTER_VERSION})
+        report.update(status="已导入" if write else "已提取", count=len(questions), questions=questions)
+    except (RuntimeError, OSError, ValueError, KeyError, zipfile.BadZipFile, subprocess.CalledProcessError) as e:
+        report.update(status="失败", error=str(e))
+    finally:
+        report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def collect_documents(targets):
+    """把科目名 / 目录 / 文档文件展开为文档列表"""
+    if not targets:
+        targets = [entry for entry in os.listdir(app.ROOT_DIR) if os.path.isdir(os.path.join(app.ROOT_DIR, entry))
+                   and not entry.startswith(".") and entry != app.PROGRESS_DIR]
+    documents = []
+    for target in targets:
+        if os.path.isfile(target):
+            documents.append(target)
+            continue
+        directory = target if os.path.isdir(target) else os.path.join(app.ROOT_DIR, target)
+        if not os.path.isdir(directory):
+            print(f"找不到科目或文档: {target}")
+            continue
+        for root, dirs, files in os.walk(directory):
+            documents.extend(os.path.join(root, file) for file in files
+                             if app.is_document_bank(file) and not file.startswith("~$"))
+    return sorted(set(documents))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 docx/doc/pdf 中的题目导入为编译题库")
+    parser.add_argument("targets", nargs="*", help="科目名、目录或文档文件（默认全部科目）")
+    parser.add_argument("--force", action="store_true", help="忽略内容哈希，全部重新提取")
+    parser.add_argument("--dry-run", action="store_true", help="只提取并报告，不写编译题库")
+    parser.add_argument("--show", type=int, default=0, metavar="N", help="打印每个文档提取到的前 N 题")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="并行进程数")
+    args = parser.parse_args()
+
+    documents = collect_documents(args.targets)
+    if not documents:
+        print("没有找到文档")
+        return 1
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs or 1, len(documents)))) as pool:
+        reports = list(pool.map(import_document, documents, [args.force] * len(documents),
+                                [not args.dry_run] * len(documents)))
+
+    imported = failed = total = 0
+    for report in reports:
+        total += report["count"]
+        if "error" in report:
+            failed += 1
+            print(f"[失败] {report['path']}: {report['error']}")
+            continue
+        imported += report["status"] in ("已导入", "已提取")
+        print(f"[{report['status']}] {report['path']}  {report['count']} 题  {report['seconds']:.2f}s")
+        for question in report.get("questions", [])[:args.show]:
+            options = "".join(f"\n        {app.LETTERS[i]}. {opt}" for i, opt in enumerate(question["options"]))
+            print(f"    [{question['题型']}] {question['问题'][:60]}{options}\n        答案: {str(question['答案'])[:60]}")
+
+    print(f"共 {len(reports)} 个文档，重新提取 {imported} 个，失败 {failed} 个，题目 {total} 道，"
+          f"用时 {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
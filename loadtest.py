@@ -0,0 +1,162 @@
+"""
+刷题接口压力测试
+
+用法:
+    python loadtest.py --bank PHP/PHP.xlsx                    # 连接已启动的 server.py
+    python loadtest.py --bank PHP/PHP.xlsx --spawn --users 500  # 在本进程内启动服务再压测
+
+每个模拟用户使用一条 keep-alive 连接：创建会话，循环“取题 -> 随机作答”，最后结束会话。
+使用 --user-prefix 时多个会话共享同一用户的进度文件，可检验并发写入是否丢失作答。
+输出请求吞吐量和延迟分位数。
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+import server
+
+
+class Client:
+    """极简 HTTP/1.1 客户端，复用一条连接"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("utf-8") + body
+        )
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        data = await self.reader.readexactly(length)
+        return status, json.loads(data)
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+async def simulate_user(host, port, bank, answers, latencies, errors, rng, user=None):
+    """一个模拟用户的完整练习流程"""
+    client = Client(host, port)
+
+    async def timed(method, path, payload=None):
+        start = time.perf_counter()
+        status, data = await client.request(method, path, payload)
+        latencies.append(time.perf_counter() - start)
+        if status >= 400:
+            errors.append((status, data.get("error")))
+        return status, data
+
+    try:
+        await client.connect()
+        payload = {"bank": bank, "seed": rng.randrange(2 ** 32)}
+        if user:
+            payload["user"] = user
+        status, data = await timed("POST", "/api/sessions", payload)
+        if status != 201:
+            return
+        session = data["session"]
+
+        for _ in range(answers):
+            status, question = await timed("GET", f"/api/sessions/{session}/question")
+            if status != 200 or question.get("finished"):
+                break
+            options = question.get("options") or []
+            if question["type"] == "多选题":
+                answer = " | ".join(sorted(rng.sample("ABCD", 2)))
+            elif options:
+                answer = "ABCDEFGH"[rng.randrange(min(len(options), 8))]
+            else:
+                answer = "测试答案"
+            await timed("POST", f"/api/sessions/{session}/answer", {"answer": answer})
+
+        await timed("DELETE", f"/api/sessions/{session}")
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        errors.append((0, str(e)))
+    finally:
+        await client.close()
+
+
+async def run(args):
+    server_task = None
+    if args.spawn:
+        ready = asyncio.Event()
+        server_task = asyncio.create_task(server.serve(args.host, args.port, ready))
+        await ready.wait()
+
+    latencies = []
+    errors = []
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.users)
+
+    async def user(n):
+        async with semaphore:
+            await simulate_user(args.host, args.port, args.bank, args.answers, latencies, errors,
+                                random.Random(rng.random()),
+                                f"{args.user_prefix}{n % args.distinct_users}" if args.user_prefix else None)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(n) for n in range(args.users)))
+    elapsed = time.perf_counter() - start
+
+    if server_task:
+        server_task.cancel()
+
+    if not latencies:
+        print("没有成功的请求")
+        return 1
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"模拟用户: {args.users}  每人作答: {args.answers}")
+    print(f"请求总数: {len(latencies)}  失败: {len(errors)}  耗时: {elapsed:.2f}s")
+    print(f"吞吐量: {len(latencies) / elapsed:.1f} 请求/秒")
+    print(f"延迟(ms): 平均 {statistics.fmean(latencies) * 1000:.2f}  p50 {percentile(0.5):.2f}  "
+          f"p95 {percentile(0.95):.2f}  p99 {percentile(0.99):.2f}  最大 {latencies[-1] * 1000:.2f}")
+    if errors:
+        print(f"错误示例: {errors[:5]}")
+    return 1 if errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="刷题接口压力测试")
+    parser.add_argument("--bank", required=True, help="题库路径（相对题库根目录）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--users", type=int, default=200, help="并发模拟用户数")
+    parser.add_argument("--answers", type=int, default=20, help="每个用户作答题数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--user-prefix", help="指定后会话带用户ID（<前缀><序号>），进度写入磁盘")
+    parser.add_argument("--distinct-users", type=int, default=50, help="带用户ID时不同用户的个数（多个会话共享同一用户）")
+    parser.add_argument("--spawn", action="store_true", help="在本进程内启动服务")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+刷题引擎的本地 HTTP/JSON 接口
+
+用法:
+    python server.py                    # 默认监听 127.0.0.1:8765
+    python server.py --port 9000
+
+接口（请求体和返回值均为 JSON）:
+    GET    /api/health                          服务状态
+    GET    /api/subjects                        科目列表
+    GET    /api/banks?subject=科目              科目下的题库文件
+    POST   /api/sessions                        开始练习 {"bank": 题库路径, "filter": "全部", "seed": 可选,
+                                                         "user": 可选，指定后进度保存到该用户名下}
+    GET    /api/sessions/<id>/question          当前题目（不含答案）
+    POST   /api/sessions/<id>/answer            提交答案 {"answer": "A"}，返回判题结果并进入下一题
+    DELETE /api/sessions/<id>                   结束练习
+
+题库只加载一次，所有会话共享；判题直接使用 刷题界面.check_answer。
+指定 user 的会话通过 刷题界面.ProgressStore 批量合并写入进度，与桌面程序共用同一份进度。
+只依赖标准库 asyncio，不需要额外安装 Web 框架。
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import secrets
+from urllib.parse import urlsplit, parse_qs, unquote
+
+import 刷题界面 as app
+
+MAX_BODY = 1024 * 1024  # 请求体大小上限
+SESSION_TTL = 2 * 60 * 60  # 会话闲置超时（秒）
+MAINTENANCE_INTERVAL = 5  # 检查待写盘作答和过期会话的间隔（秒）
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class BankCache:
+    """题库缓存：每个题库只解析一次，并发请求同一题库时只有一个会真正去解析"""
+
+    def __init__(self):
+        self.banks = {}  # 路径 -> 题目列表
+        self.loading = {}  # 路径 -> 正在解析的 Future
+
+    async def get(self, path):
+        if path in self.banks:
+            return self.banks[path]
+
+        if path not in self.loading:
+            loop = asyncio.get_running_loop()
+            self.loading[path] = loop.run_in_executor(
+                None, lambda: app.build_answer_keys(app.parse_question_file(path)))
+        try:
+            questions = await self.loading[path]
+        finally:
+            self.loading.pop(path, None)
+        self.banks[path] = questions
+        return questions
+
+
+class PracticeSession:
+    """一个练习会话：题目顺序、当前位置和作答统计
+
+    匿名会话的进度只保存在内存中；指定用户的会话使用 ProgressStore，由服务在线程池中批量写盘：
+    累计 FLUSH_BATCH_SIZE 次作答、有作答等待超过 FLUSH_INTERVAL 秒（由 maintenance_loop 检查）、会话结束或过期以及服务退出时。
+    """
+
+    def __init__(self, bank, questions, selected_filter="全部", seed=None, user=None):
+        self.bank = bank
+        self.questions = questions
+        self.selected_filter = selected_filter
+        # 写盘时机由服务控制，不在事件循环里同步写文件
+        self.store = app.ProgressStore(bank, user, ids=[q["qid"] for q in questions]) if user else None
+        self.progress = self.store.progress if self.store else app.default_progress()
+        self.question_order = app.build_question_order(questions, self.progress, selected_filter, seed)
+        self.progress["order"] = self.question_order.to_state()
+        self.current_index = 0
+        self.last_active = time.monotonic()
+        self.lock = asyncio.Lock()  # 同一会话的作答与写盘串行执行
+
+    def record(self, q_index, answer, is_correct):
+        if self.store:
+            self.store.record(q_index, answer, is_correct, q_type=self.questions[q_index].get("题型"), auto_flush=False)
+        else:
+            app.apply_answer(self.progress, q_index, answer, is_correct)
+
+    async def flush(self, force=False):
+        """在线程池中把排队的作答写盘（调用方持有 self.lock）；待写的作答和会话信息在事件循环线程中取出副本"""
+        if self.store and self.store.pending and (force or self.store.due()):
+            events, fields = self.store.snapshot()
+            view = await asyncio.get_running_loop().run_in_executor(None, self.store.write_events, events, fields)
+            self.store.finish_flush(events, view)
+
+    def current(self):
+        if self.current_index >= len(self.question_order):
+            return None, None
+        q_index = self.question_order[self.current_index]
+        return q_index, self.questions[q_index]
+
+
+class ExamServer:
+    def __init__(self):
+        self.cache = BankCache()
+        self.sessions = {}
+        self.routes = [
+            ("GET", ("api", "health"), self.health),
+            ("GET", ("api", "subjects"), self.list_subjects),
+            ("GET", ("api", "banks"), self.list_banks),
+            ("POST", ("api", "sessions"), self.create_session),
+            ("GET", ("api", "sessions", None, "question"), self.get_question),
+            ("POST", ("api", "sessions", None, "answer"), self.submit_answer),
+            ("DELETE", ("api", "sessions", None), self.close_session),
+        ]
+
+    # 接口
+    async def health(self, request):
+        return 200, {"status": "ok", "sessions": len(self.sessions), "banks_loaded": len(self.cache.banks)}
+
+    # 扫描科目和题库目录要读磁盘，放到线程池中执行，不阻塞事件循环
+    async def list_subjects(self, request):
+        subjects = await asyncio.get_running_loop().run_in_executor(None, app.scan_subjects)
+        return 200, {"subjects": subjects}
+
+    async def list_banks(self, request):
+        subject = request["query"].get("subject")
+        loop = asyncio.get_running_loop()
+        if not subject or subject not in await loop.run_in_executor(None, app.scan_subjects):
+            raise HTTPError(404, "科目不存在")
+        banks = await loop.run_in_executor(None, app.scan_question_files, subject)
+        return 200, {"subject": subject, "banks": banks}
+
+    async def create_session(self, request):
+        body = request["json"]
+        loop = asyncio.get_running_loop()
+        bank = await loop.run_in_executor(None, self.resolve_bank, body.get("bank"))
+        questions = await self.cache.get(bank)
+        if not questions:
+            raise HTTPError(400, "题库中没有题目")
+
+        selected_filter = body.get("filter", "全部")
+        seed = body.get("seed")
+        if seed is not None and not isinstance(seed, int):
+            raise HTTPError(400, "seed 必须是整数")
+        user = body.get("user")
+        if user is not None and (not isinstance(user, str) or not user.strip()):
+            raise HTTPError(400, "user 必须是非空字符串")
+
+        session = await loop.run_in_executor(None, PracticeSession, bank, questions, selected_filter, seed,
+                                             user and user.strip())
+        session_id = secrets.token_hex(8)
+        self.sessions[session_id] = session
+        return 201, {"session": session_id, "bank": bank, "filter": selected_filter,
+                     "total": len(session.question_order)}
+
+    async def get_question(self, request, session_id):
+        session = self.get_session(session_id)
+        q_index, question = session.current()
+        if question is None:
+            return 200, {"finished": True, **self.session_stats(session)}
+        return 200, {
+            "finished": False,
+            "position": session.current_index,
+            "total": len(session.question_order),
+            "question_index": q_index,
+            "type": question.get("题型", "未知题型"),
+            "question": question.get("问题", ""),
+            "options": question.get("options", []),
+        }
+
+    async def submit_answer(self, request, session_id):
+        session = self.get_session(session_id)
+        answer = request["json"].get("answer")
+        if not isinstance(answer, str):
+            raise HTTPError(400, "answer 必须是字符串")
+
+        async with session.lock:
+            q_index, question = session.current()
+            if question is None:
+                raise HTTPError(400, "练习已完成")
+            is_correct, correct_answer = app.check_answer(question, answer)
+            session.record(q_index, answer, is_correct)
+            session.current_index += 1
+            session.progress["current_index"] = session.current_index
+            await session.flush()
+
+        return 200, {"question_index": q_index, "is_correct": is_correct, "correct_answer": correct_answer,
+                     "finished": session.current_index >= len(session.question_order),
+                     **self.session_stats(session)}
+
+    async def close_session(self, request, session_id):
+        session = self.get_session(session_id)
+        del self.sessions[session_id]
+        async with session.lock:
+            await session.flush(force=True)
+        return 200, self.session_stats(session)
+
+    # 辅助
+    def resolve_bank(self, bank):
+        """只允许访问题库目录下扫描得到的题库文件"""
+        if not isinstance(bank, str) or not bank:
+            raise HTTPError(400, "缺少 bank 参数")
+        path = os.path.normpath(os.path.join(app.ROOT_DIR, bank))
+        subject = os.path.relpath(path, app.ROOT_DIR).split(os.sep)[0]
+        if subject in ("..", ".") or not os.path.isdir(os.path.join(app.ROOT_DIR, subject)):
+            raise HTTPError(404, "题库不存在")
+        banks = {os.path.normpath(p): p for p in app.scan_question_files(subject)}
+        if path not in banks:
+            raise HTTPError(404, "题库不存在")
+        return banks[path]
+
+    def get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, "会话不存在或已过期")
+        session.last_active = time.monotonic()
+        return session
+
+    @staticmethod
+    def session_stats(session):
+        progress = session.progress
+        return {"answered": len(progress["answered"]), "correct_count": progress["correct_count"],
+                "wrong_count": progress["wrong_count"], "wrong_questions": len(progress["wrong_questions"])}
+
+    async def expire_sessions(self):
+        deadline = time.monotonic() - SESSION_TTL
+        for session_id in [k for k, s in self.sessions.items() if s.last_active < deadline]:
+            session = self.sessions.pop(session_id)
+            async with session.lock:
+                await session.flush(force=True)
+
+    async def flush_all(self, force=True):
+        """把各会话排队的作答写盘，force=False 时只写达到批量或等待时间条件的会话"""
+        for session in list(self.sessions.values()):
+            async with session.lock:
+                await session.flush(force=force)
+
+    async def maintenance_loop(self):
+        """定期写盘等待过久的作答并清理过期会话，作答少于一批就离开的用户也不会把作答留在内存中"""
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+            await self.flush_all(force=False)
+            await self.expire_sessions()
+
+    # HTTP
+    def route(self, method, path):
+        parts = tuple(unquote(p) for p in path.strip("/").split("/") if p)
+        path_matched = False
+        for route_method, pattern, handler in self.routes:
+            if len(pattern) != len(parts) or any(p is not None and p != part for p, part in zip(pattern, parts)):
+                continue
+            path_matched = True
+            if route_method == method:
+                return handler, [part for p, part in zip(pattern, parts) if p is None]
+        raise HTTPError(405 if path_matched else 404, "不支持的请求" if path_matched else "接口不存在")
+
+    async def handle_request(self, method, target, headers, body):
+        url = urlsplit(target)
+        request = {
+            "method": method,
+            "path": url.path,
+            "query": {k: v[0] for k, v in parse_qs(url.query).items()},
+            "headers": headers,
+            "json": {},
+        }
+        try:
+            if body:
+                try:
+                    request["json"] = json.loads(body)
+                except ValueError:
+                    raise HTTPError(400, "请求体不是合法的 JSON")
+                if not isinstance(request["json"], dict):
+                    raise HTTPError(400, "请求体必须是 JSON 对象")
+            handler, args = self.route(method, url.path)
+            return await handler(request, *args)
+        except HTTPError as e:
+            return e.status, {"error": e.message}
+        except Exception as e:
+            return 500, {"error": f"服务器内部错误: {e}"}
+
+    async def handle_connection(self, reader, writer):
+        """处理一个连接，支持 HTTP/1.1 keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0) or 0)
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "请求体过大"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.handle_request(method.upper(), target, headers, body)
+                    keep_alive = (headers.get("connection", "").lower() != "close"
+                                  and version.upper() == "HTTP/1.1")
+
+                data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, ready=None):
+    """启动服务；ready 为可选的 asyncio.Event，监听成功后设置"""
+    exam_server = ExamServer()
+    server = await asyncio.start_server(exam_server.handle_connection, host, port, backlog=1024)
+    maintenance_task = asyncio.create_task(exam_server.maintenance_loop())
+    addresses = ", ".join(str(sock.getsockname()[:2]) for sock in server.sockets)
+    print(f"刷题服务已启动: {addresses}")
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        maintenance_task.cancel()
+        await exam_server.flush_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="刷题引擎本地 HTTP/JSON 接口")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（默认只允许本机访问）")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--root", default=app.ROOT_DIR, help="题库根目录")
+    args = parser.parse_args()
+
+    app.ROOT_DIR = args.root
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""
+刷题界面无界面测试与渲染吞吐量基准
+
+用法:
+    python ui_harness.py                           # 使用 fake_tk 替身，1k/10k 两档合成题库
+    python ui_harness.py --sizes 1000 100000 --count 500
+    xvfb-run -a python ui_harness.py --backend tk  # 真实 Tk（需要 X 显示，可配合 Xvfb 使用）
+    python ui_harness.py --no-memory               # 不跟踪内存分配，吞吐量更接近真实值
+    python ui_harness.py --output harness.json     # 结果另存为 JSON
+
+按用户操作的顺序驱动 ExamApp：select_file 打开合成题库，逐题 check_answer_wrapper（每 WRONG_EVERY 题答错一次）
+并 next_question，再对每种题型 apply_type_filter，最后核对写盘的进度。每一步都检查界面状态和进度，
+另外检查旧版进度迁移后移动题库仍能接收原进度、整理进度目录时跳过无法读取的进度，
+填空题错字容差不接受只差否定字的作答，以及 bank_tool 重复整理题库不会改动选项内容、整理后进度仍对应原题。
+报告每秒题数和峰值内存；任一检查失败时以退出码 1 结束，可以直接放在没有显示器的 CI 上运行。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import struct
+import zlib
+import argparse
+import tempfile
+import tracemalloc
+
+import openpyxl
+
+import fake_tk
+
+DEFAULT_SIZES = [1000, 10000]
+DEFAULT_COUNT = 300  # 每个题库作答的题数
+WRONG_EVERY = 5  # 每隔几题故意答错一次，覆盖判错分支
+FILTER_SAMPLE = 200  # 每种题型筛选后检查题目顺序中的前多少题
+
+# 在 main 中按后端导入（fake_tk 必须在导入 刷题界面 之前安装）
+tk = None
+app = None
+benchmark = None
+bank_tool = None
+
+
+class Checker:
+    """收集检查结果：失败不中断后续步骤，最后统一报告"""
+
+    def __init__(self):
+        self.passed = 0
+        self.failures = []
+
+    def check(self, condition, message):
+        if condition:
+            self.passed += 1
+        else:
+            self.failures.append(message)
+        return condition
+
+
+def correct_answer(question):
+    """按作答界面的提交格式构造正确答案：选择题为选项字母，多选题为 "A | C"，其他题型为答案原文"""
+    handler = app.type_handler(question)
+    if isinstance(handler, app.ChoiceType) and question.get("options"):
+        return " | ".join(handler.correct_letters(question))
+    return str(question.get("答案", ""))
+
+
+def pump(root):
+    """处理空闲回调（界面布局），真实 Tk 下相当于一帧绘制完成"""
+    root.update_idletasks()
+
+
+def answer_questions(exam, count, checker):
+    """逐题作答并进入下一题，返回 (作答耗时秒数, 内容 ID -> 是否答对)"""
+    expected = {}
+    seconds = 0.0
+    for i in range(count):
+        question = exam.current_question
+        q_index = exam.question_order[exam.current_index]
+        q_type = question.get("题型")
+        wrong = i % WRONG_EVERY == WRONG_EVERY - 1
+        answer = benchmark.wrong_answer_for(question) if wrong else correct_answer(question)
+
+        start = time.perf_counter()
+        exam.check_answer_wrapper(answer)
+        result = exam.result_label.cget("text")
+        exam.next_question()
+        pump(exam.root)
+        seconds += time.perf_counter() - start
+
+        checker.check(result.startswith("✗" if wrong else "✓"), f"第 {i + 1} 题（{q_type}）判分错误: {answer!r} -> {result}")
+        record = exam.progress["answered"].get(str(q_index))
+        checker.check(record is not None and record["is_correct"] == (not wrong) and record["user_answer"] == answer,
+                      f"第 {i + 1} 题（{q_type}）的作答没有记入进度: {record}")
+        checker.check(exam.current_index == i + 1, f"next_question 后位置应为 {i + 1}，实际 {exam.current_index}")
+        if exam.current_index < len(exam.question_order):
+            checker.check(exam.current_question is exam.questions[exam.question_order[exam.current_index]],
+                          f"第 {i + 2} 题显示的不是题目顺序中的题目")
+        expected[question["qid"]] = not wrong
+    return seconds, expected
+
+
+def filter_types(exam, checker):
+    """依次筛选每种题型，返回每次筛选（重新生成顺序并显示第一题）的耗时"""
+    questions = exam.questions
+    answered = exam.progress["answered"]
+    samples = {}
+    for q_type in exam.filter_types[1:]:
+        start = time.perf_counter()
+        exam.apply_type_filter(q_type)
+        pump(exam.root)
+        samples[q_type] = time.perf_counter() - start
+
+        # 答对的题不再出现；该题型全部答对时从头练习
+        same_type = [i for i, q in enumerate(questions) if q.get("题型", "未知题型") == q_type]
+        remaining = [i for i in same_type if not (answered.get(str(i)) or {}).get("is_correct")]
+        order = exam.question_order
+        checker.check(len(order) == len(remaining or same_type),
+                      f"筛选 {q_type} 后应有 {len(remaining or same_type)} 题，实际 {len(order)}")
+        checker.check(all(questions[order[i]].get("题型") == q_type for i in range(min(FILTER_SAMPLE, len(order)))),
+                      f"筛选 {q_type} 后的题目顺序中混入了其他题型")
+        checker.check(exam.current_index == 0 and exam.current_question.get("题型") == q_type,
+                      f"筛选 {q_type} 后应从该题型的第一题开始")
+
+    exam.apply_type_filter("全部")
+    checker.check(len(exam.question_order) > 0 and exam.selected_filter == "全部", "取消筛选后应恢复全部题目")
+    return samples
+
+
+def check_saved_progress(exam, expected, checker):
+    """写盘后按内容 ID 核对进度文件"""
+    exam.flush_progress()
+    saved = app.load_progress(exam.selected_file, exam.user)
+    checker.check(saved.get("schema") == app.PROGRESS_SCHEMA, "进度文件应按内容 ID 保存")
+    answered = saved.get("answered", {})
+    checker.check(set(answered) == set(expected), f"进度文件记录了 {len(answered)} 题，应为 {len(expected)} 题")
+    checker.check(all(answered.get(qid, {}).get("is_correct") == ok for qid, ok in expected.items()),
+                  "进度文件中的对错与作答不一致")
+    wrong = {qid for qid, ok in expected.items() if not ok}
+    checker.check(set(saved.get("wrong_questions", [])) == wrong,
+                  f"错题本应有 {len(wrong)} 题，实际 {len(saved.get('wrong_questions', []))}")
+    checker.check(saved.get("correct_count") == len(expected) - len(wrong) and saved.get("wrong_count") == len(wrong),
+                  "进度文件中的答对 / 答错计数不正确")
+
+
+def check_progress_migration(work_dir, checker):
+    """旧版进度（按题目序号、没有单题统计）迁移后移动题库，重新打开时应接收原进度"""
+    app.PROGRESS_DIR = os.path.join(work_dir, "progress_migration")
+    old_path = benchmark.generate_bank(os.path.join(work_dir, "migration_old.xlsx"), 50, seed=1)
+    now = time.time()
+    legacy = {"total_questions": 50, "current_index": 0, "correct_count": 1, "wrong_count": 1, "wrong_questions": [1],
+              "answered": {"0": {"user_answer": "A", "is_correct": True, "timestamp": now},
+                           "1": {"user_answer": "B", "is_correct": False, "timestamp": now}}}
+    legacy_file = app.legacy_progress_path(app.get_progress_file_path(old_path))
+    with open(legacy_file, "w", encoding="utf-8") as f:
+        json.dump(legacy, f, ensure_ascii=False)
+
+    migrated = app.ProgressStore(old_path).progress
+    checker.check(len(migrated["answered"]) == 2 and migrated["wrong_questions"] == [1], "旧版进度迁移后作答记录不完整")
+
+    new_path = os.path.join(work_dir, "migration_new.xlsx")
+    os.replace(old_path, new_path)
+    adopted = app.ProgressStore(new_path).progress
+    checker.check(len(adopted["answered"]) == 2 and adopted["wrong_questions"] == [1],
+                  f"移动题库后应接收 2 条作答 / 1 道错题，实际 {len(adopted['answered'])} / {len(adopted['wrong_questions'])}")
+    checker.check(adopted["correct_count"] == 1 and adopted["wrong_count"] == 1, "移动题库后答对 / 答错计数不正确")
+    checker.check(not app.progress_exists(app.get_progress_file_path(old_path)), "已接收的原题库进度应删除")
+
+    # 没有可接收进度的题库只扫描一次进度目录
+    empty_path = benchmark.generate_bank(os.path.join(work_dir, "migration_empty.xlsx"), 10, seed=2)
+    scans = []
+    list_progress_files = app.list_progress_files
+    app.list_progress_files = lambda progress_dir: scans.append(progress_dir) or list_progress_files(progress_dir)
+    try:
+        for _ in range(3):
+            app.ProgressStore(empty_path)
+    finally:
+        app.list_progress_files = list_progress_files
+    checker.check(len(scans) == 1, f"没有进度的题库每次打开都扫描了进度目录（{len(scans)} 次）")
+
+
+def check_progress_compaction(work_dir, checker):
+    """整理进度目录时跳过更新版本写入的快照和损坏的快照，其余进度照常转换"""
+    app.PROGRESS_DIR = os.path.join(work_dir, "progress_compaction")
+    progress_dir = app.get_progress_dir()
+    newer = os.path.join(progress_dir, "newer" + app.PROGRESS_EXT)
+    with open(newer, "wb") as f:
+        f.write(app.PROGRESS_MAGIC + struct.pack("<H", app.PROGRESS_FORMAT + 1) + zlib.compress(b"{}"))
+    corrupt = os.path.join(progress_dir, "corrupt" + app.PROGRESS_EXT)
+    with open(corrupt, "wb") as f:
+        f.write(app.PROGRESS_MAGIC + b"\x01\x00not zlib")
+    legacy_file = app.legacy_progress_path(os.path.join(progress_dir, "legacy" + app.PROGRESS_EXT))
+    with open(legacy_file, "w", encoding="utf-8") as f:
+        json.dump(dict(app.default_progress(), file=legacy_file), f)
+
+    report = app.compact_progress()
+    checker.check(report["skipped"] == 2, f"应跳过 2 个无法读取的进度，实际 {report['skipped']} 个")
+    checker.check(report["converted"] == 1, "整理中途出错，旧版 JSON 进度没有转换")
+    checker.check(os.path.exists(newer), "更新版本写入的进度快照不应被删除或改写")
+    checker.check(os.path.exists(corrupt), "后台整理不应把损坏的进度改名另存")
+
+
+def check_bank_normalize(checker):
+    """bank_tool 规范化同一行两次结果不变：超过 8 个选项、不带前缀的字母开头选项、前缀重复的选项都不能被削字"""
+    plain = ["ContentData", "delete", "id"] + [f"选项{i}" for i in range(8)]
+    cases = [(" | ".join(f"{chr(ord('A') + i)}. {opt}" for i, opt in enumerate(plain)), plain),
+             (" | ".join(plain), plain),
+             ("A. 甲 | B. 乙 | A. ContentData | B. id", None)]  # 多道题的选项拼在一起，原样保留
+    for value, expected in cases:
+        record = {"题型": "选择题", "问题": "题干", "选项": value, "答案": "a"}
+        bank_tool.normalize_row(record)
+        once = dict(record)
+        bank_tool.normalize_row(record)
+        checker.check(record == once, f"规范化两次结果不同: {once['选项']} -> {record['选项']}")
+        options = bank_tool.split_options(record["选项"])
+        actual = bank_tool.strip_option_labels(options) if expected is not None else options
+        checker.check(actual == (expected or bank_tool.split_options(value)), f"规范化改动了选项内容: {record['选项']}")
+
+
+def check_bank_rekey(work_dir, checker):
+    """bank_tool --write 排序、去重、改写选项后，新旧两种格式的进度仍对应原来的题目"""
+    app.PROGRESS_DIR = os.path.join(work_dir, "progress_rekey")
+    path = os.path.join(work_dir, "rekey.xlsx")
+    wb = openpyxl.Workbook()
+    wb.active.append(["题型", "问题", "选项", "答案"])
+    for row in (["填空题", "丙", None, "3"], ["单选题", "乙", "x | y", "B"], ["选择题", "甲", "A. x | B. y", "A"],
+                ["选择题", "甲", "A. x | B. y", "A"]):
+        wb.active.append(row)
+    wb.save(path)
+
+    def answers(user):
+        store = app.ProgressStore(path, user)
+        questions = app.parse_question_file(path, use_compiled=False)
+        return {questions[int(k)]["问题"]: v["user_answer"] for k, v in store.progress["answered"].items()}
+
+    store = app.ProgressStore(path)  # 新格式进度：按内容 ID
+    for q_index, answer in ((0, "3"), (1, "y"), (3, "x")):
+        store.record(q_index, answer, True, auto_flush=False)
+    store.flush()
+    legacy_file = app.legacy_progress_path(app.get_progress_file_path(path, "旧用户"))  # 旧格式进度：按行号
+    with open(legacy_file, "w", encoding="utf-8") as f:
+        json.dump({"answered": {"1": {"user_answer": "y", "is_correct": True, "timestamp": time.time()}},
+                   "wrong_questions": [], "correct_count": 1, "wrong_count": 0}, f)
+
+    report = bank_tool.process_bank(path, write=True)
+    checker.check(report["written"] and report["progress"] == 2, f"整理题库应改写 2 份进度: {report}")
+    checker.check(answers(app.DEFAULT_USER) == {"丙": "3", "乙": "y", "甲": "x"}, "整理题库后进度对应的题目不对")
+    checker.check(answers("旧用户") == {"乙": "y"}, "整理题库后旧格式进度对应的题目不对")
+
+
+FILL_CASES = [("非线程安全", "线程安全", False), ("线程安全", "非线程安全", False), ("不可变对象", "可变对象", False),
+              ("无状态协议", "有状态协议", False), ("哈希冲突", "哈希冲突", True), ("哈希冲突", "哈希充突", True),
+              ("垃圾回收器", "垃圾回收", True), ("垃圾回收器", "垃圾", False), ("死锁检测算法", "活锁检测机制", False)]  # 填空题评分用例：(参考答案, 作答, 是否算对)
+
+
+def check_fill_grading(checker):
+    """填空题只容许一处错字，只差否定字（非/不/无/未）的作答不能算对"""
+    for answer, user_answer, expected in FILL_CASES:
+        question = {"题型": "填空题", "问题": "", "答案": answer}
+        key = app.get_answer_key(question)
+        actual = app.grade_fill(key, user_answer) == 1.0
+        checker.check(actual == expected, f"填空题参考答案“{answer}”作答“{user_answer}”应判为{'对' if expected else '错'}")
+
+
+def check_exam_grading(work_dir, checker):
+    """模拟考试的主观题按整个题库计算要点权重：同一道题同一作答在不同试卷中得分相同"""
+    app.PROGRESS_DIR = os.path.join(work_dir, "progress_exam")
+    path = os.path.join(work_dir, "exam.xlsx")
+    wb = openpyxl.Workbook()
+    wb.active.append(["题型", "问题", "选项", "答案"])
+    topics = ["内存可见性", "指令重排序", "哈希冲突", "垃圾回收"]
+    for i in range(12):
+        answer = f"线程安全的{topics[i % 4]}" if i % 3 else f"{topics[i % 4]}与{topics[(i + 1) % 4]}"
+        wb.active.append(["简答题", f"问题{i}", None, answer])
+    wb.save(path)
+    questions = app.parse_question_file(path, use_compiled=False)
+    app.build_answer_keys(questions)
+    expected = {q["问题"]: q["_key"] for q in questions}
+
+    for seed in range(5):
+        paper = app.sample_exam_paper([path], 3, seed=seed)
+        results, _ = app.grade_paper(paper, {i: "线程安全 内存可见性" for i in range(len(paper))})
+        for (_, _, question), result in zip(paper, results):
+            key = expected[question["问题"]]
+            checker.check(question["_key"] == key, f"试卷 {seed} 中“{question['问题']}”的要点权重与整个题库不一致")
+            checker.check(result["score"] == app.grade_subjective(key, "线程安全 内存可见性")[0],
+                          f"试卷 {seed} 中“{question['问题']}”的得分与按整个题库评分不同")
+
+
+def check_empty_filter(work_dir, checker):
+    """筛选的题型已全部答对、其他题型还有未做题时提示没有题目，保留原来的筛选和位置，不进入结果页"""
+    app.PROGRESS_DIR = os.path.join(work_dir, "progress_filter")
+    path = os.path.join(work_dir, "filter.xlsx")
+    wb = openpyxl.Workbook()
+    wb.active.append(["题型", "问题", "选项", "答案"])
+    for row in (["填空题", "甲", None, "1"], ["单选题", "乙", "x | y", "A"], ["填空题", "丙", None, "3"],
+                ["单选题", "丁", "x | y", "B"]):
+        wb.active.append(row)
+    wb.save(path)
+
+    root = tk.Tk()
+    root.withdraw()
+    exam = app.ExamApp(root)
+    try:
+        exam.select_file(path)
+        for i in (0, 2):
+            exam.progress["answered"][str(i)] = {"user_answer": "", "is_correct": True, "timestamp": time.time()}
+        order, current = exam.question_order, exam.current_question
+        calls = len(fake_tk.DIALOGS.calls)
+        exam.apply_type_filter("填空题")
+        checker.check(("showinfo", ("提示", "没有符合条件的题目"), {}) in fake_tk.DIALOGS.calls[calls:],
+                      "筛选没有可练题目的题型时应提示“没有符合条件的题目”")
+        checker.check(exam.selected_filter == "全部" and exam.question_order is order and exam.current_index == 0
+                      and exam.current_question is current, "筛选没有可练题目的题型后应保留原来的筛选和位置")
+    finally:
+        exam.flush_progress()
+        exam.scheduler.shutdown()
+        root.destroy()
+
+
+def run_bank(path, size, count, trace_memory, checker):
+    """在一个新的根窗口中走完一个题库的全部步骤，返回结果"""
+    root = tk.Tk()
+    root.withdraw()
+    exam = app.ExamApp(root)
+    try:
+        if trace_memory:
+            tracemalloc.start()
+
+        start = time.perf_counter()
+        exam.select_file(path)
+        pump(root)
+        load_seconds = time.perf_counter() - start
+
+        if not checker.check(len(exam.questions) == size, f"select_file 应加载 {size} 题，实际 {len(exam.questions)}"):
+            return {"error": "题库加载失败"}
+        checker.check(exam.current_question is exam.questions[exam.question_order[0]],
+                      "select_file 后应显示题目顺序中的第一题")
+        checker.check(exam.result_label is not None and exam.result_label.cget("text") == "", "新题目不应显示判分结果")
+
+        count = min(count, len(exam.question_order) - 1)
+        answer_seconds, expected = answer_questions(exam, count, checker)
+        filter_seconds = filter_types(exam, checker)
+        check_saved_progress(exam, expected, checker)
+
+        result = {
+            "questions": size,
+            "answered": count,
+            "load_seconds": load_seconds,
+            "questions_per_second": count / answer_seconds if answer_seconds else None,
+            "filter_seconds": filter_seconds,
+            "filter_max_seconds": max(filter_seconds.values(), default=0),
+        }
+        if trace_memory:
+            result["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        return result
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        exam.flush_progress()
+        exam.scheduler.shutdown()
+        root.destroy()
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def main():
+    global tk, app, benchmark, bank_tool
+    parser = argparse.ArgumentParser(description="无界面驱动刷题界面，检查正确性并测量吞吐量和内存")
+    parser.add_argument("--backend", choices=["fake", "tk"], default="fake",
+                        help="fake 为纯 Python 替身（默认），tk 为真实 Tk（需要 X 显示 / Xvfb）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="合成题库的题量")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="每个题库作答的题数")
+    parser.add_argument("--no-memory", action="store_true", help="不跟踪内存分配（跟踪会让界面操作变慢）")
+    parser.add_argument("--output", help="结果另存为 JSON 文件")
+    args = parser.parse_args()
+
+    if args.backend == "fake":
+        tk = fake_tk.install()
+    else:
+        import tkinter as tk
+        try:
+            tk.Tk().destroy()
+        except tk.TclError as e:
+            print(f"无法创建 Tk 窗口（没有 X 显示时可用 xvfb-run 或 --backend fake）: {e}")
+            return 2
+
+    import 刷题界面 as app
+    import benchmark
+    import bank_tool
+    app.ExamApp.install_required_packages = lambda self: None  # 依赖已安装，不在测试中联网
+
+    work_dir = tempfile.mkdtemp(prefix="ui_harness_")
+    checker = Checker()
+    results = {}
+    try:
+        for size in args.sizes:
+            path = benchmark.get_bank(work_dir, size)
+            # 同一种子的合成题库前面的题目相同，各题库使用独立的进度目录，避免按内容 ID 接收其他题库的作答
+            app.PROGRESS_DIR = os.path.join(work_dir, f"progress_{size}")
+            results[str(size)] = run_bank(path, size, args.count, not args.no_memory, checker)
+        check_progress_migration(work_dir, checker)
+        check_progress_compaction(work_dir, checker)
+        check_fill_grading(checker)
+        check_bank_normalize(checker)
+        check_bank_rekey(work_dir, checker)
+        check_exam_grading(work_dir, checker)
+        if args.backend == "fake":  # 真实 Tk 下提示框会阻塞
+            check_empty_filter(work_dir, checker)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.backend == "fake":
+        errors = [call for call in fake_tk.DIALOGS.calls if call[0] in ("showerror", "showwarning")]
+        checker.check(not errors, f"运行中弹出了错误提示: {errors}")
+
+    print(f"后端: {args.backend}")
+    for size, result in results.items():
+        if "error" in result:
+            print(f"  {size:>7} 题: {result['error']}")
+            continue
+        memory = f"，峰值内存（跟踪分配时） {result['peak_memory_mb']:.1f} MB" if "peak_memory_mb" in result else ""
+        print(f"  {size:>7} 题: 加载 {result['load_seconds']:.3f}s，作答 {result['answered']} 题 "
+              f"{result['questions_per_second']:.0f} 题/秒，题型筛选最长 {result['filter_max_seconds'] * 1000:.1f}ms"
+              f"{memory}")
+    rss = max_rss_mb()
+    if rss is not None:
+        print(f"进程最大常驻内存: {rss:.1f} MB")
+    print(f"检查通过 {checker.passed} 项，失败 {len(checker.failures)} 项")
+    for message in checker.failures[:20]:
+        print(f"  [失败] {message}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"backend": args.backend, "results": results, "max_rss_mb": rss, "passed": checker.passed,
+                       "failures": checker.failures}, f, ensure_ascii=False, indent=2)
+    return 1 if checker.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
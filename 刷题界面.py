@@ -6,16 +6,155 @@ import hashlib
 import time
 import subprocess
 import re
+import copy
+import heapq
+import tempfile
+import zlib
+import gzip
+import cProfile
+import struct
+import math
+import unicodedata
+from array import array
+from bisect import bisect_right
+from collections import deque
+from collections.abc import Sequence
+from contextlib import contextmanager
+from functools import wraps
 import openpyxl
 from openpyxl import load_workbook
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, scrolledtext
+from tkinter import ttk, messagebox, filedialog, scrolledtext, simpledialog
 from PIL import Image, ImageTk
 import threading
 
 # 配置信息
 ROOT_DIR = "./"  # 题库根目录
 PROGRESS_DIR = "progress"  # 进度保存目录
+PROFILE_ENV = "EXAM_PROFILE"  # 设置为 1 时开启耗时埋点
+USER_ENV = "EXAM_USER"  # 启动时使用的用户ID
+DEFAULT_USER = "default"  # 默认用户，进度直接保存在 PROGRESS_DIR 下（兼容旧版本）
+FLUSH_BATCH_SIZE = 20  # 累计多少次作答合并写盘一次
+FLUSH_INTERVAL = 30  # 有未写盘的作答时最长等待多少秒写盘
+SUMMARY_FILE = "summary.json"  # 进度目录下的统计汇总文件
+SUMMARY_DAYS = 365  # 汇总中保留多少天的每日统计
+EVENTS_DIR = "events"  # 进度目录下的作答历史目录，按月分文件追加
+PROGRESS_SCHEMA = 2  # 进度文件格式：2 起作答记录按题目内容 ID 保存（没有该字段的旧进度按题目序号保存）
+PROGRESS_EXT = ".qprog"  # 进度快照（压缩的紧凑 JSON），旧版本的 .json 进度读取时兼容，整理时转换
+PROGRESS_RETENTION_DAYS = 180  # 超过该天数的作答记录只保留对错和时间，不再保存作答内容
+STALE_PROGRESS_DAYS = 90  # 题库已不在题库目录中、且超过该天数没有写入的进度在整理时删除
+COMPACT_INTERVAL = 86400  # 启动时自动整理进度目录的最短间隔（秒）
+COMPACT_MARKER = ".compacted"  # 进度目录下记录上次整理时间的标记文件
+COMPILED_EXT = ".qbank"  # 编译后的题库缓存，与 xlsx 放在同一目录
+DOCUMENT_EXTS = (".docx", ".doc", ".pdf")  # 由 import_sources.py 导入为编译题库后才会出现在题库列表中
+EXAM_TYPE_ORDER = ["单选题", "选择题", "多选题", "判断题", "填空题", "排序题", "匹配题", "名词解释", "简答题",
+                   "解答题"]  # 模拟试卷中的题型顺序
+FUZZY_BLANK_MIN_LEN = 4  # 填空题单空允许一处错字的最短答案长度（只对不含数字的答案生效）
+NEGATION_CHARS = set("非不无未")  # 错字容差不接受涉及这些字的改动，避免“线程安全”被判为“非线程安全”
+KEYPOINT_RECALL = 0.5  # 主观题单个要点的关键字覆盖率达到该值即算答到
+SUBJECTIVE_PASS_SCORE = 0.6  # 主观题答到的要点比例达到该值即算对
+BROWSER_COLUMNS = [("题号", 70, "e"), ("问题", 430, "w"), ("题型", 90, "w"), ("答案", 170, "w"),
+                   ("错误次数", 80, "e")]  # 题库浏览表格的列（标题, 宽度, 对齐）
+SCHEDULER_SLACK_MS = 15  # 到期时间相差不超过该毫秒数的界面定时任务合并到同一次回调中执行
+FLASH_MS = 1500  # 提示信息显示多久后自动清除
+DRILL_LATENCY_BUDGET_MS = 16  # 速刷模式下从按键到下一题显示完成的耗时预算（毫秒）
+DRILL_LATENCY_WINDOW = 200  # 速刷模式统计最近多少次按键的耗时
+DRILL_FLUSH_DELAY_MS = 100  # 速刷模式攒够一批作答后推迟多久写盘，让下一题先显示
+ANSWER_WRAP_CHARS = 45  # 估算答案折行时每行的字数
+ANSWER_MIN_LINES = 4  # 答案框最少显示的行数
+ANSWER_MAX_LINES = 15  # 答案框最多显示的行数，更长的答案滚动查看
+
+
+class Instrumentation:
+    """耗时埋点：记录各环节的耗时区间，可导出 Chrome Trace 或 cProfile 文件"""
+
+    def __init__(self, enabled=False, max_spans=20000):
+        self.enabled = enabled
+        self.spans = deque(maxlen=max_spans)  # (名称, 开始时间, 耗时, 线程ID, 附加参数)
+        self.profiler = None
+        self.origin = time.perf_counter()
+
+    def record(self, name, start, duration, **args):
+        """记录一个耗时区间"""
+        self.spans.append((name, start, duration, threading.get_ident(), args))
+
+    @contextmanager
+    def span(self, name, **args):
+        """with 语句埋点，未开启时几乎没有开销"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter() - start, **args)
+
+    def timed(self, name):
+        """函数埋点装饰器"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, start, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        """按名称汇总：次数、总耗时、平均、最大（秒），按总耗时降序"""
+        stats = {}
+        for name, _, duration, _, _ in list(self.spans):
+            item = stats.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            item["count"] += 1
+            item["total"] += duration
+            item["max"] = max(item["max"], duration)
+        for item in stats.values():
+            item["mean"] = item["total"] / item["count"]
+        return dict(sorted(stats.items(), key=lambda kv: kv[1]["total"], reverse=True))
+
+    def clear(self):
+        self.spans.clear()
+
+    def start_cprofile(self):
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop_cprofile(self, path):
+        """停止 cProfile 并保存结果（可用 snakeviz / pstats 查看）"""
+        if self.profiler is None:
+            return False
+        self.profiler.disable()
+        self.profiler.dump_stats(path)
+        self.profiler = None
+        return True
+
+    def dump_chrome_trace(self, path):
+        """导出 Chrome Trace 格式（chrome://tracing 或 Perfetto 打开）"""
+        pid = os.getpid()
+        events = []
+        for name, start, duration, tid, args in list(self.spans):
+            events.append({
+                "name": name,
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": duration * 1e6,
+                "pid": pid,
+                "tid": tid,
+                "args": {k: str(v) for k, v in args.items()},
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(events)
+
+
+PERF = Instrumentation(enabled=os.environ.get(PROFILE_ENV, "") not in ("", "0"))
 
 
 def install_package(package):
@@ -28,26 +167,46 @@ def install_package(package):
         print(f"{package} 安装完成!")
 
 
+def is_document_bank(file_path):
+    """是否为从 docx/doc/pdf 导入的题库（题目只保存在编译题库中）"""
+    return file_path.lower().endswith(DOCUMENT_EXTS)
+
+
+def is_question_file(file_path):
+    """xlsx 题库，或已导入且提取到题目的文档"""
+    name = os.path.basename(file_path)
+    if name.startswith("~$"):
+        return False
+    if name.endswith(".xlsx"):
+        return True
+    if is_document_bank(name):
+        header = read_compiled_header(file_path)
+        return bool(header and header.get("count"))
+    return False
+
+
+@PERF.timed("discovery.scan_subjects")
 def scan_subjects():
-    """扫描题库目录，返回包含xlsx文件的科目列表"""
+    """扫描题库目录，返回包含题库文件的科目列表"""
     subjects = []
     for entry in os.listdir(ROOT_DIR):
         full_path = os.path.join(ROOT_DIR, entry)
         if os.path.isdir(full_path):
-            # 检查目录是否包含xlsx文件
-            has_xlsx = False
+            # 检查目录是否包含题库文件
+            has_bank = False
             for root, dirs, files in os.walk(full_path):
                 for file in files:
-                    if file.endswith(".xlsx") and not file.startswith("~$"):
-                        has_xlsx = True
+                    if is_question_file(os.path.join(root, file)):
+                        has_bank = True
                         break
-                if has_xlsx:
+                if has_bank:
                     break
-            if has_xlsx:
+            if has_bank:
                 subjects.append(entry)
     return subjects
 
 
+@PERF.timed("discovery.scan_question_files")
 def scan_question_files(subject):
     """扫描指定科目下的题库文件"""
     subject_dir = os.path.join(ROOT_DIR, subject)
@@ -55,111 +214,294 @@ def scan_question_files(subject):
 
     for root, dirs, files in os.walk(subject_dir):
         for file in files:
-            if file.endswith(".xlsx") and not file.startswith("~$"):
-                full_path = os.path.join(root, file)
+            full_path = os.path.join(root, file)
+            if is_question_file(full_path):
                 question_files.append(full_path)
 
     return question_files
 
 
-def parse_question_file(file_path):
-    """解析题库文件，返回题目列表"""
+def discover_banks():
+    """题库发现结果 {题库标识: 题库路径}，用于把进度文件对应到现有题库"""
+    return {bank_key(path): path for subject in scan_subjects() for path in scan_question_files(subject)}
+
+
+IMAGE_COLUMNS = ["附图", "图片", "image", "Image", "picture", "Picture"]
+
+
+def find_image_column(headers):
+    """查找表头中的图片列"""
+    for col in IMAGE_COLUMNS:
+        if col in headers:
+            return col
+    return None
+
+
+def row_to_question(headers, row, file_path, image_col):
+    """把表格中的一行转换为题目字典，空行返回 None"""
+    if not any(row):  # 跳过空行
+        return None
+
+    question = {}
+    for i, value in enumerate(row):
+        if i >= len(headers):
+            break
+        header = headers[i]
+        if header and value is not None:
+            question[header] = value
+
+    # 处理选择题选项 - 修复逻辑
+    options = []
+    raw_options = []
+
+    # 获取选项列的值
+    options_value = question.get("选项", "")
+
+    if options_value:
+        # 情况1：选项是列表格式的字符串
+        if isinstance(options_value, str) and options_value.startswith('[') and options_value.endswith(']'):
+            try:
+                # 尝试解析为Python列表
+                parsed_options = eval(options_value)
+                if isinstance(parsed_options, list):
+                    raw_options = parsed_options
+            except:
+                # 解析失败，按竖线分割处理
+                raw_options = [opt.strip() for opt in options_value.strip("[]").split("|")]
+
+        # 情况2：选项是用竖线分隔的字符串
+        elif isinstance(options_value, str) and "|" in options_value:
+            raw_options = [opt.strip() for opt in options_value.split("|")]
+
+        # 情况3：选项是单个字符串
+        elif isinstance(options_value, str):
+            raw_options = [options_value.strip()]
+
+        if len(raw_options) > 1 and raw_options[0].lower().startswith("a") and raw_options[1].lower().startswith("b"):
+            # 清理每个选项格式
+            for opt in raw_options:
+                # 清理选项格式：移除开头的字母和标点
+                clean_opt = re.sub(r"^[A-Za-z][\.\s]*", "", opt).strip()
+                options.append(clean_opt)
+        else:
+            options = raw_options[:]
+
+    if image_col and image_col in question:
+        image_path = question[image_col]
+        if image_path and isinstance(image_path, str) and image_path.strip():
+            # 处理相对路径（相对于Excel文件所在目录）
+            base_dir = os.path.dirname(file_path)
+            abs_path = os.path.join(base_dir, image_path.strip())
+            question["image_path"] = abs_path
+
+    question["options"] = options
+    question["raw_options"] = raw_options
+    type_handler(question).parse(question)  # 题型相关的字段（多选题答案拆分、判断题固定选项等）
+    return question
+
+
+def question_id(question):
+    """题目内容 ID：题干和选项（去掉空白和标点）的哈希，与答案、题型写法和所在行无关"""
+    text = "\x1f".join([normalize_text(question.get("问题", ""))] +
+                       [normalize_text(opt) for opt in question.get("options", [])])
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def next_question_id(question, seen):
+    """计算题目的内容 ID 并保存在 "qid" 字段；同一题库中内容相同的题目依次加 "~1"、"~2" 后缀"""
+    qid = question_id(question)
+    count = seen.get(qid, 0)
+    seen[qid] = count + 1
+    question["qid"] = f"{qid}~{count}" if count else qid
+    return question["qid"]
+
+
+def assign_question_ids(questions):
+    """为整个题库计算内容 ID（随编译缓存保存，之后加载无需重新计算）"""
+    seen = {}
+    for question in questions:
+        next_question_id(question, seen)
+    return questions
+
+
+@PERF.timed("bank.parse")
+def parse_question_file(file_path, use_compiled=True):
+    """解析题库文件，返回题目列表
+
+    优先读取同目录下与 xlsx 同步的编译缓存（.qbank）；缓存不存在或已过期时解析 xlsx 并重新生成缓存。
+    docx/doc/pdf 题库只读取 import_sources.py 导入的结果，文档修改后需重新导入。
+    """
+    if is_document_bank(file_path):
+        return load_compiled_questions(file_path, check_source=False) or []
+
+    if use_compiled:
+        questions = load_compiled_questions(file_path)
+        if questions is not None:
+            return questions
+
     wb = load_workbook(file_path)
     sheet = wb.active
     questions = []
 
     headers = [cell.value for cell in sheet[1]]
-
-    image_columns = ["附图", "图片", "image", "Image", "picture", "Picture"]
-    image_col = None
-    for col in image_columns:
-        if col in headers:
-            image_col = col
-            break
+    image_col = find_image_column(headers)
 
     for row in sheet.iter_rows(min_row=2, values_only=True):
-        if not any(row):  # 跳过空行
-            continue
+        question = row_to_question(headers, row, file_path, image_col)
+        if question is not None:
+            questions.append(question)
+    assign_question_ids(questions)
 
-        question = {}
-        for i, value in enumerate(row):
-            if i >= len(headers):
-                break
-            header = headers[i]
-            if header and value is not None:
-                question[header] = value
-
-        # 处理选择题选项 - 修复逻辑
-        options = []
-        raw_options = []
-
-        # 获取选项列的值
-        options_value = question.get("选项", "")
-
-        # 处理多选题答案格式
-        if question.get("题型") == "多选题":
-            # 答案格式为 "A | B | C"
-            answer_value = question.get("答案", "")
-            if isinstance(answer_value, str) and "|" in answer_value:
-                question["answer_parts"] = [part.strip() for part in answer_value.split("|")]
-            else:
-                question["answer_parts"] = [answer_value.strip()]
+    if use_compiled:
+        try:
+            write_compiled_questions(file_path, questions, image_col)
+        except (OSError, TypeError, ValueError):
+            pass  # 目录只读或题目含无法序列化的值时不生成缓存
+    return questions
 
-        if options_value:
-            # 情况1：选项是列表格式的字符串
-            if isinstance(options_value, str) and options_value.startswith('[') and options_value.endswith(']'):
-                try:
-                    # 尝试解析为Python列表
-                    parsed_options = eval(options_value)
-                    if isinstance(parsed_options, list):
-                        raw_options = parsed_options
-                except:
-                    # 解析失败，按竖线分割处理
-                    raw_options = [opt.strip() for opt in options_value.strip("[]").split("|")]
-
-            # 情况2：选项是用竖线分隔的字符串
-            elif isinstance(options_value, str) and "|" in options_value:
-                raw_options = [opt.strip() for opt in options_value.split("|")]
-
-            # 情况3：选项是单个字符串
-            elif isinstance(options_value, str):
-                raw_options = [options_value.strip()]
-
-            if raw_options[0].lower().startswith("a") and raw_options[1].lower().startswith("b"):
-                # 清理每个选项格式
-                for opt in raw_options:
-                    # 清理选项格式：移除开头的字母和标点
-                    clean_opt = re.sub(r"^[A-Za-z][\.\s]*", "", opt).strip()
-                    options.append(clean_opt)
-            else:
-                options = raw_options[:]
 
-        if image_col and image_col in question:
-            image_path = question[image_col]
-            if image_path and isinstance(image_path, str) and image_path.strip():
-                # 处理相对路径（相对于Excel文件所在目录）
-                base_dir = os.path.dirname(file_path)
-                abs_path = os.path.join(base_dir, image_path.strip())
-                question["image_path"] = abs_path
+# 编译题库格式（小端）:
+#   魔数 COMPILED_MAGIC | 头部长度 uint32 | 头部 JSON | 偏移表 uint64 * (题数 + 1) | 每题一段 JSON
+# 头部记录 xlsx 的修改时间和大小，不一致即视为过期；偏移表便于按题号直接定位（可 mmap 后按需解码）。
+# 从文档导入的题库头部另外记录文档内容的哈希和导入器版本，见 import_sources.py。
+COMPILED_MAGIC = b"QBANK\x01"
+COMPILED_VERSION = 2
+
+
+def get_compiled_path(file_path):
+    """题库对应的编译缓存路径（文档保留原扩展名，避免与同名 xlsx 冲突）"""
+    if is_document_bank(file_path):
+        return file_path + COMPILED_EXT
+    return os.path.splitext(file_path)[0] + COMPILED_EXT
+
+
+def source_signature(file_path):
+    """题库文件签名：修改时间和大小"""
+    st = os.stat(file_path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def write_compiled_questions(file_path, questions, image_col=None, extra=None):
+    """把解析好的题目写成编译缓存（原子写入），extra 为附加到头部的字段"""
+    records = []
+    offsets = array("Q", [0])
+    for question in questions:
+        # image_path 由加载时按题库位置重新拼接，缓存与题库路径的写法无关
+        record = {k: v for k, v in question.items() if k != "image_path" and not k.startswith("_")}
+        data = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        records.append(data)
+        offsets.append(offsets[-1] + len(data))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+
+    header = {"version": COMPILED_VERSION, "source": source_signature(file_path),
+              "count": len(questions), "image_col": image_col}
+    header.update(extra or {})
+    header = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    path = get_compiled_path(file_path)
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(COMPILED_MAGIC + struct.pack("<I", len(header)) + header)
+            f.write(offsets.tobytes())
+            f.write(b"".join(records))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
 
-        # 判断题特殊处理
-        elif question.get("题型") == "判断题":
-            raw_options = ["正确", "错误"]
-            options = ["正确", "错误"]
 
-        question["options"] = options
-        question["raw_options"] = raw_options
+def read_compiled_header(file_path):
+    """只读取编译缓存的头部，缓存不存在或损坏时返回 None"""
+    try:
+        with open(get_compiled_path(file_path), "rb") as f:
+            prefix = f.read(len(COMPILED_MAGIC) + 4)
+            if not prefix.startswith(COMPILED_MAGIC) or len(prefix) < len(COMPILED_MAGIC) + 4:
+                return None
+            (header_len,) = struct.unpack_from("<I", prefix, len(COMPILED_MAGIC))
+            return json.loads(f.read(header_len))
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def load_compiled_questions(file_path, check_source=True):
+    """读取编译缓存，缓存不存在、过期或损坏时返回 None
+
+    check_source=False 时不比对题库文件的签名（文档题库在导入时已按内容哈希校验）。
+    """
+    path = get_compiled_path(file_path)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(COMPILED_MAGIC):
+            return None
+        pos = len(COMPILED_MAGIC)
+        (header_len,) = struct.unpack_from("<I", data, pos)
+        pos += 4
+        header = json.loads(data[pos:pos + header_len])
+        pos += header_len
+        if header["version"] != COMPILED_VERSION:
+            return None
+        if check_source and header["source"] != source_signature(file_path):
+            return None
+
+        count = header["count"]
+        offsets = array("Q")
+        offsets.frombytes(data[pos:pos + 8 * (count + 1)])
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        base = pos + 8 * (count + 1)
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
 
+    questions = []
+    image_col = header.get("image_col")
+    for i in range(count):
+        question = json.loads(data[base + offsets[i]:base + offsets[i + 1]])
+        image_path = question.get(image_col) if image_col else None
+        if image_path and isinstance(image_path, str) and image_path.strip():
+            question["image_path"] = os.path.join(os.path.dirname(file_path), image_path.strip())
         questions.append(question)
-
+    if questions and "qid" not in questions[0]:
+        assign_question_ids(questions)  # 旧版本生成的缓存没有内容 ID
     return questions
 
 
+def iter_question_file(file_path):
+    """流式读取题库文件，逐题返回（只读模式，不把整个题库载入内存）
+
+    题目顺序和内容 ID（qid）与 parse_question_file 一致
+    """
+    if is_document_bank(file_path):
+        yield from parse_question_file(file_path)
+        return
+
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        sheet = wb.active
+        sheet.reset_dimensions()  # 部分文件记录的表格范围不准确，按实际内容读取
+        rows = sheet.iter_rows(values_only=True)
+        headers = list(next(rows, ()))
+        image_col = find_image_column(headers)
+        seen = {}
+
+        for row in rows:
+            question = row_to_question(headers, row, file_path, image_col)
+            if question is not None:
+                next_question_id(question, seen)
+                yield question
+    finally:
+        wb.close()
+
+
 ## 问题所在
 def normalize_answer(answer):
     """标准化答案格式"""
     if not isinstance(answer, str):
-        answer = answer.strip()
+        answer = str(answer).strip()
         # 处理判断题
         if "正确" in answer or "对" in answer or "是" in answer or "T" in answer or "t" in answer:
             return "正确"
@@ -168,27 +510,60 @@ def normalize_answer(answer):
     return answer
 
 
-def get_progress_file_path(question_file):
+def get_progress_dir(user=DEFAULT_USER):
+    """获取用户的进度目录"""
+    if user == DEFAULT_USER:
+        progress_dir = PROGRESS_DIR
+    else:
+        progress_dir = os.path.join(PROGRESS_DIR, "users", re.sub(r"[^\w\-]", "_", user))
+    if not os.path.exists(progress_dir):
+        os.makedirs(progress_dir, exist_ok=True)
+    return progress_dir
+
+
+def list_users():
+    """列出有进度目录的用户（默认用户在最前）"""
+    users = [DEFAULT_USER]
+    users_dir = os.path.join(PROGRESS_DIR, "users")
+    if os.path.isdir(users_dir):
+        users += sorted(entry for entry in os.listdir(users_dir) if os.path.isdir(os.path.join(users_dir, entry)))
+    return users
+
+
+def bank_key(question_file):
+    """题库标识：题库路径的 MD5，同时用作进度文件名"""
+    return hashlib.md5(question_file.encode()).hexdigest()
+
+
+def get_progress_file_path(question_file, user=DEFAULT_USER):
     """获取进度文件路径"""
-    if not os.path.exists(PROGRESS_DIR):
-        os.makedirs(PROGRESS_DIR)
+    return os.path.join(get_progress_dir(user), f"{bank_key(question_file)}{PROGRESS_EXT}")
 
-    file_hash = hashlib.md5(question_file.encode()).hexdigest()
-    return os.path.join(PROGRESS_DIR, f"{file_hash}.json")
 
+def legacy_progress_path(progress_file):
+    """同一题库旧版本的 JSON 进度文件路径"""
+    return os.path.splitext(progress_file)[0] + ".json"
+
+
+def progress_exists(progress_file):
+    """进度快照或旧版 JSON 进度是否存在"""
+    return os.path.exists(progress_file) or os.path.exists(legacy_progress_path(progress_file))
 
-def load_progress(question_file):
-    """加载进度信息"""
-    progress_file = get_progress_file_path(question_file)
-    if os.path.exists(progress_file):
-        try:
-            with open(progress_file, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            pass
 
-    # 默认进度信息
+def list_progress_files(progress_dir):
+    """进度目录中的进度文件 {题库标识: 文件名}，同一题库同时有快照和旧版 JSON 时取快照"""
+    files = {}
+    for name in sorted(os.listdir(progress_dir), key=lambda name: name.endswith(PROGRESS_EXT)):
+        key, ext = os.path.splitext(name)
+        if ext == PROGRESS_EXT or (ext == ".json" and name != SUMMARY_FILE):
+            files[key] = name
+    return files
+
+
+def default_progress():
+    """默认进度信息"""
     return {
+        "schema": PROGRESS_SCHEMA,
         "total_questions": 0,
         "answered": {},
         "wrong_questions": [],
@@ -198,81 +573,1947 @@ def load_progress(question_file):
     }
 
 
-def save_progress(question_file, progress):
-    """保存进度信息"""
-    progress_file = get_progress_file_path(question_file)
-    with open(progress_file, "w", encoding="utf-8") as f:
-        json.dump(progress, f, ensure_ascii=False, indent=2)
+@contextmanager
+def file_lock(path, timeout=10.0, stale=30.0):
+    """跨进程文件锁：以独占方式创建 .lock 文件，超过 stale 秒未释放的锁视为残留并清除"""
+    lock_path = path + ".lock"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"无法获取文件锁: {lock_path}")
+            time.sleep(0.01)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def atomic_write_json(path, data):
+    """原子写入 JSON：先写临时文件再重命名，写到一半崩溃也不会损坏原文件"""
+    atomic_write_bytes(path, json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def atomic_write_bytes(path, data):
+    """原子写入文件内容（先写临时文件，fsync 后重命名）"""
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_json_file(path, default):
+    """读取 JSON 文件；文件损坏时改名保留（不再静默丢弃）并返回 default()"""
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            corrupt_file = f"{path}.corrupt-{int(time.time())}"
+            try:
+                os.replace(path, corrupt_file)
+                print(f"文件损坏，已另存为 {corrupt_file}: {e}")
+            except OSError:
+                pass
+
+    return default()
+
+
+PROGRESS_MAGIC = b"QPROG"
+PROGRESS_FORMAT = 1  # 快照格式版本（进度内容的格式见 PROGRESS_SCHEMA）
+
+
+def encode_progress(progress):
+    """进度快照：魔数 + 格式版本 + zlib 压缩的紧凑 JSON"""
+    data = json.dumps(progress, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return PROGRESS_MAGIC + struct.pack("<H", PROGRESS_FORMAT) + zlib.compress(data, 6)
+
+
+def decode_progress(data):
+    """解析进度快照：内容损坏时抛出 ValueError，由更新版本的程序写入时抛出 RuntimeError（不能当作损坏覆盖）"""
+    prefix = len(PROGRESS_MAGIC) + 2
+    if not data.startswith(PROGRESS_MAGIC) or len(data) < prefix:
+        raise ValueError("不是进度快照")
+    (version,) = struct.unpack_from("<H", data, len(PROGRESS_MAGIC))
+    if version > PROGRESS_FORMAT:
+        raise RuntimeError(f"进度快照版本 {version} 高于本程序支持的版本 {PROGRESS_FORMAT}，请升级程序")
+    try:
+        return json.loads(zlib.decompress(data[prefix:]))
+    except zlib.error as e:
+        raise ValueError(e)
+
+
+def read_progress_file(progress_file, strict=False):
+    """读取进度文件，不存在或损坏时返回默认进度；快照不存在时读取旧版 JSON 进度
+
+    strict=True 时不存在或损坏都直接抛出异常（OSError / ValueError），损坏的文件也不改名，供后台整理使用。
+    """
+    if strict:
+        if progress_file.endswith(PROGRESS_EXT) and not os.path.exists(progress_file):
+            progress_file = legacy_progress_path(progress_file)
+        with open(progress_file, "rb") as f:
+            data = f.read()
+        progress = decode_progress(data) if progress_file.endswith(PROGRESS_EXT) else json.loads(data)
+        if not isinstance(progress, dict) or "answered" not in progress:
+            raise ValueError("不是进度文件")
+        return progress
+    if not progress_file.endswith(PROGRESS_EXT):
+        return read_json_file(progress_file, default_progress)
+    if not os.path.exists(progress_file):
+        return read_json_file(legacy_progress_path(progress_file), default_progress)
+
+    try:
+        with open(progress_file, "rb") as f:
+            return decode_progress(f.read())
+    except (OSError, ValueError) as e:
+        corrupt_file = f"{progress_file}.corrupt-{int(time.time())}"
+        try:
+            os.replace(progress_file, corrupt_file)
+            print(f"文件损坏，已另存为 {corrupt_file}: {e}")
+        except OSError:
+            pass
+    return default_progress()
+
+
+def write_progress_file(progress_file, progress):
+    """原子写入进度快照（调用方持有文件锁），同一题库旧版的 JSON 进度随之删除"""
+    atomic_write_bytes(progress_file, encode_progress(progress))
+    try:
+        os.remove(legacy_progress_path(progress_file))
+    except FileNotFoundError:
+        pass
+
+
+@PERF.timed("progress.load")
+def load_progress(question_file, user=DEFAULT_USER):
+    """加载进度信息"""
+    return read_progress_file(get_progress_file_path(question_file, user))
+
+
+@PERF.timed("progress.save")
+def save_progress(question_file, progress, user=DEFAULT_USER):
+    """保存进度信息（整份覆盖，加锁并原子写入）"""
+    progress_file = get_progress_file_path(question_file, user)
+    with file_lock(progress_file):
+        write_progress_file(progress_file, progress)
+
+
+def apply_answer(progress, q_index, user_answer, is_correct, timestamp=None, latency=0.0):
+    """把一次作答记入进度：作答记录、对错计数、错题列表和单题统计，返回该题统计
+
+    q_index 为题目序号（内存中的进度视图）或内容 ID（进度文件）。
+    """
+    progress["answered"][str(q_index)] = {
+        "user_answer": user_answer,
+        "is_correct": is_correct,
+        "timestamp": timestamp or time.time()
+    }
+
+    if is_correct:
+        progress["correct_count"] = progress.get("correct_count", 0) + 1
+        # 从错题列表中移除
+        if q_index in progress["wrong_questions"]:
+            progress["wrong_questions"].remove(q_index)
+    else:
+        progress["wrong_count"] = progress.get("wrong_count", 0) + 1
+        # 添加到错题列表
+        if q_index not in progress["wrong_questions"]:
+            progress["wrong_questions"].append(q_index)
+
+    # 单题统计 [作答次数, 错误次数, 最近一次用时]
+    stats = progress.setdefault("stats", {})
+    attempts, errors, _ = stats.get(str(q_index), (0, 0, 0))
+    stat = [attempts + 1, errors + (not is_correct), latency]
+    stats[str(q_index)] = stat
+    return stat
+
+
+def ids_digest(ids):
+    """题库内容 ID 列表的摘要，用于判断保存的题目顺序是否仍然对应当前题库"""
+    return hashlib.blake2b("\n".join(ids).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def progress_to_ids(progress, ids):
+    """旧格式进度（按题目序号）转换为按内容 ID 保存，序号按当前题库的行对应，超出范围的丢弃"""
+    def to_id(index):
+        index = int(index)
+        return ids[index] if 0 <= index < len(ids) else None
+
+    converted = dict(progress)
+    converted["answered"] = {to_id(k): v for k, v in progress.get("answered", {}).items() if to_id(k)}
+    converted["stats"] = {to_id(k): v for k, v in progress.get("stats", {}).items() if to_id(k)}
+    converted["wrong_questions"] = [to_id(i) for i in progress.get("wrong_questions", []) if to_id(i)]
+    converted["schema"] = PROGRESS_SCHEMA
+    converted["ids_digest"] = ids_digest(ids)
+    return converted
+
+
+def progress_by_index(progress, ids):
+    """进度文件（按内容 ID）转换为当前题库按题目序号的视图；题库中已不存在的题目不出现在视图中，
+    题库内容变化后保存的题目顺序和位置不再有效，也不放入视图"""
+    positions = {qid: i for i, qid in enumerate(ids)}
+    view = {key: value for key, value in progress.items() if key not in ("answered", "stats", "wrong_questions")}
+    view["answered"] = {str(positions[q]): v for q, v in progress.get("answered", {}).items() if q in positions}
+    view["stats"] = {str(positions[q]): v for q, v in progress.get("stats", {}).items() if q in positions}
+    view["wrong_questions"] = [positions[q] for q in progress.get("wrong_questions", []) if q in positions]
+    if progress.get("ids_digest") != ids_digest(ids):
+        view.pop("order", None)
+        view.pop("current_index", None)
+    return view
+
+
+def remap_progress(progress, mapping):
+    """按 {旧内容 ID: 新内容 ID} 改写进度（原地修改，题库整理改变了题目内容时使用），并为同一题的作答和统计合并"""
+    answered, stats, wrong = {}, {}, []
+    for qid, record in progress["answered"].items():
+        qid = mapping.get(qid, qid)
+        if qid not in answered or record["timestamp"] > answered[qid]["timestamp"]:
+            answered[qid] = record
+    for qid, (attempts, errors, latency) in progress.get("stats", {}).items():
+        qid = mapping.get(qid, qid)
+        old_attempts, old_errors, _ = stats.get(qid, (0, 0, 0))
+        stats[qid] = [old_attempts + attempts, old_errors + errors, latency]
+    for qid in progress["wrong_questions"]:
+        qid = mapping.get(qid, qid)
+        if qid not in wrong and not (qid in answered and answered[qid]["is_correct"]):
+            wrong.append(qid)
+    progress["answered"], progress["stats"], progress["wrong_questions"] = answered, stats, wrong
+    return progress
+
+
+def adopt_progress(question_file, ids, user=DEFAULT_USER):
+    """题库还没有进度时，从内容 ID 重合的其他进度文件接收作答记录（题库被移动、改名或合并），返回新进度
+
+    只读取进度文件，不解析其他题库。原题库文件已不存在（移动、改名）时删除原进度（持有原进度的文件锁），
+    统计汇总转到新题库下。
+    """
+    own_key = bank_key(question_file)
+    wanted = set(ids)
+    answered, stats, moved = {}, {}, []
+    progress_dir = get_progress_dir(user)
+    for key, name in list_progress_files(progress_dir).items():
+        path = os.path.join(progress_dir, name)
+        if key == own_key:
+            continue
+        other = read_progress_file(path)
+        if other.get("schema") != PROGRESS_SCHEMA:
+            continue  # 旧格式进度只能按原题库的行转换，打开原题库时再迁移
+        # 旧版迁移来的进度和单题统计出现之前的作答没有 stats，只要出现在任一处就接收
+        shared = wanted.intersection(other["answered"]).union(wanted.intersection(other.get("stats", {})))
+        if not shared:
+            continue
+        for qid in shared:
+            record = other["answered"].get(qid)
+            if record and (qid not in answered or record["timestamp"] > answered[qid]["timestamp"]):
+                answered[qid] = record
+            if qid in other.get("stats", {}):
+                attempts, errors, latency = other["stats"][qid]
+                old_attempts, old_errors, _ = stats.get(qid, (0, 0, 0))
+                stats[qid] = [old_attempts + attempts, old_errors + errors, latency]
+        if other.get("file") and not os.path.exists(other["file"]):
+            moved.append(key)
+
+    progress = default_progress()
+    if not answered and not stats:
+        return progress
+    progress["answered"] = {qid: answered[qid] for qid in ids if qid in answered}
+    progress["stats"] = {qid: stats[qid] for qid in ids if qid in stats}
+    progress["wrong_questions"] = [qid for qid in ids if qid in answered and not answered[qid]["is_correct"]]
+    # 有单题统计的题按统计计数，没有统计的题按最近一次作答记一次
+    for qid in progress["answered"].keys() | progress["stats"].keys():
+        if qid in stats:
+            attempts, errors, _ = stats[qid]
+        else:
+            attempts, errors = 1, int(not answered[qid]["is_correct"])
+        progress["correct_count"] += attempts - errors
+        progress["wrong_count"] += errors
+    progress["total_questions"] = len(ids)
+
+    for key in moved:
+        # 原进度可能正被其他程序写入，和 ProgressStore 一样先取得文件锁
+        other_path = os.path.join(progress_dir, key + PROGRESS_EXT)
+        with file_lock(other_path):
+            for stale_path in (other_path, legacy_progress_path(other_path)):
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+    if moved:
+        move_summary(moved, question_file, progress, user)
+    return progress
+
+
+ADOPTION_CHECKED = set()  # 本进程中已尝试接收其他进度的 (用户, 进度文件)
+
+
+def open_progress(question_file, ids, user=DEFAULT_USER):
+    """读取题库进度（按内容 ID），需要时先迁移：旧格式进度转换为内容 ID，没有进度时接收移动/合并前题库的进度"""
+    path = get_progress_file_path(question_file, user)
+    progress = read_progress_file(path)
+    if progress.get("schema") == PROGRESS_SCHEMA and progress_exists(path):
+        return progress
+
+    with file_lock(path):
+        if not progress_exists(path):
+            # 每个题库在本进程中只尝试接收一次，之后没有进度的加载不再读取其他进度文件
+            if (user, path) in ADOPTION_CHECKED:
+                return default_progress()
+            ADOPTION_CHECKED.add((user, path))
+            progress = adopt_progress(question_file, ids, user)
+            if not progress["answered"]:
+                return progress
+        else:
+            progress = read_progress_file(path)
+            if progress.get("schema") == PROGRESS_SCHEMA:
+                return progress
+            progress = progress_to_ids(progress, ids)
+        progress["file"] = question_file
+        write_progress_file(path, progress)
+    return progress
+
+
+class ProgressStore:
+    """多用户进度存储
+
+    作答先记入内存并排队，累计 batch_size 次或超过 flush_interval 秒后批量写盘。写盘时加文件锁，
+    重新读取磁盘上的最新进度，把排队的作答逐条合并上去再原子写回，多个程序同时写同一份进度也不会丢失作答。
+    题目顺序、当前位置等会话信息以最后写入的为准。
+    进度文件按题目内容 ID 保存，self.progress 是按当前题库题目序号的视图（见 progress_by_index）。
+    """
+
+    SESSION_FIELDS = ("total_questions", "current_index", "order")
+
+    def __init__(self, question_file, user=DEFAULT_USER, batch_size=FLUSH_BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 ids=None):
+        self.question_file = question_file
+        self.user = user
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.path = get_progress_file_path(question_file, user)
+        if ids is None:
+            ids = [question["qid"] for question in parse_question_file(question_file)]
+        self.ids = ids  # 题目序号 -> 内容 ID
+        self.digest = ids_digest(ids)
+        self.pending = []  # 尚未写盘的作答
+        self.last_flush = time.monotonic()
+        self.progress = progress_by_index(open_progress(question_file, ids, user), ids)
+
+    def record(self, q_index, user_answer, is_correct, latency=0.0, q_type=None, auto_flush=True):
+        """记录一次作答，达到批量条件时写盘（auto_flush=False 时由调用方根据 due() 安排写盘），返回该题统计"""
+        event = {"q": q_index, "id": self.ids[q_index], "answer": user_answer, "correct": is_correct,
+                 "ts": time.time(), "latency": latency, "type": q_type or "未知题型"}
+        self.pending.append(event)
+        stat = apply_answer(self.progress, q_index, user_answer, is_correct, event["ts"], latency)
+
+        if auto_flush and self.due():
+            self.flush()
+        return stat
+
+    def due(self):
+        """是否达到批量写盘条件"""
+        return len(self.pending) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval
+
+    @PERF.timed("progress.flush")
+    def flush(self):
+        """把排队的作答合并写盘，并用合并结果刷新内存中的进度（保持同一个字典对象）"""
+        events, session = self.snapshot()
+        self.finish_flush(events, self.write_events(events, session))
+
+    # 写盘分为三步，服务端只把 write_events 放到线程池中执行，读写 self.pending / self.progress 都留在事件循环线程
+    def snapshot(self):
+        """取出待写盘的作答和会话信息的副本"""
+        session = {field: copy.deepcopy(self.progress[field])
+                   for field in self.SESSION_FIELDS if field in self.progress}
+        return list(self.pending), session
+
+    def write_events(self, events, session):
+        """把 snapshot 取出的作答合并写盘，返回合并后按题目序号的进度视图（不修改本对象的状态，可在其他线程执行）"""
+        with file_lock(self.path):
+            merged = read_progress_file(self.path)
+            if merged.get("schema") != PROGRESS_SCHEMA:
+                merged = progress_to_ids(merged, self.ids)
+            for event in events:
+                apply_answer(merged, event["id"], event["answer"], event["correct"], event["ts"], event["latency"])
+            merged.update(session)
+            merged["file"] = self.question_file
+            merged["ids_digest"] = self.digest
+            write_progress_file(self.path, merged)
+        view = progress_by_index(merged, self.ids)
+        update_summary(self.question_file, events, view, self.user)
+        append_events(self.question_file, events, self.user)
+        return view
+
+    def finish_flush(self, events, view):
+        """写盘完成后移出已写入的作答，用合并结果刷新内存中的进度（写盘期间新记的作答重新计入）"""
+        self.pending = self.pending[len(events):]
+        for event in self.pending:
+            apply_answer(view, event["q"], event["answer"], event["correct"], event["ts"], event["latency"])
+        self.last_flush = time.monotonic()
+        self.progress.clear()
+        self.progress.update(view)
+
+
+def get_summary_path(user=DEFAULT_USER):
+    """获取用户的统计汇总文件路径"""
+    return os.path.join(get_progress_dir(user), SUMMARY_FILE)
+
+
+def default_summary():
+    """默认统计汇总：{"banks": {题库标识: 统计}}"""
+    return {"banks": {}}
+
+
+def load_summary(user=DEFAULT_USER):
+    """加载统计汇总"""
+    return read_json_file(get_summary_path(user), default_summary)
+
+
+def new_bank_summary(question_file):
+    """单个题库的统计：作答次数、答对次数、分题型和分日期的 [作答次数, 答对次数]"""
+    parts = os.path.normpath(os.path.relpath(question_file, ROOT_DIR)).split(os.sep)
+    return {
+        "file": question_file,
+        "subject": parts[0] if len(parts) > 1 else "未分类",
+        "name": os.path.basename(question_file),
+        "total": 0,
+        "answered": 0,
+        "wrong_now": 0,
+        "attempts": 0,
+        "correct": 0,
+        "types": {},
+        "daily": {},
+        "updated": 0
+    }
+
+
+def add_attempts(counter, key, attempts, correct):
+    """在 {key: [作答次数, 答对次数]} 中累加"""
+    item = counter.setdefault(key, [0, 0])
+    item[0] += attempts
+    item[1] += correct
+
+
+def update_summary(question_file, events, progress, user=DEFAULT_USER):
+    """把一批作答增量累加到统计汇总（随进度写盘调用，看板无需逐个读取进度文件）"""
+    if not events:
+        return
+    summary_path = get_summary_path(user)
+    with file_lock(summary_path):
+        summary = load_summary(user)
+        entry = summary["banks"].setdefault(bank_key(question_file), new_bank_summary(question_file))
+        for event in events:
+            correct = int(bool(event["correct"]))
+            entry["attempts"] += 1
+            entry["correct"] += correct
+            add_attempts(entry["types"], event.get("type", "未知题型"), 1, correct)
+            add_attempts(entry["daily"], time.strftime("%Y-%m-%d", time.localtime(event["ts"])), 1, correct)
+
+        # 题数、已做题数、当前错题数取合并后进度的快照
+        entry["total"] = progress.get("total_questions", 0)
+        entry["answered"] = len(progress["answered"])
+        entry["wrong_now"] = len(progress["wrong_questions"])
+        entry["updated"] = time.time()
+        for day in sorted(entry["daily"])[:-SUMMARY_DAYS]:
+            del entry["daily"][day]
+        atomic_write_json(summary_path, summary)
+
+
+def remove_from_summary(keys, user=DEFAULT_USER):
+    """删除进度文件后同步删除对应题库的统计；keys 为 None 时清空"""
+    summary_path = get_summary_path(user)
+    with file_lock(summary_path):
+        summary = load_summary(user)
+        if keys is None:
+            summary["banks"].clear()
+        else:
+            for key in keys:
+                summary["banks"].pop(key, None)
+        atomic_write_json(summary_path, summary)
+
+
+def move_summary(old_keys, question_file, progress, user=DEFAULT_USER):
+    """题库移动或合并后，把原题库的统计合并到新题库下（progress 为新题库按内容 ID 的进度）"""
+    summary_path = get_summary_path(user)
+    with file_lock(summary_path):
+        summary = load_summary(user)
+        entry = summary["banks"].setdefault(bank_key(question_file), new_bank_summary(question_file))
+        for key in old_keys:
+            old = summary["banks"].pop(key, None)
+            if old is None:
+                continue
+            entry["attempts"] += old["attempts"]
+            entry["correct"] += old["correct"]
+            for q_type, (attempts, correct) in old["types"].items():
+                add_attempts(entry["types"], q_type, attempts, correct)
+            for day, (attempts, correct) in old["daily"].items():
+                add_attempts(entry["daily"], day, attempts, correct)
+        entry["total"] = progress.get("total_questions", 0)
+        entry["answered"] = len(progress["answered"])
+        entry["wrong_now"] = len(progress["wrong_questions"])
+        entry["updated"] = time.time()
+        atomic_write_json(summary_path, summary)
+
+
+def rebuild_summary(user=DEFAULT_USER):
+    """从所有进度文件重建统计汇总（升级前已有的进度或汇总丢失时使用），返回汇总"""
+    bank_files = discover_banks()
+    progress_dir = get_progress_dir(user)
+    summary = default_summary()
+
+    for key, file in list_progress_files(progress_dir).items():
+        if key not in bank_files:
+            continue
+        # 顺带把旧格式的进度迁移为按内容 ID 保存；题库无法解析时只统计进度文件中的计数
+        try:
+            questions = parse_question_file(bank_files[key])
+        except Exception:
+            questions = []
+        if questions:
+            ids = [question["qid"] for question in questions]
+            progress = progress_by_index(open_progress(bank_files[key], ids, user), ids)
+        else:
+            progress = read_progress_file(os.path.join(progress_dir, file))
+        entry = new_bank_summary(bank_files[key])
+        entry["correct"] = progress.get("correct_count", 0)
+        entry["attempts"] = entry["correct"] + progress.get("wrong_count", 0)
+        entry["total"] = progress.get("total_questions", 0)
+        entry["answered"] = len(progress["answered"])
+        entry["wrong_now"] = len(progress["wrong_questions"])
+        entry["updated"] = time.time()
+
+        # 分题型统计来自单题统计，分日期只能按每题最近一次作答计
+        for idx, (attempts, errors, _) in progress.get("stats", {}).items():
+            if questions:
+                add_attempts(entry["types"], questions[int(idx)].get("题型", "未知题型"), attempts, attempts - errors)
+        for record in progress["answered"].values():
+            add_attempts(entry["daily"], time.strftime("%Y-%m-%d", time.localtime(record["timestamp"])), 1,
+                         int(bool(record["is_correct"])))
+        summary["banks"][key] = entry
+
+    summary_path = get_summary_path(user)
+    with file_lock(summary_path):
+        atomic_write_json(summary_path, summary)
+    return summary
+
+
+def get_events_dir(user=DEFAULT_USER):
+    """获取用户的作答历史目录"""
+    events_dir = os.path.join(get_progress_dir(user), EVENTS_DIR)
+    os.makedirs(events_dir, exist_ok=True)
+    return events_dir
+
+
+def append_events(question_file, events, user=DEFAULT_USER):
+    """把一批作答追加到作答历史（JSON Lines，每行一次作答，按月分文件）
+
+    进度文件只保留每题最后一次作答，历史日志保留全部作答，供 export_events.py 导出分析。
+    同一批作答一次写入，加文件锁，多个程序同时追加也不会交错。
+    """
+    if not events:
+        return
+    key = bank_key(question_file)
+    by_month = {}
+    for event in events:
+        line = json.dumps({
+            "ts": round(event["ts"], 3),
+            "bank": key,
+            "file": question_file,
+            "q": event["q"],
+            "id": event.get("id"),
+            "type": event.get("type", "未知题型"),
+            "answer": event["answer"],
+            "correct": bool(event["correct"]),
+            "latency": event["latency"]
+        }, ensure_ascii=False, separators=(",", ":"))
+        month = time.strftime("%Y-%m", time.localtime(event["ts"]))
+        by_month.setdefault(month, []).append(line + "\n")
+
+    events_dir = get_events_dir(user)
+    for month, lines in by_month.items():
+        path = os.path.join(events_dir, f"{month}.jsonl")
+        with file_lock(path):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+
+
+def remove_events(keys=None, user=DEFAULT_USER):
+    """从作答历史中删除指定题库（题库标识列表）的作答，keys 为 None 时删除全部作答历史，返回删除的条数"""
+    events_dir = get_events_dir(user)
+    removed = 0
+    for name in sorted(os.listdir(events_dir)):
+        if not name.endswith((".jsonl", ".jsonl.gz")):
+            continue
+        path = os.path.join(events_dir, name)
+        with file_lock(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            compressed = name.endswith(".gz")
+            lines = (gzip.decompress(data) if compressed else data).decode("utf-8").splitlines(keepends=True)
+            kept = [] if keys is None else [line for line in lines if json.loads(line).get("bank") not in keys]
+            if len(kept) == len(lines):
+                continue
+            removed += len(lines) - len(kept)
+            if not kept:
+                os.remove(path)
+                continue
+            data = "".join(kept).encode("utf-8")
+            atomic_write_bytes(path, gzip.compress(data, 9, mtime=0) if compressed else data)
+    return removed
+
+
+def trim_answered(progress, cutoff):
+    """早于 cutoff 的作答记录去掉作答内容（对错和时间保留，错题列表和单题统计不受影响），返回处理的条数"""
+    trimmed = 0
+    for record in progress.get("answered", {}).values():
+        if "user_answer" in record and record.get("timestamp", 0) < cutoff:
+            del record["user_answer"]
+            trimmed += 1
+    return trimmed
+
+
+def compact_events(user=DEFAULT_USER, now=None):
+    """之前月份的作答历史压缩为 <年-月>.jsonl.gz（晚到的作答追加为新的 gzip 段），返回压缩的文件数"""
+    current_month = time.strftime("%Y-%m", time.localtime(now or time.time()))
+    events_dir = get_events_dir(user)
+    compressed = 0
+    for name in sorted(os.listdir(events_dir)):
+        if not name.endswith(".jsonl") or name[:-len(".jsonl")] >= current_month:
+            continue
+        path = os.path.join(events_dir, name)
+        with file_lock(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            try:
+                with open(path + ".gz", "rb") as f:
+                    data_gz = f.read()
+            except FileNotFoundError:
+                data_gz = b""
+            atomic_write_bytes(path + ".gz", data_gz + gzip.compress(data, 9, mtime=0))
+            os.remove(path)
+        compressed += 1
+    return compressed
+
+
+def progress_dir_size(progress_dir):
+    """进度目录（不含其他用户的子目录）中进度、汇总和作答历史的总字节数"""
+    paths = [os.path.join(progress_dir, name) for name in os.listdir(progress_dir)]
+    events_dir = os.path.join(progress_dir, EVENTS_DIR)
+    if os.path.isdir(events_dir):
+        paths += [os.path.join(events_dir, name) for name in os.listdir(events_dir)]
+    return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+
+@PERF.timed("progress.compact")
+def compact_progress(user=DEFAULT_USER, now=None):
+    """整理进度目录，返回报告
+
+    旧版 JSON 进度转换为压缩快照；超过 PROGRESS_RETENTION_DAYS 天的作答记录去掉作答内容；
+    题库已不在题库目录中（见 discover_banks）、原路径也不存在，且超过 STALE_PROGRESS_DAYS 天没有写入的进度连同统计删除
+    （期限内打开移动或改名后的题库仍会接收原进度，见 adopt_progress）；之前月份的作答历史压缩。
+    读不了的进度（更新版本写入、内容损坏或无法访问）跳过并计入 skipped，不影响其他文件的整理。
+    """
+    now = now or time.time()
+    progress_dir = get_progress_dir(user)
+    report = {"converted": 0, "trimmed": 0, "removed": 0, "skipped": 0, "events_compressed": 0,
+              "bytes_before": progress_dir_size(progress_dir)}
+    banks = discover_banks()
+    removed = []
+    for key, name in list_progress_files(progress_dir).items():
+        path = os.path.join(progress_dir, key + PROGRESS_EXT)
+        try:
+            with file_lock(path):
+                progress = read_progress_file(path, strict=True)
+                source = progress.get("file")
+                if key not in banks and not (source and os.path.exists(source)) and \
+                        now - os.path.getmtime(os.path.join(progress_dir, name)) > STALE_PROGRESS_DAYS * 86400:
+                    for stale_path in (path, legacy_progress_path(path)):
+                        if os.path.exists(stale_path):
+                            os.remove(stale_path)
+                    removed.append(key)
+                    continue
+
+                trimmed = trim_answered(progress, now - PROGRESS_RETENTION_DAYS * 86400)
+                converted = not name.endswith(PROGRESS_EXT)
+                if trimmed or converted:
+                    write_progress_file(path, progress)
+                report["trimmed"] += trimmed
+                report["converted"] += converted
+        except (OSError, RuntimeError, ValueError) as e:
+            # 更新版本的快照不能改写；损坏的文件原样留下，打开题库时才改名另存，都不能中断整理
+            print(f"跳过进度 {name}: {e}")
+            report["skipped"] += 1
+
+    if removed:
+        remove_from_summary(removed, user)
+    report["removed"] = len(removed)
+    report["events_compressed"] = compact_events(user, now)
+    report["bytes_after"] = progress_dir_size(progress_dir)
+    return report
+
+
+def maybe_compact_progress(user=DEFAULT_USER):
+    """距上次整理超过 COMPACT_INTERVAL 秒时整理进度目录（启动时在后台线程中调用），返回报告，无需整理时返回 None"""
+    marker = os.path.join(get_progress_dir(user), COMPACT_MARKER)
+    try:
+        if time.time() - os.path.getmtime(marker) < COMPACT_INTERVAL:
+            return None
+    except OSError:
+        pass
+    with open(marker, "w"):
+        pass  # 先更新标记，同时启动的其他程序不再重复整理
+    try:
+        return compact_progress(user)
+    except Exception as e:
+        # 在后台线程中运行，任何异常都只记录，不影响刷题
+        print(f"整理进度失败: {e}")
+        return None
 
 
 def check_answer(question, user_answer):
-    """检查答案是否正确"""
-    correct_answer = normalize_answer(question.get("答案", ""))
-    user_answer = normalize_answer(user_answer)
+    """检查答案是否正确，返回 (是否正确, 正确答案)；按题型交给对应的处理器评分"""
+    return type_handler(question).grade(question, get_answer_key(question), user_answer)
 
-    # 选择题检查
-    if (question.get("题型") == "选择题" or question.get("题型") == "判断题") and question.get("options"):
-        letters = ["A", "B", "C", "D", "E", "F", "G", "H"]
-        options = question.get("raw_options", [])
 
-        # 查找用户选择的选项文本
-        user_option_text = None
-        for i, letter in enumerate(letters):
-            if i < len(options) and user_answer.upper() == letter:
-                user_option_text = options[i]
-                break
+# 填空/主观题评分：评分所需的答案数据（归一化后的每空答案、要点的 TF-IDF 权重）按题预先编译，
+# 缓存在题目的 "_key" 字段中，批量评分时只需处理用户答案
+SENTENCE_PUNCT = str.maketrans("", "", ",.;:!?'\"`~、。，；：！？“”‘’…·")
 
-        # 查找标准答案对应的选项文本
-        correct_option_text = None
-        for i, letter in enumerate(letters):
-            if i < len(options) and correct_answer.upper() == letter:
-                correct_option_text = options[i]
-                break
 
-        # 如果找不到则使用原始答案
-        if user_option_text is None:
-            user_option_text = user_answer
-        if correct_option_text is None:
-            correct_option_text = correct_answer
-        # 使用转换后的文本进行比较
-        return user_option_text.strip() == correct_option_text.strip(), correct_option_text.strip()
-
-    # 多选题检查
-    if question.get("题型") == "多选题":
-        # 用户答案格式为 "A | B | C"
+def normalize_text(text):
+    """填空题答案归一化：全角转半角、英文转小写、去掉空白和句读标点（保留括号等代码符号）"""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    return "".join(text.split()).translate(SENTENCE_PUNCT)
+
+
+def split_blanks(answer):
+    """按空拆分填空题答案：优先用 "||" 分隔，否则用 "|" 分隔（忽略首尾多余的分隔符）"""
+    answer = str(answer)
+    parts = [part.strip() for part in (answer.split("||") if "||" in answer else answer.split("|"))]
+    return [part for part in parts if part] or [answer.strip()]
+
+
+def blank_alternatives(blank):
+    """一个空的多个可选答案用 "/" 分隔（数字之间的 "/" 视为分数，不拆分）"""
+    alternatives = {normalize_text(blank)}
+    alternatives.update(normalize_text(alt) for alt in re.split(r"(?<!\d)[/／](?!\d)", blank))
+    alternatives.discard("")
+    return sorted(alternatives)
+
+
+def keypoint_grams(text):
+    """主观题分词：只保留文字和数字后取字符二元组"""
+    text = re.sub(r"[\W_]+", "", unicodedata.normalize("NFKC", str(text)).lower())
+    if len(text) < 2:
+        return {text: 1} if text else {}
+    grams = {}
+    for i in range(len(text) - 1):
+        gram = text[i:i + 2]
+        grams[gram] = grams.get(gram, 0) + 1
+    return grams
+
+
+def split_keypoints(answer):
+    """把参考答案拆成要点：按换行、分号、句号和 1. / (1) / ① 之类的编号拆分"""
+    parts = re.split(r"[\n；;。]+|(?:^|\s)[(（]?\d{1,2}[)）.、．](?!\d)|[①-⑳]", str(answer))
+    keypoints = [part.strip() for part in parts if len(re.sub(r"[\W_]+", "", part)) >= 4]
+    return keypoints or [str(answer)]
+
+
+def get_answer_key(question):
+    """取题目的评分数据，没有时按单题编译"""
+    key = question.get("_key")
+    if key is None:
+        key = question["_key"] = type_handler(question).compile_key(question)
+    return key
+
+
+def keypoint_idf(answers):
+    """主观题要点的 IDF 权重，answers 为同一题库全部主观题的参考答案"""
+    doc_freq = {}
+    n = 0
+    for answer in answers:
+        n += 1
+        for gram in keypoint_grams(answer or ""):
+            doc_freq[gram] = doc_freq.get(gram, 0) + 1
+    return {gram: math.log((n + 1) / (df + 1)) + 1.0 for gram, df in doc_freq.items()}
+
+
+def build_answer_keys(questions):
+    """为整个题库预编译评分数据：主观题要点按题库内答案计算 TF-IDF 权重"""
+    idf = keypoint_idf(q.get("答案") for q in questions if type_handler(q).subjective)
+    for question in questions:
+        handler = type_handler(question)
+        question["_key"] = handler.compile_key(question, idf if handler.subjective else None)
+    return questions
+
+
+def is_typo(expected, actual):
+    """两串是否只差一处错字（替换、多写或漏写一个字），且这处改动不涉及否定字"""
+    if abs(len(expected) - len(actual)) > 1:
+        return False
+    shorter, longer = sorted((expected, actual), key=len)
+    i = 0
+    while i < len(shorter) and shorter[i] == longer[i]:
+        i += 1
+    if len(shorter) == len(longer):
+        if i == len(shorter):
+            return True
+        changed, same_rest = {shorter[i], longer[i]}, shorter[i + 1:] == longer[i + 1:]
+    else:
+        changed, same_rest = {longer[i]}, shorter[i:] == longer[i + 1:]
+    return same_rest and not changed & NEGATION_CHARS
+
+
+def blank_matches(alternatives, user_blank):
+    """单空是否答对：归一化后相同，或不含数字的较长答案只差一处错字"""
+    if user_blank in alternatives:
+        return True
+    for alt in alternatives:
+        if len(alt) >= FUZZY_BLANK_MIN_LEN and not any(ch.isdigit() for ch in alt) and is_typo(alt, user_blank):
+            return True
+    return False
+
+
+def grade_fill(key, user_answer):
+    """填空题评分，返回答对的空所占比例"""
+    blanks = key["blanks"]
+    user_answer = str(user_answer or "")
+    if not key["joined"]:
+        # 答案只有标点符号时按原文比较
+        return 1.0 if user_answer.strip() == key["raw"] else 0.0
+    user_blanks = [normalize_text(part) for part in split_blanks(user_answer)]
+    if len(user_blanks) != len(blanks) and len(blanks) > 1:
+        # 用户用逗号、顿号或空格分隔各空
+        user_blanks = [normalize_text(part) for part in re.split(r"[，,、；;\s]+", user_answer.strip()) if part]
+    if len(user_blanks) != len(blanks):
+        # 整体比较（参考答案本身就是一句话时）
+        return 1.0 if normalize_text(user_answer) == key["joined"] and key["joined"] else 0.0
+
+    correct = sum(blank_matches(alternatives, user_blank) for alternatives, user_blank in zip(blanks, user_blanks))
+    return correct / len(blanks) if blanks else 0.0
+
+
+def grade_subjective(key, user_answer):
+    """主观题评分，返回 (得分, 答到的要点数, 要点总数)"""
+    keypoints = key["keypoints"]
+    if not keypoints:
+        return 0.0, 0, 0
+    user_grams = keypoint_grams(user_answer or "")
+    covered = 0
+    for weights, total in keypoints:
+        hit = sum(weight for gram, weight in weights.items() if gram in user_grams)
+        covered += hit / total >= KEYPOINT_RECALL
+    return covered / len(keypoints), covered, len(keypoints)
+
+
+# 题型处理器：每种题型的解析、评分数据编译、评分和界面渲染集中在一个处理器中，按题型名注册。
+# 题目第一次使用时把题型名解析为类型码缓存在 "_type" 字段，之后按类型码直接取处理器，
+# 新增题型只需注册新的处理器，不会让评分和渲染的分支变长。
+LETTERS = ["A", "B", "C", "D", "E", "F", "G", "H"]
+QUESTION_TYPES = []  # 类型码 -> 处理器
+TYPE_CODES = {}  # 题型名 -> 类型码
+
+
+def register_question_type(handler, *names):
+    """注册题型处理器，names 为该处理器负责的题型名（含别名）"""
+    code = len(QUESTION_TYPES)
+    QUESTION_TYPES.append(handler)
+    for name in names:
+        TYPE_CODES[name] = code
+    return handler
+
+
+def type_handler(question):
+    """取题目的题型处理器（类型码缓存在题目中）"""
+    code = question.get("_type")
+    if code is None:
+        code = question["_type"] = TYPE_CODES.get(question.get("题型"), 0)
+    return QUESTION_TYPES[code]
+
+
+def answer_letters(answer):
+    """从答案中取出选项字母序列，如 "B, A | D" -> ["B", "A", "D"]"""
+    return re.findall(r"[A-H]", str(answer).upper())
+
+
+def answer_layout(question):
+    """答案框的排版：(整理后的答案文字, 答案框行数)，每题只计算一次，缓存在题目的 "_layout" 字段"""
+    layout = question.get("_layout")
+    if layout is None:
+        answer = str(question.get("答案", "???"))
+        answer = answer.strip().replace('(', '\n(').replace(')\n', ')').replace('\n()', '() ')
+        lines = sum(max(1, -(-len(line) // ANSWER_WRAP_CHARS)) for line in answer.split("\n"))
+        layout = question["_layout"] = (answer, min(max(lines, ANSWER_MIN_LINES), ANSWER_MAX_LINES))
+    return layout
+
+
+class QuestionType:
+    """题型处理器基类：答案原样比较，有选项时用按钮作答，否则用输入框"""
+
+    subjective = False  # 主观题：按要点覆盖评分，可手动评分
+
+    def parse(self, question):
+        """解析表格行时调用，补充该题型需要的字段"""
+
+    def compile_key(self, question, idf=None):
+        """编译评分数据（每题只做一次）"""
+        return {"answer": normalize_answer(question.get("答案", ""))}
+
+    def grade(self, question, key, user_answer):
+        """评分，返回 (是否正确, 正确答案)"""
+        return normalize_answer(user_answer) == key["answer"], key["answer"]
+
+    def answer_display(self, question):
+        """“查看答案”时显示的正确答案"""
+        return normalize_answer(question.get("答案", ""))
+
+    def render_review(self, app, parent):
+        """背题模式：显示标准答案"""
+        answer_frame = tk.LabelFrame(parent, text="标准答案", font=("微软雅黑", 12, "bold"),
+                                     bg="#f0f0f0", padx=10, pady=10)
+        answer_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+
+        answer, lines = answer_layout(app.current_question)
+        answer_text = scrolledtext.ScrolledText(answer_frame, font=("微软雅黑", 12), wrap=tk.WORD, height=lines)
+        answer_text.insert(tk.INSERT, answer)
+        answer_text.config(state=tk.DISABLED)
+        answer_text.pack(fill=tk.BOTH, expand=True)
+
+    def render_input(self, app, parent):
+        """练习模式：显示作答区域"""
+        options = app.current_question.get("options", [])
+        if options:
+            options_frame = tk.LabelFrame(parent, text="选项", font=("微软雅黑", 12, "bold"),
+                                          bg="#f0f0f0", padx=10, pady=10)
+            options_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+
+            for letter, opt in zip(LETTERS, options):
+                btn = tk.Button(options_frame, text=f"{letter}. {opt}",
+                                command=lambda l=letter: app.check_answer_wrapper(l),
+                                font=("微软雅黑", 11), bg="#E0E0E0", width=60, anchor="w")
+                btn.pack(pady=5, padx=10, anchor="w")
+        else:
+            self.render_entry(app, parent, "答案:")
+
+    def render_entry(self, app, parent, label):
+        """单行答案输入框和提交按钮"""
+        answer_frame = tk.Frame(parent, bg="#f0f0f0")
+        answer_frame.pack(fill=tk.X, pady=10)
+
+        tk.Label(answer_frame, text=label, font=("微软雅黑", 12), bg="#f0f0f0").pack(side=tk.LEFT)
+
+        app.answer_entry = tk.Entry(answer_frame, font=("微软雅黑", 12), width=30)
+        app.answer_entry.pack(side=tk.LEFT, padx=10)
+        app.answer_entry.bind("<Return>", lambda event: app.check_answer_wrapper(app.answer_entry.get()))
+
+        tk.Button(answer_frame, text="提交", command=lambda: app.check_answer_wrapper(app.answer_entry.get()),
+                  font=("微软雅黑", 12), bg="#4CAF50", fg="white").pack(side=tk.LEFT)
+
+    def render_exam(self, app, parent, question, saved):
+        """模拟考试：显示作答区域，返回读取作答内容的函数"""
+        options = question.get("options", [])
+        if options:
+            choice_var = tk.StringVar(value=saved)
+            for letter, opt in zip(LETTERS, options):
+                tk.Radiobutton(parent, text=f"{letter}. {opt}", variable=choice_var, value=letter,
+                               font=("微软雅黑", 11), bg="#f0f0f0", anchor="w").pack(fill=tk.X, pady=2)
+            return choice_var.get
+
+        answer_entry = tk.Entry(parent, font=("微软雅黑", 12), width=50)
+        answer_entry.insert(0, saved)
+        answer_entry.pack(anchor="w")
+        answer_entry.bind("<Return>", lambda event: app.goto_exam_question(app.exam_index + 1))
+        return lambda: answer_entry.get().strip()
+
+
+class ChoiceType(QuestionType):
+    """单选题：答案字母换成选项文字后比较"""
+
+    def compile_key(self, question, idf=None):
+        correct = normalize_answer(question.get("答案", ""))
+        options = question.get("raw_options", [])
+        key = {"answer": correct, "options": options if question.get("options") else None}
+        if key["options"] is not None:
+            key["correct_text"] = self.option_text(options, correct).strip()
+        return key
+
+    @staticmethod
+    def option_text(options, answer):
+        """答案是选项字母时返回对应的选项文字，否则原样返回"""
+        for i, letter in enumerate(LETTERS[:len(options)]):
+            if answer.upper() == letter:
+                return options[i]
+        return answer
+
+    def grade(self, question, key, user_answer):
+        if key["options"] is None:
+            return super().grade(question, key, user_answer)
+        user_text = self.option_text(key["options"], normalize_answer(user_answer))
+        return user_text.strip() == key["correct_text"], key["correct_text"]
+
+    def answer_display(self, question):
+        correct_answer = normalize_answer(question.get("答案", ""))
+        if question.get("options"):
+            for letter, opt in zip(LETTERS, question.get("raw_options", [])):
+                if opt.strip() == correct_answer.strip():
+                    return f"{letter}. {opt}"
+        return correct_answer
+
+    def correct_letters(self, question):
+        """正确选项的字母（背题模式高亮用）"""
+        correct_answer = normalize_answer(question.get("答案", ""))
+        if correct_answer in LETTERS:
+            return [correct_answer]
+        return [letter for letter, opt in zip(LETTERS, question.get("raw_options", []))
+                if opt.strip() == correct_answer.strip()][-1:]
+
+    def render_review(self, app, parent):
+        question = app.current_question
+        if not question.get("options"):
+            return super().render_review(app, parent)
+
+        options_frame = tk.LabelFrame(parent, text="选项与答案", font=("微软雅黑", 12, "bold"),
+                                      bg="#f0f0f0", padx=10, pady=10)
+        options_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+
+        # 显示所有选项，正确选项用绿色标记
+        correct_answers = self.correct_letters(question)
+        for letter, option_text in zip(LETTERS, question.get("raw_options", [])):
+            option_frame = tk.Frame(options_frame, bg="#f0f0f0")
+            option_frame.pack(fill=tk.X, pady=2)
+
+            label = tk.Label(option_frame, text=f"{letter}. {option_text}", font=("微软雅黑", 11),
+                             bg="#f0f0f0", anchor="w")
+            if letter in correct_answers:
+                label.config(fg="green", font=("微软雅黑", 11, "bold"))
+            label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+
+class JudgeType(ChoiceType):
+    """判断题：固定两个选项“正确/错误”"""
+
+    def parse(self, question):
+        question["raw_options"] = ["正确", "错误"]
+        question["options"] = ["正确", "错误"]
+
+
+class MultiChoiceType(ChoiceType):
+    """多选题：答案为 "A | B | C"，与顺序无关"""
+
+    def parse(self, question):
+        answer_value = str(question.get("答案", ""))
+        if "|" in answer_value:
+            question["answer_parts"] = [part.strip() for part in answer_value.split("|")]
+        else:
+            question["answer_parts"] = [answer_value.strip()]
+
+    def compile_key(self, question, idf=None):
+        parts = [part.strip().upper() for part in question.get("answer_parts", [])]
+        return {"parts": set(parts), "display": " | ".join(parts)}
+
+    def grade(self, question, key, user_answer):
+        user_answer = normalize_answer(user_answer)
         user_parts = [part.strip().upper() for part in user_answer.split("|")] if "|" in user_answer else [
             user_answer.strip().upper()]
-        correct_parts = [part.strip().upper() for part in question.get("answer_parts", [])]
-
-        # 比较答案（顺序无关）
-        if set(user_parts) == set(correct_parts):
-            return True, " | ".join(correct_parts)
-        return False, " | ".join(correct_parts)
-
-    # 填空题处理（多个空）
-    if question.get("题型") == "填空题":
-        # 使用特定分隔符 || 分割答案
-        if " | " in correct_answer:
-            correct_parts = [part.strip() for part in correct_answer.split("||")]
-        else:
-            correct_parts = [correct_answer.strip()]
+        return set(user_parts) == key["parts"], key["display"]
+
+    def answer_display(self, question):
+        return normalize_answer(question.get("答案", ""))
+
+    def correct_letters(self, question):
+        letters = []
+        for part in question.get("answer_parts", []):
+            if part in LETTERS:
+                letters.append(part)
+            else:
+                letters.extend(letter for letter, opt in zip(LETTERS, question.get("raw_options", []))
+                               if opt.strip() == part.strip())
+        return letters
+
+    def render_input(self, app, parent):
+        options = app.current_question.get("options", [])
+        if not options:
+            return super().render_input(app, parent)
+
+        app.multi_select_vars = {}  # 重置选项状态
+        options_frame = tk.LabelFrame(parent, text="选项（可多选）", font=("微软雅黑", 12, "bold"),
+                                      bg="#f0f0f0", padx=10, pady=10)
+        options_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        app.multi_select_frame = options_frame
+
+        for letter, opt in zip(LETTERS, options):
+            var = tk.BooleanVar()
+            app.multi_select_vars[letter] = var
+            tk.Checkbutton(options_frame, text=f"{letter}. {opt}", variable=var, font=("微软雅黑", 11),
+                           bg="#f0f0f0", anchor="w").pack(fill=tk.X, pady=3, padx=10)
+
+        multi_submit_frame = tk.Frame(parent, bg="#f0f0f0")
+        multi_submit_frame.pack(pady=5)
+        tk.Button(multi_submit_frame, text="提交多选题答案", command=app.submit_multi_choice,
+                  font=("微软雅黑", 12), bg="#4CAF50", fg="white").pack(pady=5)
+
+    def render_exam(self, app, parent, question, saved):
+        options = question.get("options", [])
+        if not options:
+            return super().render_exam(app, parent, question, saved)
+
+        selected = set(part.strip() for part in saved.split("|")) if saved else set()
+        option_vars = []
+        for letter, opt in zip(LETTERS, options):
+            var = tk.BooleanVar(value=letter in selected)
+            option_vars.append((letter, var))
+            tk.Checkbutton(parent, text=f"{letter}. {opt}", variable=var,
+                           font=("微软雅黑", 11), bg="#f0f0f0", anchor="w").pack(fill=tk.X, pady=2)
+        return lambda: " | ".join(l for l, var in option_vars if var.get())
+
+
+class FillType(QuestionType):
+    """填空题：逐空比较（见 grade_fill）"""
+
+    def compile_key(self, question, idf=None):
+        answer = question.get("答案", "")
+        if answer is None:
+            answer = ""
+        return {"blanks": [blank_alternatives(blank) for blank in split_blanks(answer)],
+                "joined": normalize_text(answer), "raw": str(answer).strip(),
+                "answer": normalize_answer(answer)}
+
+    def grade(self, question, key, user_answer):
+        return grade_fill(key, user_answer) == 1.0, key["answer"]
+
+    def render_input(self, app, parent):
+        self.render_entry(app, parent, "答案（多个空用 | 分隔）:")
+
+
+class SubjectiveType(QuestionType):
+    """主观题（简答题/解答题/名词解释）：按参考答案要点覆盖率评分，也可以手动评分"""
+
+    subjective = True
+
+    def compile_key(self, question, idf=None):
+        answer = question.get("答案", "")
+        if answer is None:
+            answer = ""
+        idf = idf or {}
+        keypoints = []
+        for point in split_keypoints(answer):
+            weights = {gram: count * idf.get(gram, 1.0) for gram, count in keypoint_grams(point).items()}
+            total = sum(weights.values())
+            if total > 0:
+                keypoints.append((weights, total))
+        return {"keypoints": keypoints, "answer": normalize_answer(answer)}
+
+    def grade(self, question, key, user_answer):
+        score, _, _ = grade_subjective(key, user_answer)
+        return score >= SUBJECTIVE_PASS_SCORE, key["answer"]
+
+    def render_input(self, app, parent):
+        answer_frame = tk.LabelFrame(parent, text="您的解答", font=("微软雅黑", 12, "bold"), bg="#f0f0f0")
+        answer_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+
+        app.answer_text = scrolledtext.ScrolledText(answer_frame, font=("微软雅黑", 12), wrap=tk.WORD, height=8)
+        app.answer_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        # 自动评分（按要点覆盖）和手动评分按钮
+        app.manual_check_frame = tk.Frame(parent, bg="#f0f0f0")
+        app.manual_check_frame.pack(pady=10)
+
+        tk.Button(app.manual_check_frame, text="提交并自动评分",
+                  command=lambda: app.check_answer_wrapper(app.answer_text.get("1.0", tk.END).strip()),
+                  font=("微软雅黑", 12), bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=5)
+
+        tk.Button(app.manual_check_frame, text="提交并标记正确", command=lambda: app.manual_check_answer(True),
+                  font=("微软雅黑", 12), bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
+
+        tk.Button(app.manual_check_frame, text="提交并标记错误", command=lambda: app.manual_check_answer(False),
+                  font=("微软雅黑", 12), bg="#F44336", fg="white").pack(side=tk.LEFT, padx=5)
+
+    def render_exam(self, app, parent, question, saved):
+        answer_text = scrolledtext.ScrolledText(parent, font=("微软雅黑", 12), wrap=tk.WORD, height=8)
+        answer_text.insert(tk.INSERT, saved)
+        answer_text.pack(fill=tk.BOTH, expand=True)
+        return lambda: answer_text.get("1.0", tk.END).strip()
+
+
+class SequenceType(QuestionType):
+    """排序题：按正确顺序写出选项字母，如 "BADC"，顺序完全一致才算对"""
+
+    hint = "按正确顺序输入选项字母，如 BADC:"
+
+    def compile_key(self, question, idf=None):
+        letters = answer_letters(question.get("答案", ""))
+        return {"letters": letters, "display": " → ".join(letters)}
+
+    def user_letters(self, user_answer, count):
+        return answer_letters(user_answer)
+
+    def grade(self, question, key, user_answer):
+        return self.user_letters(user_answer, len(key["letters"])) == key["letters"], key["display"]
+
+    def answer_display(self, question):
+        return get_answer_key(question)["display"]
+
+    def render_options(self, parent, question):
+        """列出选项（作答时只读）"""
+        options_frame = tk.LabelFrame(parent, text="选项", font=("微软雅黑", 12, "bold"),
+                                      bg="#f0f0f0", padx=10, pady=10)
+        options_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        for letter, opt in zip(LETTERS, question.get("options", [])):
+            tk.Label(options_frame, text=f"{letter}. {opt}", font=("微软雅黑", 11), bg="#f0f0f0",
+                     anchor="w").pack(fill=tk.X, pady=2)
+
+    def render_review(self, app, parent):
+        self.render_options(parent, app.current_question)
+        tk.Label(parent, text=f"答案: {self.answer_display(app.current_question)}", font=("微软雅黑", 12, "bold"),
+                 fg="green", bg="#f0f0f0").pack(anchor="w")
+
+    def render_input(self, app, parent):
+        self.render_options(parent, app.current_question)
+        self.render_entry(app, parent, self.hint)
+
+    def render_exam(self, app, parent, question, saved):
+        self.render_options(parent, question)
+        tk.Label(parent, text=self.hint, font=("微软雅黑", 11), bg="#f0f0f0").pack(anchor="w")
+        answer_entry = tk.Entry(parent, font=("微软雅黑", 12), width=50)
+        answer_entry.insert(0, saved)
+        answer_entry.pack(anchor="w")
+        answer_entry.bind("<Return>", lambda event: app.goto_exam_question(app.exam_index + 1))
+        return lambda: answer_entry.get().strip()
+
+
+class MatchingType(SequenceType):
+    """匹配题：题干中的第 1、2、3… 项依次对应的选项字母，答案写作 "1-B | 2-A | 3-C" 或 "BAC" """
 
-        if " | " in user_answer:
-            user_parts = [part.strip() for part in user_answer.split("||")]
+    hint = "按 1、2、3… 的顺序输入对应的选项字母，如 BAC:"
+
+    @staticmethod
+    def pairs_to_letters(answer):
+        """"1-B 2-A" 形式按序号排好后取字母，否则直接取字母序列"""
+        pairs = re.findall(r"(\d+)\s*[-—–:：.、=→]?\s*([A-Ha-h])", str(answer))
+        if pairs:
+            return [letter.upper() for _, letter in sorted(pairs, key=lambda pair: int(pair[0]))]
+        return answer_letters(answer)
+
+    def compile_key(self, question, idf=None):
+        letters = self.pairs_to_letters(question.get("答案", ""))
+        return {"letters": letters, "display": "  ".join(f"{i + 1}-{l}" for i, l in enumerate(letters))}
+
+    def user_letters(self, user_answer, count):
+        return self.pairs_to_letters(user_answer)
+
+
+register_question_type(QuestionType())  # 类型码 0：未注册的题型
+register_question_type(ChoiceType(), "选择题", "单选题")
+register_question_type(JudgeType(), "判断题")
+register_question_type(MultiChoiceType(), "多选题")
+register_question_type(FillType(), "填空题")
+register_question_type(SubjectiveType(), "简答题", "解答题", "名词解释")
+register_question_type(SequenceType(), "排序题")
+register_question_type(MatchingType(), "匹配题", "连线题")
+
+
+@PERF.timed("grade.batch")
+def grade_answers(questions, answers):
+    """批量评分，返回 [(是否正确, 正确答案), ...]；题目需先经 build_answer_keys 预编译以获得最佳速度"""
+    return [check_answer(question, answer) for question, answer in zip(questions, answers)]
+
+
+def index_runs(indices):
+    """把递增的题目序号压缩为 [起始, 结束) 连续区间列表"""
+    runs = []
+    for idx in indices:
+        if runs and runs[-1][1] == idx:
+            runs[-1][1] = idx + 1
         else:
-            user_parts = [user_answer.strip()]
+            runs.append([idx, idx + 1])
+    return runs
+
+
+class QuestionOrder(Sequence):
+    """惰性的题目顺序：优先题目（错题）在前，其余题目按种子做伪随机置换
+
+    不生成打乱后的完整列表：候选题目按连续区间压缩保存，第 i 个位置的题目由 Feistel 置换即时算出，
+    只需把种子和参数存入进度，下次打开时即可原样恢复并直接定位到上次的位置。
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, head, runs, seed, selected_filter="全部", total=0):
+        self.head = list(head)
+        self.runs = [tuple(run) for run in runs]
+        self.seed = seed
+        self.selected_filter = selected_filter
+        self.total = total
+
+        # 每个区间在候选池中的起始位置
+        self.offsets = []
+        size = 0
+        for start, stop in self.runs:
+            self.offsets.append(size)
+            size += stop - start
+        self.pool_size = size
+
+        # 置换定义在 2^(2*half_bits) >= pool_size 的域上，超出范围的值循环置换直到落入范围
+        self.half_bits = max(1, ((max(size, 2) - 1).bit_length() + 1) // 2)
+        self.mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed)
+        self.keys = [rng.getrandbits(32) for _ in range(self.ROUNDS)]
+
+    def _permute(self, i):
+        x = i
+        while True:
+            left, right = x >> self.half_bits, x & self.mask
+            for key in self.keys:
+                f = ((right ^ key) * 0x9E3779B1) & 0xFFFFFFFF
+                f ^= f >> 15
+                left, right = right, left ^ (f & self.mask)
+            x = (left << self.half_bits) | right
+            if x < self.pool_size:
+                return x
+
+    def _pool_item(self, k):
+        run = bisect_right(self.offsets, k) - 1
+        return self.runs[run][0] + k - self.offsets[run]
+
+    def __len__(self):
+        return len(self.head) + self.pool_size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("题目顺序下标越界")
+        if i < len(self.head):
+            return self.head[i]
+        return self._pool_item(self._permute(i - len(self.head)))
+
+    def to_state(self):
+        """可保存到进度文件中的状态"""
+        return {
+            "seed": self.seed,
+            "filter": self.selected_filter,
+            "head": self.head,
+            "runs": [list(run) for run in self.runs],
+            "total": self.total,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state["head"], state["runs"], state["seed"], state.get("filter", "全部"), state.get("total", 0))
+
+
+def build_question_order(questions, progress, selected_filter="全部", seed=None):
+    """按进度生成题目顺序：当前题型的错题在前，其余未做的题按种子置换；全部做完时置换所有该题型的题目"""
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    total = len(questions)
+
+    def type_matches(idx):
+        return selected_filter == "全部" or questions[idx].get("题型", "未知题型") == selected_filter
+
+    # 优先错题
+    wrong = [idx for idx in progress["wrong_questions"] if idx < total]
+    head = [idx for idx in wrong if type_matches(idx)]
+
+    # 添加未做过的题目（只记录区间，顺序由种子决定）
+    answered = progress["answered"]
+    if not answered and not wrong:
+        unanswered_runs = [[0, total]] if total else []  # 全新题库无需逐题遍历
+    else:
+        wrong_set = set(wrong)
+        unanswered_runs = index_runs(i for i in range(total) if str(i) not in answered and i not in wrong_set)
+
+    if selected_filter == "全部":
+        runs = unanswered_runs
+    else:
+        runs = index_runs(i for start, stop in unanswered_runs for i in range(start, stop) if type_matches(i))
+
+    # 如果没有错题或未做题，使用所有题目
+    if not wrong and not unanswered_runs:
+        runs = index_runs(i for i in range(total) if type_matches(i))
+
+    return QuestionOrder(head, runs, seed, selected_filter, total)
+
+
+def browser_sort_keys(questions, progress, col):
+    """题库浏览表格第 col 列（见 BROWSER_COLUMNS）所有题目的排序键"""
+    stats = progress.get("stats", {})
+    if col == 1:
+        return [str(q.get("问题", "")) for q in questions]
+    if col == 2:
+        rank = {q_type: i for i, q_type in enumerate(EXAM_TYPE_ORDER)}
+        return [(rank.get(q.get("题型", "未知题型"), len(rank)), str(q.get("题型", "未知题型"))) for q in questions]
+    if col == 3:
+        return [str(q.get("答案", "")) for q in questions]
+    return [stats[str(i)][1] if str(i) in stats else 0 for i in range(len(questions))]
+
+
+class FenwickSampler:
+    """按权重抽样的树状数组：修改单个权重和抽样都是 O(log n)"""
+
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.weights = [float(w) for w in weights]
+        self.rebuild()
+
+    def rebuild(self):
+        """按当前权重重新建树（O(n)），清除多次 update 累积的浮点误差"""
+        self.tree = [0.0] + self.weights
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+    def total(self):
+        """所有权重之和"""
+        result = 0.0
+        i = self.size
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+
+    def update(self, index, weight):
+        """把第 index 项的权重改为 weight"""
+        delta = float(weight) - self.weights[index]
+        self.weights[index] = float(weight)
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def sample(self, rng=random, retry=True):
+        """按权重抽取一个下标，权重全为 0 时返回 None"""
+        total = self.total()
+        if total <= 0:
+            return None
+
+        target = rng.random() * total
+        pos = 0
+        bit = 1 << (self.size.bit_length() - 1)
+        while bit:
+            nxt = pos + bit
+            if nxt <= self.size and self.tree[nxt] <= target:
+                target -= self.tree[nxt]
+                pos = nxt
+            bit >>= 1
+
+        # 浮点误差可能落到末尾的零权重项上，退回到前面最近的正权重项
+        while pos >= 0 and (pos >= self.size or self.weights[pos] <= 0):
+            pos -= 1
+        if pos < 0:
+            # 前面没有正权重：树中的和是累积误差（权重其实已全为 0）或与权重不符，重建后再抽一次
+            self.rebuild()
+            return self.sample(rng, retry=False) if retry else None
+        return pos
+
+
+def question_weight(stat):
+    """根据答题统计估计题目难度，作为抽样权重
+
+    stat 为 [作答次数, 错误次数, 最近一次用时(秒)]，没有统计的题目按 0.5 处理；
+    错误率做拉普拉斯平滑，作答越慢权重略高。
+    """
+    if not stat:
+        return 0.5
+    attempts, errors, latency = stat
+    return (errors + 1) / (attempts + 2) + 0.1 * min(latency / 30.0, 1.0)
+
+
+def sample_exam_paper(question_files, per_type, seed=None, wrong_weight=3.0, user=DEFAULT_USER):
+    """按题型分层抽取模拟试卷
+
+    一次流式遍历所有题库，每种题型各做一次加权蓄水池抽样（A-Res），内存中只保留每种题型的 per_type 道题，
+    合并后的超大题库也不需要完整载入。做错过的题目权重为 wrong_weight，更容易被抽中。
+    遍历时顺带按各题库全部主观题计算要点权重，抽中的题目带着与整库评分一致的评分数据（见 grade_paper）。
+    返回 [(题库文件, 题目序号, 题目), ...]，按题型分组、组内随机。
+    """
+    rng = random.Random(seed)
+    reservoirs = {}  # 题型 -> 最小堆 [(抽样键, 计数, 题库文件, 题目序号, 题目)]
+    counter = 0
+    idf_by_file = {}  # 题库文件 -> 主观题要点的 IDF 权重
+
+    for file_path in question_files:
+        progress = load_progress(file_path, user)
+        wrong = set(progress.get("wrong_questions", []))
+        by_id = progress.get("schema") == PROGRESS_SCHEMA  # 旧格式进度的错题按题目序号记录
+        subjective_answers = []
+        for index, question in enumerate(iter_question_file(file_path)):
+            if type_handler(question).subjective:
+                subjective_answers.append(question.get("答案"))
+            weight = wrong_weight if (question["qid"] if by_id else index) in wrong else 1.0
+            key = rng.random() ** (1.0 / weight)
+            heap = reservoirs.setdefault(question.get("题型", "未知题型"), [])
+            item = (key, counter, file_path, index, question)
+            counter += 1
+            if len(heap) < per_type:
+                heapq.heappush(heap, item)
+            elif key > heap[0][0]:
+                heapq.heapreplace(heap, item)
+        idf_by_file[file_path] = keypoint_idf(subjective_answers)
+
+    def type_rank(q_type):
+        return (EXAM_TYPE_ORDER.index(q_type) if q_type in EXAM_TYPE_ORDER else len(EXAM_TYPE_ORDER), str(q_type))
+
+    paper = []
+    for q_type in sorted(reservoirs, key=type_rank):
+        items = reservoirs[q_type]
+        rng.shuffle(items)
+        paper.extend((file_path, index, question) for _, _, file_path, index, question in items)
+    for file_path, _, question in paper:
+        handler = type_handler(question)
+        question["_key"] = handler.compile_key(question, idf_by_file[file_path] if handler.subjective else None)
+    return paper
+
+
+class ReviewQueue:
+    """跨科目错题复习队列
+
+    只读取各题库的进度文件：每个有错题的题库建一个最小堆（question_weight 越高越靠前，同分时先答错的靠前），
+    用 heapq.merge 多路归并成一个全局队列。没有错题的题库不会被解析，有错题的题库在队列第一次轮到它时才解析并打开进度，
+    所以开始复习只需读取进度文件。
+    """
+
+    def __init__(self, user=DEFAULT_USER):
+        self.user = user
+        self.banks = {}  # 题库文件 -> (题目列表, 内容 ID -> 题目序号, ProgressStore)，轮到时才加载
+        bank_files = None
+        heaps = []
+        progress_dir = get_progress_dir(user)
+        for key, name in list_progress_files(progress_dir).items():
+            progress = read_progress_file(os.path.join(progress_dir, name))
+            wrong = progress.get("wrong_questions")
+            if not wrong:
+                continue
+            file_path = progress.get("file")
+            if not file_path:
+                # 旧版进度没有记录题库路径，按题库发现结果对应（只在需要时扫描一次）
+                bank_files = discover_banks() if bank_files is None else bank_files
+                file_path = bank_files.get(key)
+            if not file_path or not os.path.exists(file_path):
+                continue
+            # 错题按内容 ID（旧版进度按题目序号）记录，单题统计和作答记录的键相同
+            stats, answered = progress.get("stats", {}), progress["answered"]
+            heap = [(-question_weight(stats.get(str(ref))), answered.get(str(ref), {}).get("timestamp", 0), file_path, ref)
+                    for ref in wrong]
+            heapq.heapify(heap)
+            heaps.append(heap)
+        self.total = sum(len(heap) for heap in heaps)  # 开始时的错题数（复习过程中答对的题不会再出现）
+        self.items = heapq.merge(*(self.drain(heap) for heap in heaps))
+
+    @staticmethod
+    def drain(heap):
+        while heap:
+            yield heapq.heappop(heap)
+
+    def load_bank(self, file_path):
+        """解析题库并打开进度（每个题库只做一次），题库无法解析时进度存储为 None"""
+        bank = self.banks.get(file_path)
+        if bank is None:
+            try:
+                questions = parse_question_file(file_path)
+            except Exception as e:
+                print(f"复习队列跳过无法解析的题库 {file_path}: {e}")
+                bank = self.banks[file_path] = ([], {}, None)
+                return bank
+            build_answer_keys(questions)
+            ids = [question["qid"] for question in questions]
+            bank = self.banks[file_path] = (questions, {qid: i for i, qid in enumerate(ids)},
+                                            ProgressStore(file_path, self.user, ids=ids))
+        return bank
+
+    def next_question(self):
+        """取下一道仍在错题列表中的题目，返回 (进度存储, 题目序号, 题目)，队列已空时返回 None"""
+        for _, _, file_path, ref in self.items:
+            questions, positions, store = self.load_bank(file_path)
+            index = positions.get(ref) if isinstance(ref, str) else ref
+            if store is None or index is None or index not in store.progress["wrong_questions"]:
+                continue  # 题目已从题库中删除，或者已经在别处答对
+            return store, index, questions[index]
+        return None
+
+    def stores(self):
+        """已打开的各题库进度存储"""
+        return [store for _, _, store in self.banks.values() if store is not None]
+
+
+def grade_paper(paper, answers):
+    """整卷批量评分
+
+    answers 为 {试卷中的题号: 用户答案}，返回 (逐题结果列表, 按题型统计)。
+    主观题按要点覆盖率自动评分，结果中的 score 为得分。评分数据沿用 sample_exam_paper 按整个题库编译的结果，
+    同一答案在不同试卷中得分相同。
+    """
+    results = []
+    by_type = {}
+    for i, (_, _, question) in enumerate(paper):
+        q_type = question.get("题型", "未知题型")
+        user_answer = answers.get(i, "")
+        stat = by_type.setdefault(q_type, {"total": 0, "correct": 0, "graded": 0})
+        stat["total"] += 1
+
+        if type_handler(question).subjective:
+            score, _, _ = grade_subjective(get_answer_key(question), user_answer)
+            is_correct = bool(user_answer) and score >= SUBJECTIVE_PASS_SCORE
+            stat["graded"] += 1
+            stat["correct"] += is_correct
+            results.append({"user_answer": user_answer, "is_correct": is_correct, "score": score,
+                            "correct_answer": str(question.get("答案", ""))})
+            continue
 
-        if len(correct_parts) != len(user_parts):
-            return False, correct_answer
+        is_correct, correct_answer = check_answer(question, user_answer)
+        is_correct = bool(user_answer) and is_correct
+        stat["graded"] += 1
+        stat["correct"] += is_correct
+        results.append({"user_answer": user_answer, "is_correct": is_correct, "correct_answer": correct_answer})
+    return results, by_type
 
-        for c, u in zip(correct_parts, user_parts):
-            if c != u:
-                return False, correct_answer
 
-        return True, correct_answer
+class Timer:
+    """UIScheduler 返回的定时任务句柄"""
+    __slots__ = ("deadline", "seq", "callback", "interval", "key", "view", "active")
 
-    # 其他题型直接比较
-    return user_answer == correct_answer, correct_answer
+    def __init__(self, deadline, seq, callback, interval, key, view):
+        self.deadline = deadline
+        self.seq = seq
+        self.callback = callback
+        self.interval = interval  # 重复执行的间隔（秒），None 表示只执行一次
+        self.key = key
+        self.view = view  # 所属界面的编号，None 表示与界面无关
+        self.active = True
+
+    def __lt__(self, other):
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+    def cancel(self):
+        self.active = False
+
+
+class UIScheduler:
+    """界面定时任务的统一调度：所有任务共用一个 after() 回调，到期时间相近的任务合并执行。
+
+    与界面绑定的任务在 end_view()（切换界面）时一起取消，不会在控件销毁后再访问控件；
+    同一个 key 的任务只保留最新的一个。
+    """
+
+    def __init__(self, root, clock=time.monotonic):
+        self.root = root
+        self.clock = clock
+        self.skew = 0.0  # Tk 定时回调比时钟先到时补上的差值，保证时间不倒退
+        self.heap = []
+        self.keys = {}  # key -> Timer
+        self.counter = 0
+        self.view = 0  # 当前界面编号，每次 end_view() 加一
+        self.after_id = None
+        self.armed = None  # 已登记的 after() 对应的到期时间
+
+    def now(self):
+        return self.clock() + self.skew
+
+    def after(self, ms, callback, key=None, view=True, interval=None):
+        """ms 毫秒后执行 callback；view=False 的任务在切换界面后仍然有效"""
+        if key is not None:
+            old = self.keys.get(key)
+            if old is not None:
+                old.cancel()
+        self.counter += 1
+        timer = Timer(self.now() + ms / 1000, self.counter, callback, interval, key,
+                      self.view if view else None)
+        if key is not None:
+            self.keys[key] = timer
+        heapq.heappush(self.heap, timer)
+        self.arm()
+        return timer
+
+    def every(self, ms, callback, key=None, view=True, first=None):
+        """每隔 ms 毫秒执行一次 callback（首次在 first 毫秒后，默认 ms），直到句柄被取消"""
+        return self.after(ms if first is None else first, callback, key, view, ms / 1000)
+
+    def cancel(self, key):
+        timer = self.keys.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+    def end_view(self):
+        """切换界面：取消所有与当前界面绑定的任务"""
+        self.view += 1
+        for timer in self.heap:
+            if timer.view is not None:
+                timer.cancel()
+        self.keys = {key: timer for key, timer in self.keys.items() if timer.active}
+        self.arm()
+
+    def shutdown(self):
+        """取消全部任务"""
+        for timer in self.heap:
+            timer.cancel()
+        self.keys.clear()
+        self.arm()
+
+    def arm(self):
+        """按最早的到期时间登记（或取消）唯一的 after() 回调"""
+        heap = self.heap
+        while heap and not heap[0].active:
+            heapq.heappop(heap)
+        deadline = heap[0].deadline if heap else None
+        if deadline == self.armed:
+            return
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        self.armed = deadline
+        if deadline is not None:
+            delay = max(0, math.ceil((deadline - self.now()) * 1000))
+            self.after_id = self.root.after(delay, self.fire)
+
+    def fire(self):
+        """执行所有已到期（或在 SCHEDULER_SLACK_MS 内到期）的任务"""
+        self.after_id = None
+        if self.armed is not None and self.now() < self.armed:
+            self.skew += self.armed - self.now()
+        self.armed = None
+
+        horizon = self.now() + SCHEDULER_SLACK_MS / 1000
+        heap = self.heap
+        try:
+            while heap and heap[0].deadline <= horizon:
+                timer = heapq.heappop(heap)
+                if not timer.active:
+                    continue
+                if timer.interval is None:
+                    timer.active = False
+                    if timer.key is not None and self.keys.get(timer.key) is timer:
+                        del self.keys[timer.key]
+                else:
+                    timer.deadline += timer.interval
+                    if timer.deadline <= self.now():
+                        # 落后超过一个周期时跳过错过的周期，不连续补执行
+                        timer.deadline = self.now() + timer.interval
+                    heapq.heappush(heap, timer)
+                timer.callback()
+        finally:
+            self.arm()
+
+
+class VirtualList(tk.Frame):
+    """虚拟滚动列表
+
+    items 可以是任意支持 len() 和下标访问的序列（包括按需取数的惰性序列）。Canvas 上只保留一屏的行图元，
+    滚动时复用这些图元改写文字，创建和滚动的开销与条目总数无关。
+    render(条目) 返回单元格文字：单列时为字符串，指定 columns=[(标题, 宽度, 对齐), ...] 时为元组。
+    """
+
+    def __init__(self, master, items=(), render=str, command=None, columns=None, row_height=32,
+                 font=("微软雅黑", 11), height=400, width=600, multiple=False, on_select=None,
+                 on_heading=None, row_color=None, double_click=False, bg="white"):
+        super().__init__(master, bg=bg)
+        self.items = items
+        self.render = render
+        self.command = command  # 单击（double_click 为 True 时为双击）或回车时调用 command(条目)
+        self.on_select = on_select  # 选中变化时调用 on_select(选中的下标列表)
+        self.on_heading = on_heading  # 点击表头时调用 on_heading(列号)
+        self.row_color = row_color  # row_color(条目) 返回该行背景色，None 为默认
+        self.row_height = row_height
+        self.font = font
+        self.width = width
+        self.multiple = multiple
+        self.double_click = double_click
+        self.bg = bg
+        self.columns = columns or [(None, width, "w")]
+        self.first = 0  # 可见区域第一行的下标
+        self.selected = set()
+        self.anchor = None  # 键盘移动和 Shift 多选的基准行
+        self.pool = []  # 每个可见行的 (背景矩形, [单元格文字...])
+
+        if columns:
+            self.header = tk.Canvas(self, width=width, height=row_height, bg="#E0E0E0", highlightthickness=0)
+            self.header.pack(side=tk.TOP, fill=tk.X)
+            self.heading_items = []
+            x = 0
+            for col, (title, col_width, anchor) in enumerate(self.columns):
+                item = self.header.create_text(*self.cell_position(x, col_width, anchor, row_height / 2),
+                                               text=title, anchor=anchor, font=(font[0], font[1], "bold"))
+                self.header.tag_bind(item, "<Button-1>", lambda e, c=col: self.on_heading and self.on_heading(c))
+                self.heading_items.append(item)
+                x += col_width
+
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(self, width=width, height=height, bg=bg, highlightthickness=0, takefocus=1)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self.redraw())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Double-Button-1>", lambda e: self.double_click and self.activate(self.anchor))
+        self.canvas.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page")):
+            self.canvas.bind(key, lambda e, s=step: self.move_selection(s))
+        self.canvas.bind("<Home>", lambda e: self.move_selection(-len(self.items)))
+        self.canvas.bind("<End>", lambda e: self.move_selection(len(self.items)))
+        self.canvas.bind("<Return>", lambda e: self.activate(self.anchor))
+        self.redraw()
+
+    def heading(self, col, title):
+        """修改表头文字（如显示排序方向）"""
+        self.header.itemconfigure(self.heading_items[col], text=title)
+
+    @staticmethod
+    def cell_position(x, col_width, anchor, y_center):
+        """单元格文字的坐标（按对齐方式取左边缘、中点或右边缘）"""
+        if anchor == "e":
+            return x + col_width - 8, y_center
+        if anchor == "center":
+            return x + col_width / 2, y_center
+        return x + 8, y_center
+
+    def fit(self, text, col_width):
+        """按列宽截断文字（汉字按两个字符宽估算），避免压到相邻列"""
+        text = str(text).replace("\n", " ")
+        budget = int((col_width - 16) / (self.font[1] * 0.7))
+        used = 0
+        for i, ch in enumerate(text):
+            used += 2 if ord(ch) > 0x2E80 else 1
+            if used > budget:
+                return text[:max(i - 1, 0)] + "…"
+        return text
+
+    def visible_rows(self):
+        height = self.canvas.winfo_height()
+        if height <= 1:  # 尚未布局时按请求的高度计算
+            height = int(self.canvas.cget("height"))
+        return max(1, height // self.row_height)
+
+    def redraw(self):
+        """按当前滚动位置重绘可见行（只改写已有图元）"""
+        rows = self.visible_rows() + 1
+        while len(self.pool) < rows:
+            rect = self.canvas.create_rectangle(0, 0, 0, 0, outline="#EEEEEE")
+            texts = [self.canvas.create_text(0, 0, text="", anchor=anchor, font=self.font)
+                     for _, _, anchor in self.columns]
+            self.pool.append((rect, texts))
+
+        count = len(self.items)
+        self.first = max(0, min(self.first, count - self.visible_rows()))
+        width = max(self.canvas.winfo_width(), sum(w for _, w, _ in self.columns))
+        for r, (rect, texts) in enumerate(self.pool):
+            index = self.first + r
+            if r >= rows or index >= count:
+                self.canvas.itemconfigure(rect, state=tk.HIDDEN)
+                for text in texts:
+                    self.canvas.itemconfigure(text, state=tk.HIDDEN)
+                continue
+            item = self.items[index]
+            top = r * self.row_height
+            if index in self.selected:
+                color = "#BBDEFB"
+            else:
+                color = (self.row_color and self.row_color(item)) or (self.bg if index % 2 == 0 else "#FAFAFA")
+            self.canvas.coords(rect, 0, top, width, top + self.row_height)
+            self.canvas.itemconfigure(rect, fill=color, state=tk.NORMAL)
+            values = self.render(item)
+            if len(self.columns) == 1:
+                values = (values,)
+            x = 0
+            for text, value, (_, col_width, anchor) in zip(texts, values, self.columns):
+                if len(self.columns) == 1:
+                    col_width = width
+                self.canvas.coords(text, *self.cell_position(x, col_width, anchor, top + self.row_height / 2))
+                self.canvas.itemconfigure(text, text=self.fit(value, col_width), state=tk.NORMAL)
+                x += col_width
+
+        if count:
+            self.scrollbar.set(self.first / count, min(1.0, (self.first + self.visible_rows()) / count))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def yview(self, *args):
+        """滚动条和滚轮的回调：("moveto", 比例) 或 ("scroll", 数量, "units"/"pages")"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.items))
+        elif args[0] == "scroll":
+            step = self.visible_rows() if args[2] == "pages" else 3
+            self.first += int(args[1]) * step
+        self.redraw()
+
+    def see(self, index):
+        """滚动到使第 index 行可见"""
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + self.visible_rows():
+            self.first = index - self.visible_rows() + 1
+        self.redraw()
+
+    def set_items(self, items, keep_position=False):
+        """替换全部条目（排序、筛选后调用）"""
+        self.items = items
+        self.selected.clear()
+        self.anchor = None
+        if not keep_position:
+            self.first = 0
+        self.redraw()
+
+    def selection(self):
+        """选中行的下标（升序）"""
+        return sorted(self.selected)
+
+    def select(self, index, extend=False):
+        """选中一行；extend 为 True 时在多选模式下切换该行的选中状态"""
+        if self.multiple and extend:
+            self.selected ^= {index}
+        else:
+            self.selected = {index}
+        self.anchor = index
+        self.see(index)
+        if self.on_select:
+            self.on_select(self.selection())
+
+    def activate(self, index):
+        if index is not None and 0 <= index < len(self.items) and self.command:
+            self.command(self.items[index])
+
+    def move_selection(self, step):
+        if not len(self.items):
+            return
+        if step in ("page", "-page"):
+            step = self.visible_rows() * (1 if step == "page" else -1)
+        current = self.anchor if self.anchor is not None else self.first - (1 if step > 0 else 0)
+        self.select(max(0, min(len(self.items) - 1, current + step)))
+
+    def on_click(self, event):
+        self.canvas.focus_set()
+        index = self.first + int(event.y // self.row_height)
+        if index >= len(self.items):
+            return
+        self.select(index, extend=bool(event.state & 0x0004))  # Ctrl 多选
+        if not self.double_click and not (self.multiple and event.state & 0x0004):
+            self.activate(index)
 
 
 class ExamApp:
@@ -281,6 +2522,7 @@ class ExamApp:
         self.root.title("智能刷题系统")
         self.root.geometry("900x700")
         self.root.configure(bg="#f0f0f0")
+        self.scheduler = UIScheduler(root)  # 所有界面定时任务共用的调度器
 
         # 初始化变量
         self.subjects = []
@@ -297,24 +2539,62 @@ class ExamApp:
         self.filter_types = ["全部"]  # 题型筛选选项
         self.selected_filter = "全部"  # 当前选中的题型筛选
         self.filter_menu_open = False  # 筛选菜单是否打开
+        self.adaptive_mode = False  # 智能抽题模式：按错误率加权抽题
+        self.sampler = None  # 智能抽题的权重抽样器
+        self.drill_mode = False  # 速刷模式：键盘作答，答对立即下一题
+        self.drill_latencies = deque(maxlen=DRILL_LATENCY_WINDOW)  # 速刷模式最近的按键到下一题耗时（秒）
+        self.drill_over_budget = 0  # 速刷模式超出耗时预算的次数
+        self.drill_last = ""  # 速刷模式上一题的作答结果
+        self.drill_label = None  # 速刷模式状态标签
+        self.current_question = None  # 当前显示的题目
+        self.answered = False  # 当前题目是否已作答
+        self.question_shown_at = 0  # 当前题目显示的时间，用于统计答题用时
+        self.user = os.environ.get(USER_ENV) or DEFAULT_USER  # 当前用户ID
+        self.store = None  # 当前题库的进度存储
+        self.flush_timer = None  # 定时写盘任务
+        self.review_queue = None  # 全科错题复习队列（复习时题目来自多个题库）
+        self.review_targets = []  # 全科复习中第 i 题 -> (进度存储, 题库中的题目序号)
 
         # 创建主框架
         self.create_welcome_frame()
 
         # 确保安装所需包
         threading.Thread(target=self.install_required_packages, daemon=True).start()
+        # 定期整理进度目录（转换旧格式、清理过期内容），不占用启动时间
+        threading.Thread(target=maybe_compact_progress, args=(self.user,), daemon=True).start()
 
         self.result_label = None  # 结果标签
         self.countdown_label = None  # 倒计时标签
-        self.countdown_id = None  # 倒计时任务ID
+        self.countdown_timer = None  # 自动跳转倒计时任务
         self.countdown_seconds = 5  # 倒计时秒数
         self.wait_time_label = None  # 等待时间显示标签
 
         self.multi_select_vars = {}  # 存储多选题选项状态
         self.multi_select_frame = None  # 多选题选项框架
+        self.answer_panels = {}  # 当前题目已渲染的 "review"（背题答案）/ "input"（作答区域）面板
+        self.panel_parent = None  # 面板所在的题目主框架
+        self.panel_anchors = {}  # 面板名 -> 显示位置（pack 的 after/before 参数）
+        self.review_btn = None  # 背题模式切换按钮
+        self.mode_controls = None  # 导航栏中随背题模式变化的按钮区域
+
+        self.exam_paper = []  # 模拟试卷 [(题库文件, 题目序号, 题目), ...]
+        self.exam_answers = {}  # 模拟考试作答 {试卷题号: 答案}
+        self.exam_index = 0  # 当前试卷题号
+        self.exam_deadline = 0  # 考试结束时间（time.monotonic）
+        self.exam_timer = None  # 考试计时任务
+        self.exam_timer_label = None  # 考试剩余时间标签
+        self.exam_content_frame = None  # 试题显示区域
+        self.exam_read_answer = None  # 读取当前试题作答内容的函数
+
+        self.progress_list = None  # 进度管理界面的统计表格
+        self.browser_list = None  # 题库浏览表格
+        self.browser_keys = {}  # 题库浏览各列的排序键（列号 -> 每题的键），首次按该列排序时计算
+        self.browser_sort = (0, False)  # 题库浏览当前的排序列和是否倒序
 
         self.root.bind("<Control-Left>", self.handle_prev_shortcut)
         self.root.bind("<Control-Right>", self.handle_next_shortcut)
+        self.root.bind("<Key>", self.handle_drill_key)
+        self.root.protocol("WM_DELETE_WINDOW", self.quit_app)
 
     def handle_prev_shortcut(self, event):
         """处理Control+左箭头快捷键 - 上一题"""
@@ -324,21 +2604,100 @@ class ExamApp:
                 self.prev_question()
             else:
                 # 已经是第一题时的提示
-                self.result_label.config(text="已经是第一题", fg="orange")
-                # 显示提示后1.5秒清除
-                self.root.after(1500, lambda: self.result_label.config(text=""))
+                self.flash("已经是第一题")
 
     def handle_next_shortcut(self, event):
         """处理Control+右箭头快捷键 - 下一题"""
         # 只有在答题界面才响应快捷键
         if hasattr(self, 'current_question') and self.current_question is not None:
-            if self.current_index < len(self.question_order) - 1:
+            # 智能抽题和全科复习的题目逐题追加，由 next_question 取下一题（队列已空时显示结果）
+            if self.adaptive_mode or self.review_queue is not None or self.current_index < len(self.question_order) - 1:
                 self.next_question()
             else:
                 # 已经是最后一题时的提示
-                self.result_label.config(text="已经是最后一题", fg="orange")
-                # 显示提示后1.5秒清除
-                self.root.after(1500, lambda: self.result_label.config(text=""))
+                self.flash("已经是最后一题")
+
+    def handle_drill_key(self, event):
+        """速刷模式按键：A-H 选择（多选题为勾选），空格提交多选，1/2 作答判断题，回车下一题"""
+        if not self.drill_mode or self.review_mode or self.current_question is None or self.result_label is None:
+            return None
+        if isinstance(event.widget, (tk.Entry, tk.Text)):
+            return None  # 输入框内的按键由输入框自己处理
+
+        pressed_at = time.perf_counter()
+        key = event.keysym
+        handler = type_handler(self.current_question)
+        options = self.current_question.get("options", [])
+        letter = key.upper() if len(key) == 1 else ""
+        if key.isdigit() and 1 <= int(key) <= len(options):
+            letter = LETTERS[int(key) - 1]
+
+        if key in ("Return", "KP_Enter"):
+            self.drill_next(pressed_at)
+        elif self.answered:
+            return None
+        elif isinstance(handler, MultiChoiceType) and options:
+            if key == "space":
+                self.submit_multi_choice(pressed_at)
+            elif letter in self.multi_select_vars:
+                var = self.multi_select_vars[letter]
+                var.set(not var.get())
+            else:
+                return None
+        elif isinstance(handler, ChoiceType) and options and letter and letter in LETTERS[:len(options)]:
+            self.check_answer_wrapper(letter, pressed_at)
+        else:
+            return None
+        return "break"
+
+    def drill_next(self, pressed_at):
+        """速刷模式：进入下一题并统计按键到显示完成的耗时"""
+        self.next_question()
+        self.root.after_idle(self.finish_drill_latency, pressed_at)
+
+    def finish_drill_latency(self, pressed_at):
+        """记录一次按键到下一题显示完成（空闲回调执行）的耗时"""
+        duration = time.perf_counter() - pressed_at
+        PERF.record("drill.key_to_next", pressed_at, duration)
+        self.drill_latencies.append(duration)
+        if duration * 1000 > DRILL_LATENCY_BUDGET_MS:
+            self.drill_over_budget += 1
+        self.update_drill_label()
+
+    def drill_stats(self):
+        """速刷模式耗时统计：(次数, 平均毫秒, P95 毫秒, 超出预算次数)"""
+        samples = sorted(self.drill_latencies)
+        if not samples:
+            return 0, 0.0, 0.0, self.drill_over_budget
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return len(samples), sum(samples) / len(samples) * 1000, p95 * 1000, self.drill_over_budget
+
+    def update_drill_label(self):
+        """更新速刷模式状态标签"""
+        if not self.drill_label:
+            return
+        count, mean_ms, p95_ms, over = self.drill_stats()
+        text = f"{self.drill_last}  A-H/1-2 作答  空格提交多选  回车下一题"
+        if count:
+            text += f"    耗时 平均 {mean_ms:.1f}ms P95 {p95_ms:.1f}ms（预算 {DRILL_LATENCY_BUDGET_MS}ms，超出 {over} 次）"
+        self.drill_label.config(text=text, fg="#F44336" if p95_ms > DRILL_LATENCY_BUDGET_MS else "#666")
+
+    def toggle_drill_mode(self):
+        """切换速刷模式"""
+        self.drill_mode = not self.drill_mode
+        self.drill_last = ""
+        self.drill_latencies.clear()
+        self.drill_over_budget = 0
+        if self.drill_mode:
+            self.review_mode = False
+        self.show_question()
+
+    def flash(self, text, fg="orange"):
+        """在结果标签上显示提示，FLASH_MS 毫秒后清除（连续提示只保留最后一次的清除任务）"""
+        label = self.result_label
+        label.config(text=text, fg=fg)
+        self.scheduler.after(FLASH_MS, lambda: label.config(text="") if label.cget("text") == text else None,
+                             key="flash")
 
     def install_required_packages(self):
         install_package("openpyxl")
@@ -367,21 +2726,75 @@ class ExamApp:
         desc_label = tk.Label(self.root, text="选择科目开始刷题练习", font=("微软雅黑", 14), bg="#f0f0f0", fg="#555")
         desc_label.pack(pady=10)
 
+        # 当前用户
+        user_frame = tk.Frame(self.root, bg="#f0f0f0")
+        user_frame.pack(pady=5)
+        tk.Label(user_frame, text=f"当前用户: {self.user}", font=("微软雅黑", 11), bg="#f0f0f0",
+                 fg="#555").pack(side=tk.LEFT)
+        tk.Button(user_frame, text="切换用户", command=self.switch_user,
+                  font=("微软雅黑", 10), bg="#E0E0E0").pack(side=tk.LEFT, padx=10)
+
         # 科目选择按钮
         subject_btn = tk.Button(self.root, text="选择科目", command=self.show_subject_selection,
                                 font=("微软雅黑", 12), bg="#4CAF50", fg="white", padx=20, pady=10)
         subject_btn.pack(pady=20)
 
+        # 全科错题复习按钮
+        review_all_btn = tk.Button(self.root, text="全科错题复习", command=self.start_global_review,
+                                   font=("微软雅黑", 12), bg="#FF9800", fg="white", padx=20, pady=10)
+        review_all_btn.pack(pady=10)
+
         # 进度管理按钮
         progress_btn = tk.Button(self.root, text="进度管理", command=self.show_progress_management,
                                  font=("微软雅黑", 12), bg="#2196F3", fg="white", padx=20, pady=10)
         progress_btn.pack(pady=10)
 
+        # 性能诊断按钮
+        diag_btn = tk.Button(self.root, text="性能诊断", command=self.show_diagnostics,
+                             font=("微软雅黑", 12), bg="#607D8B", fg="white", padx=20, pady=10)
+        diag_btn.pack(pady=10)
+
         # 退出按钮
-        exit_btn = tk.Button(self.root, text="退出系统", command=self.root.quit,
+        exit_btn = tk.Button(self.root, text="退出系统", command=self.quit_app,
                              font=("微软雅黑", 12), bg="#F44336", fg="white", padx=20, pady=10)
         exit_btn.pack(pady=10)
 
+    def switch_user(self):
+        """切换用户（每个用户的进度分开保存）"""
+        user = simpledialog.askstring("切换用户", "请输入用户ID:", initialvalue=self.user, parent=self.root)
+        if user is None:
+            return
+        user = user.strip()
+        if not user:
+            messagebox.showwarning("提示", "用户ID不能为空")
+            return
+        self.flush_progress()
+        self.store = None
+        self.user = user
+        threading.Thread(target=maybe_compact_progress, args=(self.user,), daemon=True).start()
+        self.create_welcome_frame()
+
+    def flush_progress(self):
+        """把未写盘的作答写入进度文件"""
+        if self.flush_timer:
+            self.flush_timer.cancel()
+            self.flush_timer = None
+        stores = [self.store] if self.store is not None else []
+        if self.review_queue is not None:
+            stores += [store for store in self.review_queue.stores() if store.pending]
+        for store in stores:
+            try:
+                store.flush()
+            except (OSError, TimeoutError) as e:
+                messagebox.showerror("错误", f"保存进度失败: {e}")
+                break
+
+    def quit_app(self):
+        """保存进度后退出"""
+        self.flush_progress()
+        self.scheduler.shutdown()
+        self.root.quit()
+
     def show_subject_selection(self):
         """显示科目选择界面"""
         self.clear_frame()
@@ -403,15 +2816,11 @@ class ExamApp:
             back_btn.pack(pady=10)
             return
 
-        # 科目选择框架
-        subject_frame = tk.Frame(self.root, bg="#f0f0f0")
-        subject_frame.pack(pady=10, fill=tk.BOTH, expand=True)
-
         # 科目列表
-        for i, subject in enumerate(self.subjects):
-            btn = tk.Button(subject_frame, text=subject, command=lambda s=subject: self.select_subject(s),
-                            font=("微软雅黑", 12), bg="#E0E0E0", width=30, height=2)
-            btn.grid(row=i, column=0, padx=20, pady=10, sticky="ew")
+        subject_list = VirtualList(self.root, self.subjects, command=self.select_subject, row_height=48,
+                                   font=("微软雅黑", 12), width=400, height=420)
+        subject_list.pack(pady=10, padx=20, fill=tk.Y, expand=True)
+        subject_list.canvas.focus_set()
 
         # 返回按钮
         back_btn = tk.Button(self.root, text="返回", command=self.create_welcome_frame,
@@ -433,22 +2842,27 @@ class ExamApp:
         title_label = tk.Label(self.root, text=f"选择题库文件 - {subject}", font=("微软雅黑", 20, "bold"), bg="#f0f0f0")
         title_label.pack(pady=20)
 
-        # 文件列表框架
-        file_frame = tk.Frame(self.root, bg="#f0f0f0")
-        file_frame.pack(pady=10, fill=tk.BOTH, expand=True)
-
         # 文件列表
-        for i, file_path in enumerate(self.question_files):
-            file_name = os.path.basename(file_path)
-            btn = tk.Button(file_frame, text=file_name, command=lambda f=file_path: self.select_file(f),
-                            font=("微软雅黑", 11), bg="#E0E0E0", width=40, height=1, anchor="w")
-            btn.grid(row=i, column=0, padx=20, pady=5, sticky="w")
+        file_list = VirtualList(self.root, self.question_files, render=os.path.basename, command=self.select_file,
+                                row_height=36, width=600, height=420)
+        file_list.pack(pady=10, padx=20, fill=tk.Y, expand=True)
+        file_list.canvas.focus_set()
+
+        # 按钮框架
+        btn_frame = tk.Frame(self.root, bg="#f0f0f0")
+        btn_frame.pack(pady=10)
+
+        # 模拟考试按钮
+        exam_btn = tk.Button(btn_frame, text="模拟考试", command=self.show_exam_setup,
+                             font=("微软雅黑", 12), bg="#FF9800", fg="white")
+        exam_btn.pack(side=tk.LEFT, padx=10)
 
         # 返回按钮
-        back_btn = tk.Button(self.root, text="返回", command=self.show_subject_selection,
+        back_btn = tk.Button(btn_frame, text="返回", command=self.show_subject_selection,
                              font=("微软雅黑", 12), bg="#2196F3", fg="white")
-        back_btn.pack(pady=10)
+        back_btn.pack(side=tk.LEFT, padx=10)
 
+    @PERF.timed("bank.open")
     def select_file(self, file_path):
         """选择题库文件并开始答题"""
         self.selected_file = file_path
@@ -462,8 +2876,13 @@ class ExamApp:
             messagebox.showerror("加载失败", f"加载题库失败: {e}")
             return
 
+        build_answer_keys(self.questions)
+
         # 加载进度
-        self.progress = load_progress(file_path)
+        self.flush_progress()
+        self.end_global_review()
+        self.store = ProgressStore(file_path, self.user, ids=[q["qid"] for q in self.questions])
+        self.progress = self.store.progress
         self.progress["total_questions"] = len(self.questions)
 
         # 提取所有题型
@@ -477,47 +2896,97 @@ class ExamApp:
         self.filter_types = ["全部"] + sorted(list(all_types))
         self.selected_filter = "全部"
 
-        # 准备题目顺序
-        self.generate_question_order()
+        # 准备题目顺序：智能抽题模式逐题抽取，否则优先恢复上次的顺序和位置
+        if self.adaptive_mode:
+            self.start_adaptive_order()
+        elif not self.restore_question_order():
+            self.generate_question_order()
+            self.current_index = 0
+
+        self.show_question()
+
+    @PERF.timed("order.generate")
+    def generate_question_order(self, seed=None):
+        """生成题目顺序（考虑题型筛选），种子和参数保存在进度中，可原样恢复"""
+        self.question_order = build_question_order(self.questions, self.progress, self.selected_filter, seed)
+        self.progress["order"] = self.question_order.to_state()
+
+    def build_sampler(self):
+        """按各题统计建立智能抽题的权重抽样器（只包含当前筛选的题型）"""
+        stats = self.progress.setdefault("stats", {})
+        weights = []
+        for i, q in enumerate(self.questions):
+            if self.selected_filter != "全部" and q.get("题型", "未知题型") != self.selected_filter:
+                weights.append(0)
+            else:
+                weights.append(question_weight(stats.get(str(i))))
+        self.sampler = FenwickSampler(weights)
+
+    def sample_next_question(self):
+        """智能抽题：按权重抽下一题追加到题目顺序末尾（尽量避免与当前题重复）"""
+        last = self.question_order[-1] if self.question_order else None
+        q_index = self.sampler.sample()
+        for _ in range(3):
+            if q_index != last:
+                break
+            q_index = self.sampler.sample()
+        if q_index is not None:
+            self.question_order.append(q_index)
 
+    def start_adaptive_order(self):
+        """以智能抽题方式开始：题目顺序是逐题抽取的历史列表"""
+        self.build_sampler()
+        self.question_order = []
         self.current_index = 0
+        self.sample_next_question()
+
+    def toggle_adaptive_mode(self):
+        """切换智能抽题模式"""
+        self.adaptive_mode = not self.adaptive_mode
+        if self.adaptive_mode:
+            self.start_adaptive_order()
+        else:
+            self.sampler = None
+            if not self.restore_question_order():
+                self.generate_question_order()
+                self.current_index = 0
         self.show_question()
 
-    def generate_question_order(self):
-        """生成题目顺序（考虑题型筛选）"""
-        # 优先错题
-        self.question_order = self.progress["wrong_questions"][:]
+    def restore_question_order(self):
+        """从进度中恢复上次的题目顺序和位置，无法恢复时返回 False"""
+        state = self.progress.get("order")
+        if not state or state.get("total") != len(self.questions) or state.get("filter") not in self.filter_types:
+            return False
 
-        # 添加未做过的题目
-        all_indices = set(range(len(self.questions)))
-        answered_indices = set(int(k) for k in self.progress["answered"].keys())
-        unanswered_indices = list(all_indices - answered_indices)
-        random.shuffle(unanswered_indices)
+        try:
+            order = QuestionOrder.from_state(state)
+        except (KeyError, TypeError, ValueError):
+            return False
 
-        self.question_order.extend(unanswered_indices)
+        current_index = self.progress.get("current_index", 0)
+        if not 0 <= current_index < len(order):
+            return False
 
-        # 如果没有错题或未做题，使用所有题目
-        if not self.question_order:
-            self.question_order = list(range(len(self.questions)))
-            random.shuffle(self.question_order)
-
-        # 应用题型筛选
-        if self.selected_filter != "全部":
-            filtered_order = []
-            for idx in self.question_order:
-                q_type = self.questions[idx].get("题型", "未知题型")
-                if q_type == self.selected_filter:
-                    filtered_order.append(idx)
-            self.question_order = filtered_order
+        self.question_order = order
+        self.selected_filter = order.selected_filter
+        self.current_index = current_index
+        return True
 
+    @PERF.timed("render.show_question")
     def show_question(self):
         """显示当前题目"""
-        if self.countdown_id:
-            self.root.after_cancel(self.countdown_id)
-            self.countdown_id = None
+        if PERF.enabled:
+            # 记录到界面布局完成（空闲回调执行）为止的耗时
+            render_start = time.perf_counter()
+            self.root.after_idle(lambda: PERF.record("render.to_idle", render_start,
+                                                     time.perf_counter() - render_start))
+
+        self.stop_countdown()
 
         self.clear_frame()
         self.showing_answer = False  # 重置答案显示状态
+        self.answered = False
+        self.drill_label = None
 
         if self.current_index >= len(self.question_order):
             self.show_results()
@@ -525,6 +2994,9 @@ class ExamApp:
 
         q_index = self.question_order[self.current_index]
         self.current_question = self.questions[q_index]
+        self.question_shown_at = time.monotonic()
+        if not self.adaptive_mode:
+            self.progress["current_index"] = self.current_index
 
         # 主框架
         main_frame = tk.Frame(self.root, bg="#f0f0f0")
@@ -538,22 +3010,23 @@ class ExamApp:
         type_frame = tk.Frame(info_frame, bg="#f0f0f0")
         type_frame.pack(side=tk.RIGHT, padx=10)
 
-        # 题型筛选菜单
-        filter_btn = tk.Menubutton(type_frame, text="题型筛选 ▼",
-                                   font=("微软雅黑", 10), bg="#E0E0E0",
-                                   relief=tk.RAISED, padx=5, pady=2)
-        filter_btn.menu = tk.Menu(filter_btn, tearoff=0)
-        filter_btn["menu"] = filter_btn.menu
+        # 题型筛选菜单（全科复习的题目来自多个题库，不提供筛选、智能抽题和浏览题库）
+        if self.review_queue is None:
+            filter_btn = tk.Menubutton(type_frame, text="题型筛选 ▼",
+                                       font=("微软雅黑", 10), bg="#E0E0E0",
+                                       relief=tk.RAISED, padx=5, pady=2)
+            filter_btn.menu = tk.Menu(filter_btn, tearoff=0)
+            filter_btn["menu"] = filter_btn.menu
 
-        # 添加筛选选项
-        for t in self.filter_types:
-            filter_btn.menu.add_radiobutton(
-                label=t,
-                command=lambda t=t: self.apply_type_filter(t),
-                variable=tk.StringVar(value=self.selected_filter)
-            )
+            # 添加筛选选项
+            for t in self.filter_types:
+                filter_btn.menu.add_radiobutton(
+                    label=t,
+                    command=lambda t=t: self.apply_type_filter(t),
+                    variable=tk.StringVar(value=self.selected_filter)
+                )
 
-        filter_btn.pack(side=tk.RIGHT, padx=5)
+            filter_btn.pack(side=tk.RIGHT, padx=5)
 
         # 当前题型显示
         q_type = self.current_question.get("题型", "未知题型")
@@ -562,16 +3035,39 @@ class ExamApp:
         type_label.pack(side=tk.RIGHT, padx=5)
 
         # 背题模式切换按钮
-        review_btn = tk.Button(type_frame, text="背题模式" if not self.review_mode else "练习模式",
-                               font=("微软雅黑", 10),
-                               bg="#9C27B0" if self.review_mode else "#E0E0E0",
-                               fg="white" if self.review_mode else "black",
-                               command=self.toggle_review_mode)
-        review_btn.pack(side=tk.RIGHT, padx=5)
+        self.review_btn = tk.Button(type_frame, font=("微软雅黑", 10), command=self.toggle_review_mode)
+        self.update_review_button()
+        self.review_btn.pack(side=tk.RIGHT, padx=5)
+
+        # 智能抽题切换按钮
+        if self.review_queue is None:
+            adaptive_btn = tk.Button(type_frame, text="顺序练习" if self.adaptive_mode else "智能抽题",
+                                     font=("微软雅黑", 10),
+                                     bg="#009688" if self.adaptive_mode else "#E0E0E0",
+                                     fg="white" if self.adaptive_mode else "black",
+                                     command=self.toggle_adaptive_mode)
+            adaptive_btn.pack(side=tk.RIGHT, padx=5)
+
+        # 速刷模式切换按钮
+        tk.Button(type_frame, text="退出速刷" if self.drill_mode else "速刷模式", font=("微软雅黑", 10),
+                  bg="#FF5722" if self.drill_mode else "#E0E0E0", fg="white" if self.drill_mode else "black",
+                  command=self.toggle_drill_mode).pack(side=tk.RIGHT, padx=5)
+
+        # 浏览题库按钮
+        if self.review_queue is None:
+            tk.Button(type_frame, text="浏览题库", font=("微软雅黑", 10), bg="#E0E0E0",
+                      command=self.show_question_browser).pack(side=tk.RIGHT, padx=5)
 
         # 题目编号
-        tk.Label(info_frame, text=f"题目 {self.current_index + 1}/{len(self.question_order)}",
-                 font=("微软雅黑", 12), bg="#f0f0f0").pack(side=tk.LEFT)
+        if self.review_queue is not None:
+            bank = new_bank_summary(self.review_targets[q_index][0].question_file)
+            position_text = (f"全科复习 第 {self.current_index + 1}/{self.review_queue.total} 题"
+                             f"  {bank['subject']} / {bank['name']}")
+        elif self.adaptive_mode:
+            position_text = f"智能抽题 第 {self.current_index + 1} 题"
+        else:
+            position_text = f"题目 {self.current_index + 1}/{len(self.question_order)}"
+        tk.Label(info_frame, text=position_text, font=("微软雅黑", 12), bg="#f0f0f0").pack(side=tk.LEFT)
 
         # 问题内容
         question_frame = tk.LabelFrame(main_frame, text="问题", font=("微软雅黑", 12, "bold"),
@@ -584,131 +3080,22 @@ class ExamApp:
         question_text.config(state=tk.DISABLED)
         question_text.pack(fill=tk.BOTH, expand=True)
 
-        # 背题模式下直接显示答案
-        if self.review_mode:
-
-            if self.current_question.get("题型") in ["单选题", "选择题", "判断题", "多选题"] and self.current_question.get(
-                    "options"):
-                options_frame = tk.LabelFrame(main_frame, text="选项与答案",
-                                              font=("微软雅黑", 12, "bold"),
-                                              bg="#f0f0f0", padx=10, pady=10)
-                options_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-
-                # 获取正确答案
-                correct_answer = normalize_answer(self.current_question.get("答案", ""))
-                q_type = self.current_question.get("题型", "")
-                raw_options = self.current_question.get("raw_options", [])
-                letters = ["A", "B", "C", "D", "E", "F", "G", "H"]
-
-                # 确定正确选项（支持多选题）
-                correct_answers = []
-                if q_type == "多选题":
-                    # 处理多选题答案格式（可能包含多个选项）
-                    if "|" in correct_answer:
-                        correct_parts = [part.strip() for part in correct_answer.split("|")]
-                    else:
-                        correct_parts = [correct_answer.strip()]
-
-                    # 将答案转换为选项字母
-                    for part in correct_parts:
-                        if part in letters:  # 如果答案已经是字母
-                            correct_answers.append(part)
-                        else:  # 如果答案是文本，查找对应的选项
-                            for idx, opt in enumerate(raw_options):
-                                if opt.strip() == part.strip() and idx < len(letters):
-                                    correct_answers.append(letters[idx])
-                else:
-                    # 单选题和判断题处理
-                    if correct_answer in letters:  # 如果答案已经是字母
-                        correct_answers = [correct_answer]
-                    else:  # 如果答案是文本，查找对应的选项
-                        for idx, opt in enumerate(raw_options):
-                            if opt.strip() == correct_answer.strip() and idx < len(letters):
-                                correct_answers = [letters[idx]]
-
-                # 显示所有选项，正确选项用绿色标记
-                for i, option_text in enumerate(raw_options):
-                    if i >= len(letters):
-                        break
-
-                    letter = letters[i]
-                    # 创建选项框架
-                    option_frame = tk.Frame(options_frame, bg="#f0f0f0")
-                    option_frame.pack(fill=tk.X, pady=2)
-
-                    # 选项标签
-                    label_text = f"{letter}. {option_text}"
-                    label = tk.Label(option_frame, text=label_text,
-                                     font=("微软雅黑", 11),
-                                     bg="#f0f0f0",
-                                     anchor="w")
-
-                    # 如果是正确选项，使用绿色标记
-                    if letter in correct_answers:
-                        label.config(fg="green", font=("微软雅黑", 11, "bold"))
-
-                    label.pack(side=tk.LEFT, fill=tk.X, expand=True)
-
-            else:
-                answer_frame = tk.LabelFrame(main_frame, text="标准答案",
-                                             font=("微软雅黑", 12, "bold"),
-                                             bg="#f0f0f0", padx=10, pady=10)
-                answer_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-
-                answer_text = scrolledtext.ScrolledText(answer_frame, font=("微软雅黑", 12),
-                                                        wrap=tk.WORD, height=4)
-                # correct_answer = normalize_answer(self.current_question.get("答案", ""))
-                # print()
-                # print(" ")
-                # print(correct_answer)
-                answer = self.current_question.get("答案", "???")
-                answer = answer.strip().replace('(', '\n(').replace(')\n', ')').replace('\n()', '() ')
-                answer_text.insert(tk.INSERT, answer)
-                print(answer)
-                # print(self.current_question.get("答案", "???"))
-                answer_text.config(state=tk.DISABLED)
-                answer_text.pack(fill=tk.BOTH, expand=True)
-
-        '''# 背题模式下直接显示答案
-        if self.review_mode:
-            answer_frame = tk.LabelFrame(main_frame, text="标准答案",
-                                         font=("微软雅黑", 12, "bold"),
-                                         bg="#f0f0f0", padx=10, pady=10)
-            answer_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-
-            answer_text = scrolledtext.ScrolledText(answer_frame, font=("微软雅黑", 12),
-                                                    wrap=tk.WORD, height=4)
-            correct_answer = normalize_answer(self.current_question.get("答案", ""))
-
-            # 选择题处理：显示选项字母
-            if self.current_question.get("题型") in ["选择题", "判断题", "多选题"] and self.current_question.get("options"):
-                letters = ["A", "B", "C", "D", "E", "F", "G", "H"]
-                options = self.current_question.get("raw_options", [])
-
-                for i, opt in enumerate(options):
-                    if opt.strip() == correct_answer.strip() and i < len(letters):
-                        correct_answer = f"{letters[i]}. {opt}"
-                        break
-
-            answer_text.insert(tk.INSERT, correct_answer)
-            answer_text.config(state=tk.DISABLED)
-            answer_text.pack(fill=tk.BOTH, expand=True)'''
-
         # 显示图片
         if "image_path" in self.current_question and self.current_question["image_path"]:
             try:
                 image_path = self.current_question["image_path"]
 
                 # 加载图片并调整大小
-                img = Image.open(image_path)
-                width, height = img.size
-                max_width = 600
-                if width > max_width:
-                    ratio = max_width / width
-                    new_height = int(height * ratio)
-                    img = img.resize((max_width, new_height), Image.LANCZOS)
+                with PERF.span("render.image_load", path=image_path):
+                    img = Image.open(image_path)
+                    width, height = img.size
+                    max_width = 600
+                    if width > max_width:
+                        ratio = max_width / width
+                        new_height = int(height * ratio)
+                        img = img.resize((max_width, new_height), Image.LANCZOS)
 
-                self.photo = ImageTk.PhotoImage(img)
+                    self.photo = ImageTk.PhotoImage(img)
 
                 # 创建图片显示区域
                 image_frame = tk.LabelFrame(main_frame, text="附图",
@@ -732,96 +3119,17 @@ class ExamApp:
                                        font=("微软雅黑", 10), fg="red", bg="#f0f0f0")
                 error_label.pack(padx=10, pady=5)
 
-        # 非背题模式显示答题区域
-        if not self.review_mode:
-            # 选项（选择题）
-            options = self.current_question.get("options", [])
-            # print(options)
-            if options and self.current_question.get("题型") != "多选题":
-                # 非多选题使用按钮
-                options_frame = tk.LabelFrame(main_frame, text="选项", font=("微软雅黑", 12, "bold"),
-                                              bg="#f0f0f0", padx=10, pady=10)
-                options_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-
-                letters = ["A", "B", "C", "D", "E", "F", "G", "H"]
-                for i, opt in enumerate(options):
-                    if i < len(letters):
-                        btn = tk.Button(options_frame, text=f"{letters[i]}. {opt}",
-                                        command=lambda l=letters[i]: self.check_answer_wrapper(l),
-                                        font=("微软雅黑", 11), bg="#E0E0E0", width=60, anchor="w")
-                        btn.pack(pady=5, padx=10, anchor="w")
-
-            elif options and self.current_question.get("题型") == "多选题":
-                # 多选题使用复选框
-                self.multi_select_vars = {}  # 重置选项状态
-
-                options_frame = tk.LabelFrame(main_frame, text="选项（可多选）",
-                                              font=("微软雅黑", 12, "bold"),
-                                              bg="#f0f0f0", padx=10, pady=10)
-                options_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-                self.multi_select_frame = options_frame  # 保存引用
-
-                letters = ["A", "B", "C", "D", "E", "F", "G", "H"]
-                for i, opt in enumerate(options):
-                    if i < len(letters):
-                        var = tk.BooleanVar()
-                        self.multi_select_vars[letters[i]] = var
-
-                        cb = tk.Checkbutton(options_frame, text=f"{letters[i]}. {opt}",
-                                            variable=var, font=("微软雅黑", 11),
-                                            bg="#f0f0f0", anchor="w")
-                        cb.pack(fill=tk.X, pady=3, padx=10)
-
-                # 添加多选题提交按钮
-                multi_submit_frame = tk.Frame(main_frame, bg="#f0f0f0")
-                multi_submit_frame.pack(pady=5)
-
-                submit_btn = tk.Button(multi_submit_frame, text="提交多选题答案",
-                                       command=self.submit_multi_choice,
-                                       font=("微软雅黑", 12), bg="#4CAF50", fg="white")
-                submit_btn.pack(pady=5)
-
-            if self.current_question.get("题型") in ["解答题", "简答题"]:
-                answer_frame = tk.LabelFrame(main_frame, text="您的解答",
-                                             font=("微软雅黑", 12, "bold"), bg="#f0f0f0")
-                answer_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-
-                self.answer_text = scrolledtext.ScrolledText(answer_frame, font=("微软雅黑", 12),
-                                                             wrap=tk.WORD, height=8)
-                self.answer_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
-
-                # 添加手动评分按钮
-                self.manual_check_frame = tk.Frame(main_frame, bg="#f0f0f0")
-                self.manual_check_frame.pack(pady=10)
-
-                tk.Button(self.manual_check_frame, text="提交并标记正确",
-                          command=lambda: self.manual_check_answer(True),
-                          font=("微软雅黑", 12), bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
-
-                tk.Button(self.manual_check_frame, text="提交并标记错误",
-                          command=lambda: self.manual_check_answer(False), font=("微软雅黑", 12), bg="#F44336",
-                          fg="white").pack(side=tk.LEFT, padx=5)
-            else:
-                # 答案输入（非选择题）
-                if not options:
-                    answer_frame = tk.Frame(main_frame, bg="#f0f0f0")
-                    answer_frame.pack(fill=tk.X, pady=10)
-
-                    tk.Label(answer_frame, text="答案:", font=("微软雅黑", 12), bg="#f0f0f0").pack(side=tk.LEFT)
-
-                    self.answer_entry = tk.Entry(answer_frame, font=("微软雅黑", 12), width=30)
-                    self.answer_entry.pack(side=tk.LEFT, padx=10)
-                    self.answer_entry.bind("<Return>", lambda event: self.check_answer_wrapper(self.answer_entry.get()))
-
-                    submit_btn = tk.Button(answer_frame, text="提交",
-                                           command=lambda: self.check_answer_wrapper(self.answer_entry.get()),
-                                           font=("微软雅黑", 12), bg="#4CAF50", fg="white")
-                    submit_btn.pack(side=tk.LEFT)
-
         # 导航按钮
         nav_frame = tk.Frame(main_frame, bg="#f0f0f0")
         nav_frame.pack(fill=tk.X, pady=10)
 
+        # 背题答案面板在问题下方，作答区域在导航按钮上方；显示时才渲染，切换背题模式只切换这两块
+        self.answer_panels = {}
+        self.panel_parent = main_frame
+        self.panel_anchors = {"review": {"after": question_frame}, "input": {"before": nav_frame}}
+        self.set_panel_visible("review", self.review_mode)
+        self.set_panel_visible("input", not self.review_mode)
+
         if self.current_index > 0:
             prev_btn = tk.Button(nav_frame, text="上一题", command=self.prev_question,
                                  font=("微软雅黑", 12), bg="#2196F3", fg="white")
@@ -831,18 +3139,71 @@ class ExamApp:
                              font=("微软雅黑", 12), bg="#FF9800", fg="white")
         skip_btn.pack(side=tk.LEFT, padx=10)
 
-        exit_btn = tk.Button(nav_frame, text="退出", command=self.create_welcome_frame,
+        exit_btn = tk.Button(nav_frame, text="退出", command=self.exit_practice,
                              font=("微软雅黑", 12), bg="#F44336", fg="white")
         exit_btn.pack(side=tk.RIGHT, padx=10)
 
-        # 非背题模式显示查看答案按钮
-        if not self.review_mode:
-            view_answer_btn = tk.Button(nav_frame, text="查看答案", command=self.show_answer,
-                                        font=("微软雅黑", 12), bg="#9C27B0", fg="white")
-            view_answer_btn.pack(side=tk.LEFT, padx=10)
+        self.mode_controls = tk.Frame(nav_frame, bg="#f0f0f0")
+        self.mode_controls.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.render_mode_controls()
+
+        result_frame = tk.Frame(main_frame, bg="#f0f0f0")
+        result_frame.pack(fill=tk.X, pady=10)
+
+        # 结果标签 - 初始为空
+        self.result_label = tk.Label(result_frame, text="", font=("微软雅黑", 14), bg="#f0f0f0")
+        self.result_label.pack(side=tk.LEFT)
+
+        # 倒计时标签 - 初始为空
+        self.countdown_label = tk.Label(result_frame, text="", font=("微软雅黑", 12), fg="#666", bg="#f0f0f0")
+        self.countdown_label.pack(side=tk.RIGHT)
+
+        if self.drill_mode:
+            self.drill_label = tk.Label(main_frame, text="", font=("微软雅黑", 10), fg="#666", bg="#f0f0f0")
+            self.drill_label.pack(fill=tk.X)
+            self.update_drill_label()
+            self.root.focus_set()  # 按键交给速刷快捷键处理
+
+    def set_panel_visible(self, name, visible):
+        """显示或隐藏当前题目的背题答案面板 / 作答区域：第一次显示时才渲染，之后只切换是否显示"""
+        panel = self.answer_panels.get(name)
+        if not visible:
+            if panel is not None:
+                panel.pack_forget()
+            return
+
+        if panel is None:
+            panel = self.answer_panels[name] = tk.Frame(self.panel_parent, bg="#f0f0f0")
+            handler = type_handler(self.current_question)
+            with PERF.span("render.answer_panel", panel=name):
+                if name == "review":
+                    handler.render_review(self, panel)
+                else:
+                    handler.render_input(self, panel)
+        panel.pack(fill=tk.BOTH, expand=True, **self.panel_anchors[name])
+
+    def update_review_button(self):
+        """背题模式切换按钮的文字和颜色"""
+        self.review_btn.config(text="练习模式" if self.review_mode else "背题模式",
+                               bg="#9C27B0" if self.review_mode else "#E0E0E0",
+                               fg="white" if self.review_mode else "black")
+
+    def render_mode_controls(self):
+        """导航栏中随背题模式变化的按钮：查看答案和速度控制（速刷模式没有倒计时，不显示速度控制）"""
+        for widget in self.mode_controls.winfo_children():
+            widget.destroy()
+        self.wait_time_label = None
 
+        if self.review_mode:
+            return
+
+        view_answer_btn = tk.Button(self.mode_controls, text="查看答案", command=self.show_answer,
+                                    font=("微软雅黑", 12), bg="#9C27B0", fg="white")
+        view_answer_btn.pack(side=tk.LEFT, padx=10)
+
+        if not self.drill_mode:
             # 速度控制按钮
-            speed_frame = tk.Frame(nav_frame, bg="#f0f0f0")
+            speed_frame = tk.Frame(self.mode_controls, bg="#f0f0f0")
             speed_frame.pack(side=tk.RIGHT, padx=10)
 
             # 加速按钮
@@ -860,30 +3221,40 @@ class ExamApp:
                                        font=("微软雅黑", 10), bg="#3F51B5", fg="white")
             speed_down_btn.pack(side=tk.LEFT, padx=(5, 0))
 
-        result_frame = tk.Frame(main_frame, bg="#f0f0f0")
-        result_frame.pack(fill=tk.X, pady=10)
-
-        # 结果标签 - 初始为空
-        self.result_label = tk.Label(result_frame, text="", font=("微软雅黑", 14), bg="#f0f0f0")
-        self.result_label.pack(side=tk.LEFT)
-
-        # 倒计时标签 - 初始为空
-        self.countdown_label = tk.Label(result_frame, text="", font=("微软雅黑", 12), fg="#666", bg="#f0f0f0")
-        self.countdown_label.pack(side=tk.RIGHT)
-
     def toggle_review_mode(self):
-        """切换背题模式"""
+        """切换背题模式：只切换答案面板和作答区域，不重建整个界面（已填写的作答内容保留）"""
         self.review_mode = not self.review_mode
-        self.show_question()
+        if self.review_mode and self.drill_mode:
+            self.drill_mode = False
+            self.show_question()  # 速刷模式的按钮和提示随整个界面重建
+            return
+
+        self.update_review_button()
+        self.set_panel_visible("review", self.review_mode)
+        self.set_panel_visible("input", not self.review_mode)
+        self.render_mode_controls()
 
     def apply_type_filter(self, filter_type):
-        """应用题型筛选"""
+        """应用题型筛选，该题型没有可练的题目（错题和未做题都没有）时提示并保留原来的筛选和位置"""
+        previous = (self.selected_filter, self.question_order, self.current_index, self.sampler,
+                    self.progress.get("order"))
         self.selected_filter = filter_type
         self.current_index = 0
-        self.generate_question_order()
+        if self.adaptive_mode:
+            self.start_adaptive_order()
+        else:
+            self.generate_question_order()
+        if not self.question_order:
+            self.selected_filter, self.question_order, self.current_index, self.sampler, order = previous
+            if order is None:
+                self.progress.pop("order", None)
+            else:
+                self.progress["order"] = order
+            messagebox.showinfo("提示", "没有符合条件的题目")
+            return
         self.show_question()
 
-    def submit_multi_choice(self):
+    def submit_multi_choice(self, pressed_at=None):
         """提交多选题答案"""
         selected_letters = []
         for letter, var in self.multi_select_vars.items():
@@ -898,36 +3269,45 @@ class ExamApp:
         selected_letters.sort()
         user_answer = " | ".join(selected_letters)
 
-        # 检查答案
-        self.check_answer_wrapper(user_answer)
+        # 检查答案（速刷模式答对后已进入下一题）
+        shown = self.current_question
+        self.check_answer_wrapper(user_answer, pressed_at)
 
         # 清除选项状态
-        for var in self.multi_select_vars.values():
-            var.set(False)
+        if self.current_question is shown:
+            for var in self.multi_select_vars.values():
+                var.set(False)
 
     def manual_check_answer(self, is_correct):
         """手动评分处理"""
         q_index = self.question_order[self.current_index]
         user_answer = self.answer_text.get("1.0", tk.END).strip()
 
-        # 更新进度
-        self.progress["answered"][str(q_index)] = {
-            "user_answer": user_answer,
-            "is_correct": is_correct,
-            "timestamp": time.time()
-        }
+        self.record_answer(q_index, user_answer, is_correct)
+        self.next_question()
 
-        if is_correct:
-            self.progress["correct_count"] = self.progress.get("correct_count", 0) + 1
-            if q_index in self.progress["wrong_questions"]:
-                self.progress["wrong_questions"].remove(q_index)
+    def record_answer(self, q_index, user_answer, is_correct):
+        """记录一次作答（批量写盘），并更新智能抽题权重"""
+        self.answered = True
+        latency = round(time.monotonic() - self.question_shown_at, 3)
+        q_type = self.questions[q_index].get("题型")
+        if self.review_queue is not None:
+            # 全科复习：作答记入题目所属题库的进度，本次复习的统计另记在会话进度中
+            store, bank_index = self.review_targets[q_index]
+            stat = store.record(bank_index, user_answer, is_correct, latency, q_type, auto_flush=not self.drill_mode)
+            apply_answer(self.progress, q_index, user_answer, is_correct, latency=latency)
         else:
-            self.progress["wrong_count"] = self.progress.get("wrong_count", 0) + 1
-            if q_index not in self.progress["wrong_questions"]:
-                self.progress["wrong_questions"].append(q_index)
+            store = self.store
+            stat = store.record(q_index, user_answer, is_correct, latency, q_type, auto_flush=not self.drill_mode)
 
-        save_progress(self.selected_file, self.progress)
-        self.next_question()
+        if self.sampler is not None:
+            self.sampler.update(q_index, question_weight(stat))
+
+        # 有未写盘的作答时，保证最迟 flush_interval 秒后写盘；速刷模式攒够一批后稍后写盘，不占用按键到下一题的时间
+        delay = DRILL_FLUSH_DELAY_MS if self.drill_mode and store.due() else store.flush_interval * 1000
+        if store.pending and (not self.flush_timer or
+                                   self.flush_timer.deadline > self.scheduler.now() + delay / 1000):
+            self.flush_timer = self.scheduler.after(delay, self.flush_progress, key="flush", view=False)
 
     def show_answer(self):
         """显示当前题目的正确答案"""
@@ -935,24 +3315,18 @@ class ExamApp:
             return
 
         self.showing_answer = True
-        correct_answer = normalize_answer(self.current_question.get("答案", ""))
-
-        # 选择题处理：显示选项字母
-        if self.current_question.get("题型") in ["选择题", "判断题"] and self.current_question.get("options"):
-            letters = ["A", "B", "C", "D", "E", "F", "G", "H"]
-            options = self.current_question.get("raw_options", [])
-
-            for i, opt in enumerate(options):
-                if opt.strip() == correct_answer.strip() and i < len(letters):
-                    correct_answer = f"{letters[i]}. {opt}"
-                    break
-
-        self.result_label.config(text=f"正确答案: {correct_answer}", fg="blue")
+        handler = type_handler(self.current_question)
+        if handler.subjective:
+            # 主观题参考答案较长，在问题下方展开答案面板，不塞进结果标签
+            self.set_panel_visible("review", True)
+            self.result_label.config(text="参考答案见上方", fg="blue")
+        else:
+            correct_answer = handler.answer_display(self.current_question)
+            self.result_label.config(text=f"正确答案: {correct_answer}", fg="blue")
 
         # 如果正在倒计时，取消倒计时
-        if self.countdown_id:
-            self.root.after_cancel(self.countdown_id)
-            self.countdown_id = None
+        if self.countdown_timer:
+            self.stop_countdown()
             self.countdown_label.config(text="")
 
     def speed_up(self):
@@ -972,37 +3346,29 @@ class ExamApp:
         if hasattr(self, 'wait_time_label') and self.wait_time_label:
             self.wait_time_label.config(text=f"等待: {self.default_wait_seconds}秒")
 
-    def check_answer_wrapper(self, answer):
-        """检查答案并显示结果"""
+    def check_answer_wrapper(self, answer, pressed_at=None):
+        """检查答案并显示结果；速刷模式下答对立即进入下一题"""
         is_correct, correct_answer = check_answer(self.current_question, answer)
         q_index = self.question_order[self.current_index]
 
         # 更新进度
-        self.progress["answered"][str(q_index)] = {
-            "user_answer": answer,
-            "is_correct": is_correct,
-            "timestamp": time.time()
-        }
-
-        if is_correct:
-            self.progress["correct_count"] = self.progress.get("correct_count", 0) + 1
-            # 从错题列表中移除
-            if q_index in self.progress["wrong_questions"]:
-                self.progress["wrong_questions"].remove(q_index)
-            message = "✓ 回答正确!"
-            color = "green"
-        else:
-            self.progress["wrong_count"] = self.progress.get("wrong_count", 0) + 1
-            # 添加到错题列表
-            if q_index not in self.progress["wrong_questions"]:
-                self.progress["wrong_questions"].append(q_index)
-            message = f"✗ 回答错误!\n正确答案: {correct_answer}"
-            color = "red"
+        self.record_answer(q_index, answer, is_correct)
 
-        save_progress(self.selected_file, self.progress)
+        if self.drill_mode:
+            if is_correct:
+                self.drill_last = "上一题 ✓"
+                self.drill_next(pressed_at or time.perf_counter())
+                return
+            self.drill_last = "上一题 ✗"
+            self.root.focus_set()  # 输入框作答后回车直接进入下一题
 
         # 在界面内显示结果
-        if is_correct:
+        if type_handler(self.current_question).subjective:
+            # 主观题参考答案较长，只显示要点覆盖情况，答案可点“查看答案”
+            score, covered, total = grade_subjective(get_answer_key(self.current_question), answer)
+            self.result_label.config(text=f"{'✓' if is_correct else '✗'} 答到要点 {covered}/{total}（{score:.0%}）",
+                                     fg="green" if is_correct else "red")
+        elif is_correct:
             self.result_label.config(text="✓ 回答正确!", fg="green")
         else:
             self.result_label.config(text=f"✗ 回答错误! 正确答案: {correct_answer}", fg="red")
@@ -1013,33 +3379,36 @@ class ExamApp:
     def start_countdown(self, is_correct):
         """启动倒计时"""
         # 清除之前的倒计时
-        if self.countdown_id:
-            self.root.after_cancel(self.countdown_id)
+        self.stop_countdown()
 
         # 只有答对才需要倒计时跳转
         if not is_correct:
             self.countdown_label.config(text="")
             return
 
-        # 更新倒计时显示
+        # 更新倒计时显示：同一个任务每秒执行一次，切换题目时随界面一起取消
         self.countdown_seconds = self.default_wait_seconds
-        self.update_countdown()
+        self.countdown_timer = self.scheduler.every(1000, self.update_countdown, key="countdown", first=0)
 
     def update_countdown(self):
         """更新倒计时显示并触发跳转"""
         if self.countdown_seconds > 0:
             self.countdown_label.config(text=f"{self.countdown_seconds}秒后自动跳转")
             self.countdown_seconds -= 1
-            self.countdown_id = self.root.after(1000, self.update_countdown)
         else:
+            self.stop_countdown()
             self.countdown_label.config(text="正在跳转...")
             self.next_question()
 
+    def stop_countdown(self):
+        """取消自动跳转倒计时"""
+        if self.countdown_timer:
+            self.countdown_timer.cancel()
+            self.countdown_timer = None
+
     def prev_question(self):
         """显示上一题"""
-        if self.countdown_id:
-            self.root.after_cancel(self.countdown_id)
-            self.countdown_id = None
+        self.stop_countdown()
 
         if self.current_index > 0:
             self.current_index -= 1
@@ -1047,15 +3416,19 @@ class ExamApp:
 
     def next_question(self):
         """显示下一题"""
-        if self.countdown_id:
-            self.root.after_cancel(self.countdown_id)
-            self.countdown_id = None
+        self.stop_countdown()
+
+        if self.adaptive_mode and self.current_index + 1 >= len(self.question_order):
+            self.sample_next_question()
+        elif self.review_queue is not None and self.current_index + 1 >= len(self.question_order):
+            self.pull_review_question()
 
         self.current_index += 1
         self.show_question()
 
     def show_results(self):
         """显示答题结果统计"""
+        self.flush_progress()
         self.clear_frame()
 
         # 主框架
@@ -1103,48 +3476,461 @@ class ExamApp:
                             font=("微软雅黑", 12), bg="#4CAF50", fg="white")
         new_btn.pack(side=tk.LEFT, padx=10)
 
-        exit_btn = tk.Button(btn_frame, text="退出", command=self.root.quit,
+        exit_btn = tk.Button(btn_frame, text="退出", command=self.quit_app,
                              font=("微软雅黑", 12), bg="#F44336", fg="white")
         exit_btn.pack(side=tk.LEFT, padx=10)
 
+    def show_question_browser(self):
+        """浏览题库：表格列出全部题目，可按任意列排序，双击从该题开始练习"""
+        self.stop_countdown()
+        self.clear_frame()
+
+        tk.Label(self.root, text=f"浏览题库 - {os.path.basename(self.selected_file)}",
+                 font=("微软雅黑", 20, "bold"), bg="#f0f0f0").pack(pady=10)
+        tk.Label(self.root, text=f"共 {len(self.questions)} 题，点击表头排序，双击或回车从该题开始练习",
+                 font=("微软雅黑", 11), bg="#f0f0f0", fg="#555").pack()
+
+        # 行只保存题目序号，单元格文字在滚动到可见时才生成
+        self.browser_keys = {}
+        self.browser_sort = (0, False)
+        wrong = set(self.progress.get("wrong_questions", []))
+        table = VirtualList(self.root, range(len(self.questions)), render=self.browser_row,
+                            columns=BROWSER_COLUMNS, row_height=30, width=850, height=440, double_click=True,
+                            command=self.practice_from_question, on_heading=self.sort_browser,
+                            row_color=lambda q_index: "#FFEBEE" if q_index in wrong else None)
+        table.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        table.canvas.focus_set()
+        self.browser_list = table
+
+        # 定位到正在练习的题目
+        if self.question_order and self.current_index < len(self.question_order):
+            table.select(self.question_order[self.current_index])
+
+        btn_frame = tk.Frame(self.root, bg="#f0f0f0")
+        btn_frame.pack(pady=10)
+        tk.Button(btn_frame, text="从所选题目开始练习", command=lambda: table.activate(table.anchor),
+                  font=("微软雅黑", 12), bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=10)
+        tk.Button(btn_frame, text="返回练习", command=self.show_question,
+                  font=("微软雅黑", 12), bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=10)
+
+    def browser_row(self, q_index):
+        """题库浏览表格中一行的各列文字"""
+        question = self.questions[q_index]
+        stat = self.progress.get("stats", {}).get(str(q_index))
+        return (q_index + 1, question.get("问题", ""), question.get("题型", "未知题型"),
+                type_handler(question).answer_display(question), stat[1] if stat else 0)
+
+    @PERF.timed("browser.sort")
+    def sort_browser(self, col):
+        """按列排序题库浏览表格，再次点击同一列切换升降序"""
+        column, reverse = self.browser_sort
+        reverse = not reverse if col == column else False
+        total = len(self.questions)
+        if col == 0:
+            order = range(total - 1, -1, -1) if reverse else range(total)
+        else:
+            if col not in self.browser_keys:
+                self.browser_keys[col] = browser_sort_keys(self.questions, self.progress, col)
+            order = array("I", sorted(range(total), key=self.browser_keys[col].__getitem__, reverse=reverse))
+        self.browser_sort = (col, reverse)
+
+        table = self.browser_list
+        table.set_items(order)
+        for i, (title, _, _) in enumerate(BROWSER_COLUMNS):
+            table.heading(i, title + ((" ▼" if reverse else " ▲") if i == col else ""))
+
+    def practice_from_question(self, q_index):
+        """从选中的题目开始练习：该题排在最前，其余题目仍按错题优先、未做题随机的顺序"""
+        if self.selected_filter != "全部" and self.questions[q_index].get("题型", "未知题型") != self.selected_filter:
+            self.selected_filter = "全部"
+        self.adaptive_mode = False
+        self.sampler = None
+        self.generate_question_order()
+        order = self.question_order
+        head = [q_index] + [i for i in order.head if i != q_index]
+        runs = [part for start, stop in order.runs
+                for part in ((start, min(stop, q_index)), (max(start, q_index + 1), stop)) if part[0] < part[1]]
+        self.question_order = QuestionOrder(head, runs, order.seed, order.selected_filter, order.total)
+        self.progress["order"] = self.question_order.to_state()
+        self.current_index = 0
+        self.show_question()
+
     def retry_wrong_questions(self):
-        """重新练习错题"""
+        """重新练习错题（全科复习时重新开始一轮全科复习）"""
+        if self.review_queue is not None:
+            self.start_global_review()
+            return
         if not self.progress["wrong_questions"]:
             messagebox.showinfo("提示", "没有错题需要练习!")
             return
 
-        self.question_order = self.progress["wrong_questions"][:]
-        random.shuffle(self.question_order)
+        seed = random.randrange(2 ** 32)
+        wrong = [idx for idx in self.progress["wrong_questions"] if idx < len(self.questions)]
+        random.Random(seed).shuffle(wrong)
+        self.selected_filter = "全部"
+        self.adaptive_mode = False
+        self.sampler = None
+        self.question_order = QuestionOrder(wrong, [], seed, self.selected_filter, len(self.questions))
+        self.progress["order"] = self.question_order.to_state()
+        self.current_index = 0
+        self.show_question()
+
+    def exit_practice(self):
+        """退出答题，保存当前位置"""
+        self.stop_countdown()
+
+        self.flush_progress()
+        self.end_global_review()
+        self.current_question = None
+        self.create_welcome_frame()
+
+    def start_global_review(self):
+        """全科错题复习：合并所有科目的错题，按优先级逐题练习，作答记入各自题库的进度"""
+        self.flush_progress()
+        self.end_global_review()
+        with PERF.span("review.build_queue"):
+            queue = ReviewQueue(self.user)
+        if not queue.total:
+            messagebox.showinfo("提示", "所有科目都没有需要复习的错题!")
+            return
+
+        self.review_queue = queue
+        self.store = None
+        self.selected_file = ""
+        self.questions = []
+        self.review_targets = []
+        self.progress = default_progress()
+        self.progress["total_questions"] = queue.total
+        self.filter_types = ["全部"]
+        self.selected_filter = "全部"
+        self.adaptive_mode = False
+        self.sampler = None
+        self.question_order = []
         self.current_index = 0
+        self.pull_review_question()
         self.show_question()
 
+    def pull_review_question(self):
+        """从全科复习队列取下一题追加到题目顺序末尾，队列已空时不追加（下一题即显示结果）"""
+        item = self.review_queue.next_question()
+        if item is None:
+            return
+        store, bank_index, question = item
+        self.review_targets.append((store, bank_index))
+        self.questions.append(question)
+        self.question_order.append(len(self.questions) - 1)
+
+    def end_global_review(self):
+        """结束全科复习（调用前先写盘）"""
+        if self.review_queue is not None:
+            self.review_queue = None
+            self.review_targets = []
+
+    def show_exam_setup(self):
+        """显示模拟考试设置界面"""
+        self.clear_frame()
+
+        tk.Label(self.root, text=f"模拟考试 - {self.selected_subject}", font=("微软雅黑", 20, "bold"),
+                 bg="#f0f0f0").pack(pady=20)
+
+        # 题库选择
+        files_frame = tk.LabelFrame(self.root, text="抽题题库", font=("微软雅黑", 12, "bold"),
+                                    bg="#f0f0f0", padx=10, pady=10)
+        files_frame.pack(fill=tk.X, padx=50, pady=10)
+
+        file_vars = []
+        for file_path in self.question_files:
+            var = tk.BooleanVar(value=True)
+            file_vars.append((file_path, var))
+            tk.Checkbutton(files_frame, text=os.path.basename(file_path), variable=var,
+                           font=("微软雅黑", 11), bg="#f0f0f0", anchor="w").pack(fill=tk.X)
+
+        # 试卷参数
+        option_frame = tk.Frame(self.root, bg="#f0f0f0")
+        option_frame.pack(pady=10)
+
+        tk.Label(option_frame, text="每种题型题数:", font=("微软雅黑", 12), bg="#f0f0f0").grid(row=0, column=0,
+                                                                                              sticky="e", pady=5)
+        per_type_var = tk.IntVar(value=10)
+        tk.Spinbox(option_frame, from_=1, to=500, textvariable=per_type_var, width=8,
+                   font=("微软雅黑", 12)).grid(row=0, column=1, sticky="w", padx=10)
+
+        tk.Label(option_frame, text="考试时长(分钟):", font=("微软雅黑", 12), bg="#f0f0f0").grid(row=1, column=0,
+                                                                                                sticky="e", pady=5)
+        minutes_var = tk.IntVar(value=60)
+        tk.Spinbox(option_frame, from_=1, to=600, textvariable=minutes_var, width=8,
+                   font=("微软雅黑", 12)).grid(row=1, column=1, sticky="w", padx=10)
+
+        def start():
+            files = [f for f, var in file_vars if var.get()]
+            if not files:
+                messagebox.showwarning("提示", "请至少选择一个题库")
+                return
+            try:
+                per_type = per_type_var.get()
+                minutes = minutes_var.get()
+            except tk.TclError:
+                messagebox.showwarning("提示", "请输入有效的数字")
+                return
+            self.start_exam(files, per_type, minutes)
+
+        btn_frame = tk.Frame(self.root, bg="#f0f0f0")
+        btn_frame.pack(pady=20)
+
+        tk.Button(btn_frame, text="开始考试", command=start,
+                  font=("微软雅黑", 12), bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=10)
+
+        tk.Button(btn_frame, text="返回", command=lambda: self.select_subject(self.selected_subject),
+                  font=("微软雅黑", 12), bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=10)
+
+    def start_exam(self, question_files, per_type, minutes):
+        """抽取试卷并开始模拟考试"""
+        self.clear_frame()
+        tk.Label(self.root, text="正在抽题...", font=("微软雅黑", 14), bg="#f0f0f0").pack(pady=50)
+        self.root.update_idletasks()
+
+        try:
+            with PERF.span("exam.sample", files=len(question_files)):
+                paper = sample_exam_paper(question_files, per_type, user=self.user)
+        except Exception as e:
+            messagebox.showerror("抽题失败", f"抽取试卷失败: {e}")
+            self.show_exam_setup()
+            return
+
+        if not paper:
+            messagebox.showerror("错误", "所选题库中没有题目!")
+            self.show_exam_setup()
+            return
+
+        self.exam_paper = paper
+        self.exam_answers = {}
+        self.exam_index = 0
+        self.exam_deadline = time.monotonic() + minutes * 60
+
+        self.clear_frame()
+
+        # 顶部：计时与交卷（整场考试只创建一次，计时只更新文字）
+        header_frame = tk.Frame(self.root, bg="#f0f0f0")
+        header_frame.pack(fill=tk.X, padx=20, pady=10)
+
+        tk.Label(header_frame, text=f"模拟考试 - 共 {len(paper)} 题", font=("微软雅黑", 14, "bold"),
+                 bg="#f0f0f0").pack(side=tk.LEFT)
+
+        tk.Button(header_frame, text="交卷", command=self.submit_exam,
+                  font=("微软雅黑", 12), bg="#F44336", fg="white").pack(side=tk.RIGHT, padx=10)
+
+        self.exam_timer_label = tk.Label(header_frame, text="", font=("微软雅黑", 14), fg="#F44336", bg="#f0f0f0")
+        self.exam_timer_label.pack(side=tk.RIGHT, padx=10)
+
+        # 底部：导航
+        nav_frame = tk.Frame(self.root, bg="#f0f0f0")
+        nav_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=20, pady=10)
+
+        tk.Button(nav_frame, text="上一题", command=lambda: self.goto_exam_question(self.exam_index - 1),
+                  font=("微软雅黑", 12), bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=10)
+
+        tk.Button(nav_frame, text="下一题", command=lambda: self.goto_exam_question(self.exam_index + 1),
+                  font=("微软雅黑", 12), bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=10)
+
+        tk.Button(nav_frame, text="放弃考试", command=self.abort_exam,
+                  font=("微软雅黑", 12), bg="#9E9E9E", fg="white").pack(side=tk.RIGHT, padx=10)
+
+        # 中部：试题区域，切换题目时只重建这一部分
+        self.exam_content_frame = tk.Frame(self.root, bg="#f0f0f0")
+        self.exam_content_frame.pack(fill=tk.BOTH, expand=True, padx=20)
+
+        self.show_exam_question()
+        self.exam_timer = self.scheduler.every(1000, self.tick_exam_timer, key="exam", first=0)
+
+    def tick_exam_timer(self):
+        """考试全局计时：按截止时间计算剩余时间，只更新标签文字"""
+        remaining = int(self.exam_deadline - time.monotonic() + 0.999)
+        if remaining <= 0:
+            self.stop_exam_timer()
+            self.submit_exam(timeout=True)
+            return
+
+        self.exam_timer_label.config(text=f"剩余时间 {remaining // 60:02d}:{remaining % 60:02d}")
+
+    def stop_exam_timer(self):
+        """停止考试计时"""
+        if self.exam_timer:
+            self.exam_timer.cancel()
+            self.exam_timer = None
+
+    def show_exam_question(self):
+        """显示当前试题（不显示对错）"""
+        for widget in self.exam_content_frame.winfo_children():
+            widget.destroy()
+
+        _, _, question = self.exam_paper[self.exam_index]
+        q_type = question.get("题型", "未知题型")
+        saved = self.exam_answers.get(self.exam_index, "")
+
+        tk.Label(self.exam_content_frame, text=f"第 {self.exam_index + 1}/{len(self.exam_paper)} 题    题型: {q_type}",
+                 font=("微软雅黑", 12), bg="#f0f0f0").pack(anchor="w", pady=5)
+
+        question_text = scrolledtext.ScrolledText(self.exam_content_frame, font=("微软雅黑", 12),
+                                                  wrap=tk.WORD, height=6)
+        question_text.insert(tk.INSERT, question.get('问题', ''))
+        question_text.config(state=tk.DISABLED)
+        question_text.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        answer_frame = tk.LabelFrame(self.exam_content_frame, text="作答", font=("微软雅黑", 12, "bold"),
+                                     bg="#f0f0f0", padx=10, pady=10)
+        answer_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+
+        self.exam_read_answer = type_handler(question).render_exam(self, answer_frame, question, saved)
+
+    def save_exam_answer(self):
+        """记录当前试题的作答"""
+        if self.exam_read_answer:
+            answer = self.exam_read_answer()
+            if answer:
+                self.exam_answers[self.exam_index] = answer
+            else:
+                self.exam_answers.pop(self.exam_index, None)
+
+    def goto_exam_question(self, index):
+        """切换到指定试题"""
+        if not 0 <= index < len(self.exam_paper):
+            return
+        self.save_exam_answer()
+        self.exam_index = index
+        self.show_exam_question()
+
+    def abort_exam(self):
+        """放弃考试"""
+        if messagebox.askyesno("确认", "确定要放弃本次考试吗？作答不会保存。"):
+            self.stop_exam_timer()
+            self.exam_read_answer = None
+            self.select_subject(self.selected_subject)
+
+    def submit_exam(self, timeout=False):
+        """交卷并整卷批量评分"""
+        self.save_exam_answer()
+        if not timeout:
+            unanswered = len(self.exam_paper) - len(self.exam_answers)
+            if unanswered and not messagebox.askyesno("确认", f"还有 {unanswered} 题未作答，确定交卷吗？"):
+                return
+
+        self.stop_exam_timer()
+        self.exam_read_answer = None
+
+        with PERF.span("exam.grade", questions=len(self.exam_paper)):
+            results, by_type = grade_paper(self.exam_paper, self.exam_answers)
+        self.show_exam_results(results, by_type, timeout)
+
+    def show_exam_results(self, results, by_type, timeout=False):
+        """显示模拟考试成绩"""
+        self.clear_frame()
+
+        title = "考试时间到，已自动交卷" if timeout else "考试结束"
+        tk.Label(self.root, text=title, font=("微软雅黑", 20, "bold"), bg="#f0f0f0").pack(pady=20)
+
+        graded = sum(stat["graded"] for stat in by_type.values())
+        correct = sum(stat["correct"] for stat in by_type.values())
+        accuracy = correct / graded * 100 if graded > 0 else 0
+        tk.Label(self.root, text=f"得分: {correct}/{graded}  ({accuracy:.2f}%)", font=("微软雅黑", 14),
+                 bg="#f0f0f0").pack(pady=5)
+
+        # 按题型统计
+        stats_frame = tk.Frame(self.root, bg="#f0f0f0")
+        stats_frame.pack(pady=10)
+        for row, (q_type, stat) in enumerate(by_type.items()):
+            text = f"{q_type}: {stat['correct']}/{stat['graded']}"
+            if TYPE_CODES.get(q_type) is not None and QUESTION_TYPES[TYPE_CODES[q_type]].subjective:
+                text += "（按要点自动评分，仅供参考）"
+            tk.Label(stats_frame, text=text, font=("微软雅黑", 12), bg="#f0f0f0").grid(row=row, column=0, sticky="w")
+
+        # 错题与主观题参考答案（用一个文本框显示，试卷很大时也不会创建大量控件）
+        detail_text = scrolledtext.ScrolledText(self.root, font=("微软雅黑", 11), wrap=tk.WORD, height=12)
+        detail_text.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        for i, ((file_path, index, question), result) in enumerate(zip(self.exam_paper, results)):
+            if result["is_correct"]:
+                continue
+            mark = f"错误，要点覆盖 {result['score']:.0%}" if "score" in result else "错误"
+            detail_text.insert(tk.END, f"第 {i + 1} 题 [{mark}] {question.get('问题', '')}\n"
+                                       f"    你的答案: {result['user_answer'] or '(未作答)'}\n"
+                                       f"    正确答案: {result['correct_answer']}\n"
+                                       f"    来源: {os.path.basename(file_path)} 第 {index + 1} 题\n\n")
+        detail_text.config(state=tk.DISABLED)
+
+        btn_frame = tk.Frame(self.root, bg="#f0f0f0")
+        btn_frame.pack(pady=10)
+
+        tk.Button(btn_frame, text="再考一次", command=self.show_exam_setup,
+                  font=("微软雅黑", 12), bg="#FF9800", fg="white").pack(side=tk.LEFT, padx=10)
+
+        tk.Button(btn_frame, text="返回", command=self.create_welcome_frame,
+                  font=("微软雅黑", 12), bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=10)
+
     def show_progress_management(self):
-        """显示进度管理界面"""
+        """显示进度管理界面：按科目/题库/题型汇总正确率、错题数和近期趋势"""
+        self.flush_progress()
         self.clear_frame()
 
         # 标题
         tk.Label(self.root, text="进度管理", font=("微软雅黑", 20, "bold"), bg="#f0f0f0").pack(pady=20)
 
-        # 进度文件列表
-        progress_files = []
-        if os.path.exists(PROGRESS_DIR):
-            progress_files = [f for f in os.listdir(PROGRESS_DIR) if f.endswith(".json")]
+        progress_dir = get_progress_dir(self.user)
+        progress_files = list_progress_files(progress_dir)
+        # 升级前已有进度但还没有统计汇总时，重建一次
+        if progress_files and not os.path.exists(get_summary_path(self.user)):
+            summary = rebuild_summary(self.user)
+        else:
+            summary = load_summary(self.user)
+        banks = summary["banks"]
 
         if not progress_files:
             tk.Label(self.root, text="没有找到进度文件", font=("微软雅黑", 14), bg="#f0f0f0").pack(pady=20)
         else:
-            list_frame = tk.Frame(self.root, bg="#f0f0f0")
-            list_frame.pack(fill=tk.BOTH, expand=True, padx=50, pady=10)
-
-            for i, file in enumerate(progress_files):
-                file_frame = tk.Frame(list_frame, bg="#f0f0f0")
-                file_frame.grid(row=i, column=0, sticky="ew", pady=5)
-
-                tk.Label(file_frame, text=file, font=("微软雅黑", 11), bg="#f0f0f0").pack(side=tk.LEFT)
-
-                del_btn = tk.Button(file_frame, text="删除", command=lambda f=file: self.delete_progress(f),
-                                    font=("微软雅黑", 10), bg="#F44336", fg="white")
-                del_btn.pack(side=tk.RIGHT, padx=10)
+            attempts = sum(entry["attempts"] for entry in banks.values())
+            correct = sum(entry["correct"] for entry in banks.values())
+            wrong_now = sum(entry["wrong_now"] for entry in banks.values())
+            tk.Label(self.root, text=f"题库 {len(banks)} 个  作答 {attempts} 次  正确率 {self.format_rate(correct, attempts)}"
+                                     f"  当前错题 {wrong_now} 道",
+                     font=("微软雅黑", 12), bg="#f0f0f0", fg="#555").pack()
+
+            # 近期趋势：选中科目或题库时显示其趋势，默认显示全部
+            trend_canvas = tk.Canvas(self.root, width=800, height=120, bg="white", highlightthickness=0)
+            trend_canvas.pack(pady=10)
+
+            # 表格行: (进度键, 层级, 名称, 各列的值, 每日统计)；题型行的进度键为 None，趋势沿用所属题库
+            # 科目的合计由题库统计相加得到，只遍历汇总，不读取进度文件
+            rows = []
+            by_subject = {}
+            for key, entry in banks.items():
+                by_subject.setdefault(entry["subject"], []).append((key, entry))
+
+            for subject in sorted(by_subject):
+                entries = [entry for _, entry in by_subject[subject]]
+                rows.append((None, 0, subject, self.summary_row(entries), self.merge_daily(entries)))
+                for key, entry in sorted(by_subject[subject], key=lambda item: item[1]["name"]):
+                    rows.append((key, 1, entry["name"], self.summary_row([entry]), entry["daily"]))
+                    for q_type, (type_attempts, type_correct) in sorted(entry["types"].items()):
+                        rows.append((None, 2, q_type, ("", type_attempts, self.format_rate(type_correct, type_attempts),
+                                                       "", ""), entry["daily"]))
+
+            # 有进度文件但没有统计的题库（题库已移动或删除）
+            untracked = [key for key in progress_files if key not in banks]
+            if untracked:
+                rows.append((None, 0, "未统计的进度", ("", "", "", "", ""), {}))
+                rows.extend((key, 1, progress_files[key], ("", "", "", "", ""), {}) for key in untracked)
+
+            all_daily = self.merge_daily(banks.values())
+            columns = [("科目 / 题库 / 题型", 300, "w")] + [(title, 100, "e") for title in
+                                                         ("已做/总题数", "作答次数", "正确率", "当前错题", "近7天正确率")]
+
+            def on_select(selection):
+                self.draw_trend(trend_canvas, rows[selection[-1]][4] if selection else all_daily)
+
+            table = VirtualList(self.root, rows, render=lambda row: ("    " * row[1] + row[2],) + tuple(row[3]),
+                                columns=columns, row_height=28, width=800, height=300, multiple=True,
+                                on_select=on_select, row_color=lambda row: "#F5F5F5" if row[1] == 0 else None)
+            table.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
+            self.draw_trend(trend_canvas, all_daily)
+            self.progress_list = table
 
         # 按钮框架
         btn_frame = tk.Frame(self.root, bg="#f0f0f0")
@@ -1153,33 +3939,229 @@ class ExamApp:
         tk.Button(btn_frame, text="返回", command=self.create_welcome_frame,
                   font=("微软雅黑", 12), bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=10)
 
+        if progress_files:
+            tk.Button(btn_frame, text="删除所选进度", command=self.delete_selected_progress,
+                      font=("微软雅黑", 12), bg="#FF9800", fg="white").pack(side=tk.LEFT, padx=10)
+
+            tk.Button(btn_frame, text="重建统计", command=self.rebuild_progress_summary,
+                      font=("微软雅黑", 12), bg="#607D8B", fg="white").pack(side=tk.LEFT, padx=10)
+
+            tk.Button(btn_frame, text="整理进度", command=self.compact_progress_files,
+                      font=("微软雅黑", 12), bg="#795548", fg="white").pack(side=tk.LEFT, padx=10)
+
         tk.Button(btn_frame, text="清空所有进度", command=self.clear_all_progress,
                   font=("微软雅黑", 12), bg="#F44336", fg="white").pack(side=tk.LEFT, padx=10)
 
-    def delete_progress(self, file):
-        """删除单个进度文件"""
-        file_path = os.path.join(PROGRESS_DIR, file)
+    @staticmethod
+    def format_rate(correct, attempts):
+        """正确率文本"""
+        return f"{correct / attempts:.1%}" if attempts else "-"
+
+    def summary_row(self, entries):
+        """汇总若干题库的统计，返回表格一行的值"""
+        answered = sum(entry["answered"] for entry in entries)
+        total = sum(entry["total"] for entry in entries)
+        attempts = sum(entry["attempts"] for entry in entries)
+        correct = sum(entry["correct"] for entry in entries)
+        wrong_now = sum(entry["wrong_now"] for entry in entries)
+
+        recent_days = {time.strftime("%Y-%m-%d", time.localtime(time.time() - 86400 * i)) for i in range(7)}
+        recent = [0, 0]
+        for entry in entries:
+            for day in recent_days & entry["daily"].keys():
+                recent[0] += entry["daily"][day][0]
+                recent[1] += entry["daily"][day][1]
+
+        return (f"{answered}/{total}", attempts, self.format_rate(correct, attempts), wrong_now,
+                self.format_rate(recent[1], recent[0]))
+
+    @staticmethod
+    def merge_daily(entries):
+        """合并多个题库的每日统计"""
+        daily = {}
+        for entry in entries:
+            for day, (attempts, correct) in entry["daily"].items():
+                add_attempts(daily, day, attempts, correct)
+        return daily
+
+    def draw_trend(self, canvas, daily, days=14):
+        """画最近 days 天的每日作答量柱状图，柱子颜色表示当天正确率"""
+        canvas.delete(tk.ALL)
+        width, height = 800, 120
+        counts = []
+        for i in range(days - 1, -1, -1):
+            day = time.strftime("%Y-%m-%d", time.localtime(time.time() - 86400 * i))
+            counts.append((day, *daily.get(day, (0, 0))))
+
+        peak = max(attempts for _, attempts, _ in counts) or 1
+        slot = width / days
+        for i, (day, attempts, correct) in enumerate(counts):
+            x0 = i * slot + slot * 0.2
+            x1 = (i + 1) * slot - slot * 0.2
+            bar_height = (height - 40) * attempts / peak
+            if attempts:
+                rate = correct / attempts
+                color = "#4CAF50" if rate >= 0.8 else "#FF9800" if rate >= 0.6 else "#F44336"
+                canvas.create_rectangle(x0, height - 20 - bar_height, x1, height - 20, fill=color, outline="")
+                canvas.create_text((x0 + x1) / 2, height - 26 - bar_height, text=f"{rate:.0%}",
+                                   font=("微软雅黑", 8))
+            canvas.create_text((x0 + x1) / 2, height - 10, text=day[5:], font=("微软雅黑", 8), fill="#555")
+
+    def delete_selected_progress(self):
+        """删除表格中选中题库的进度（按住 Ctrl 可多选）"""
+        table = self.progress_list
+        rows = [table.items[index] for index in table.selection()]
+        progress_files = list_progress_files(get_progress_dir(self.user))
+        rows = [row for row in rows if row[0] in progress_files]
+        if not rows:
+            messagebox.showwarning("提示", "请先选中要删除进度的题库")
+            return
+        keys = [row[0] for row in rows]
+        names = [row[2] for row in rows]
+        if messagebox.askyesno("确认", "确定要删除以下题库的进度吗？\n" + "\n".join(names)):
+            for key in keys:
+                self.delete_progress(key, refresh=False)
+            self.show_progress_management()
+
+    def delete_progress(self, key, refresh=True):
+        """删除单个题库的进度文件（快照和旧版 JSON），同时删除其统计"""
+        file_path = os.path.join(get_progress_dir(self.user), key + PROGRESS_EXT)
+        self.store = None
         try:
-            os.remove(file_path)
-            messagebox.showinfo("成功", "进度文件已删除")
-            self.show_progress_management()  # 刷新列表
+            for path in (file_path, legacy_progress_path(file_path)):
+                if os.path.exists(path):
+                    os.remove(path)
+            remove_from_summary([key], self.user)
+            remove_events([key], self.user)
+            if refresh:
+                messagebox.showinfo("成功", "进度文件已删除")
+                self.show_progress_management()  # 刷新列表
         except Exception as e:
             messagebox.showerror("错误", f"删除失败: {e}")
 
+    def rebuild_progress_summary(self):
+        """从所有进度文件重建统计"""
+        rebuild_summary(self.user)
+        self.show_progress_management()
+
+    def compact_progress_files(self):
+        """立即整理进度目录并显示结果"""
+        self.flush_progress()
+        try:
+            report = compact_progress(self.user)
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("错误", f"整理进度失败: {e}")
+            return
+        messagebox.showinfo("整理完成", f"转换旧格式进度 {report['converted']} 个，删除已不存在题库的进度 {report['removed']} 个，"
+                                       f"跳过无法读取的进度 {report['skipped']} 个，精简过期作答记录 {report['trimmed']} 条，压缩作答历史 {report['events_compressed']} 个月\n"
+                                       f"进度目录 {report['bytes_before'] / 1024:.1f} KB -> {report['bytes_after'] / 1024:.1f} KB")
+        self.show_progress_management()
+
     def clear_all_progress(self):
         """清空所有进度"""
         if messagebox.askyesno("确认", "确定要清空所有进度吗？"):
-            for file in os.listdir(PROGRESS_DIR):
-                file_path = os.path.join(PROGRESS_DIR, file)
+            self.store = None
+            progress_dir = get_progress_dir(self.user)
+            for file in os.listdir(progress_dir):
+                file_path = os.path.join(progress_dir, file)
+                if not os.path.isfile(file_path):
+                    continue
                 try:
                     os.remove(file_path)
                 except:
                     pass
+            try:
+                remove_events(user=self.user)  # 作答历史也要清空，否则导出或重建统计时会重新出现
+            except (OSError, TimeoutError, ValueError) as e:
+                messagebox.showerror("错误", f"清空作答历史失败: {e}")
             messagebox.showinfo("成功", "所有进度已清空")
             self.show_progress_management()  # 刷新列表
 
+    def show_diagnostics(self):
+        """显示性能诊断界面（埋点统计、导出 Chrome Trace / cProfile）"""
+        self.clear_frame()
+
+        tk.Label(self.root, text="性能诊断", font=("微软雅黑", 20, "bold"), bg="#f0f0f0").pack(pady=20)
+
+        status = "已开启" if PERF.enabled else f"未开启（可设置环境变量 {PROFILE_ENV}=1 启动时开启）"
+        tk.Label(self.root, text=f"耗时埋点: {status}", font=("微软雅黑", 11), bg="#f0f0f0").pack()
+        if PERF.profiler is not None:
+            tk.Label(self.root, text="cProfile 正在记录...", font=("微软雅黑", 11), fg="#F44336",
+                     bg="#f0f0f0").pack()
+
+        # 埋点统计表
+        table_frame = tk.Frame(self.root, bg="#f0f0f0")
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        columns = ("count", "total", "mean", "max")
+        tree = ttk.Treeview(table_frame, columns=columns, height=15)
+        tree.heading("#0", text="环节")
+        tree.column("#0", width=260)
+        for col, title in zip(columns, ("次数", "总耗时(ms)", "平均(ms)", "最大(ms)")):
+            tree.heading(col, text=title)
+            tree.column(col, width=120, anchor="e")
+
+        for name, item in PERF.summary().items():
+            tree.insert("", tk.END, text=name, values=(item["count"], f"{item['total'] * 1000:.2f}",
+                                                       f"{item['mean'] * 1000:.2f}", f"{item['max'] * 1000:.2f}"))
+
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # 按钮框架
+        btn_frame = tk.Frame(self.root, bg="#f0f0f0")
+        btn_frame.pack(pady=20)
+
+        tk.Button(btn_frame, text="返回", command=self.create_welcome_frame,
+                  font=("微软雅黑", 12), bg="#2196F3", fg="white").pack(side=tk.LEFT, padx=5)
+
+        tk.Button(btn_frame, text="关闭埋点" if PERF.enabled else "开启埋点", command=self.toggle_instrumentation,
+                  font=("微软雅黑", 12), bg="#607D8B", fg="white").pack(side=tk.LEFT, padx=5)
+
+        tk.Button(btn_frame, text="停止 cProfile" if PERF.profiler is not None else "开始 cProfile",
+                  command=self.toggle_cprofile, font=("微软雅黑", 12), bg="#FF9800", fg="white").pack(side=tk.LEFT,
+                                                                                                      padx=5)
+
+        tk.Button(btn_frame, text="导出 Chrome Trace", command=self.export_chrome_trace,
+                  font=("微软雅黑", 12), bg="#4CAF50", fg="white").pack(side=tk.LEFT, padx=5)
+
+        tk.Button(btn_frame, text="清空记录", command=lambda: (PERF.clear(), self.show_diagnostics()),
+                  font=("微软雅黑", 12), bg="#F44336", fg="white").pack(side=tk.LEFT, padx=5)
+
+    def toggle_instrumentation(self):
+        """开启/关闭耗时埋点"""
+        PERF.enabled = not PERF.enabled
+        self.show_diagnostics()
+
+    def toggle_cprofile(self):
+        """开始/停止 cProfile 记录"""
+        if PERF.profiler is None:
+            PERF.start_cprofile()
+        else:
+            path = filedialog.asksaveasfilename(title="保存 cProfile 结果", defaultextension=".prof",
+                                                initialfile=f"exam_{time.strftime('%Y%m%d_%H%M%S')}.prof",
+                                                filetypes=[("cProfile", "*.prof")])
+            if not path:
+                return
+            PERF.stop_cprofile(path)
+            messagebox.showinfo("成功", f"cProfile 结果已保存到 {path}")
+        self.show_diagnostics()
+
+    def export_chrome_trace(self):
+        """导出 Chrome Trace 文件"""
+        path = filedialog.asksaveasfilename(title="导出 Chrome Trace", defaultextension=".json",
+                                            initialfile=f"exam_trace_{time.strftime('%Y%m%d_%H%M%S')}.json",
+                                            filetypes=[("Chrome Trace", "*.json")])
+        if not path:
+            return
+        count = PERF.dump_chrome_trace(path)
+        messagebox.showinfo("成功", f"已导出 {count} 条记录到 {path}")
+
     def clear_frame(self):
-        """清除当前框架内容"""
+        """清除当前框架内容，并取消与该界面绑定的定时任务"""
+        self.scheduler.end_view()
         for widget in self.root.winfo_children():
             widget.destroy()
 